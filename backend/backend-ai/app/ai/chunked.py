@@ -0,0 +1,133 @@
+import asyncio
+from typing import Awaitable, Callable, List
+
+from shared.analysis.diff_compaction import summary_kind
+from shared.analysis.diff_index import DiffIndex, parse_diff
+
+# A lockfile or generated file is summarized in one line, whatever its size.
+_SUMMARIZED_FILE_CHARS = 80
+_CHARS_PER_TOKEN = 4
+
+
+def _top_dir(path: str) -> str:
+    return path.split("/", 1)[0] if "/" in path else ""
+
+
+def plan_chunks(diff, chunk_tokens: int, max_chunks: int) -> List[DiffIndex]:
+    """
+    Split a diff (text or DiffIndex) into at most ``max_chunks`` groups of whole
+    files of roughly ``chunk_tokens`` each. Files are grouped by top-level
+    directory so related changes are reviewed together. Each chunk is a DiffIndex
+    over the same text, so nothing is copied or parsed again.
+    """
+    index = diff if isinstance(diff, DiffIndex) else parse_diff(diff)
+    sizes = [
+        _SUMMARIZED_FILE_CHARS if summary_kind(file_diff.path) else file_diff.end - file_diff.start
+        for file_diff in index.files
+    ]
+    total = sum(sizes)
+    # Never produce more than max_chunks: grow the chunk size instead.
+    limit = max(chunk_tokens * _CHARS_PER_TOKEN, -(-total // max(max_chunks, 1)))
+
+    order = sorted(range(len(index.files)), key=lambda i: (_top_dir(index.files[i].path), i))
+    chunks = []
+    current = None
+    current_size = 0
+    for i in order:
+        if current is None or (current.files and current_size + sizes[i] > limit):
+            if len(chunks) == max_chunks:
+                # Rounding left a few files over; they join the last chunk.
+                current = chunks[-1]
+            else:
+                current = DiffIndex(index.text)
+                chunks.append(current)
+                current_size = 0
+        current.files.append(index.files[i])
+        current_size += sizes[i]
+    for chunk in chunks:
+        chunk.files.sort(key=lambda file_diff: file_diff.start)
+    return chunks
+
+
+async def iter_chunk_results(
+    chunks: list,
+    analyze: Callable[[int, DiffIndex], Awaitable],
+    concurrency: int,
+):
+    """
+    Run ``analyze(position, chunk)`` for every chunk, at most ``concurrency`` at a
+    time, and yield (position, result) as each finishes. A failed chunk yields its
+    exception instead of a result, so one bad chunk does not sink the others.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(position: int, chunk: DiffIndex):
+        async with semaphore:
+            try:
+                return position, await analyze(position, chunk)
+            except Exception as e:
+                return position, e
+
+    tasks = [asyncio.ensure_future(run(position, chunk)) for position, chunk in enumerate(chunks)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _unique(items) -> list:
+    seen = set()
+    unique = []
+    for item in items:
+        if not isinstance(item, str):
+            continue
+        key = " ".join(item.lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+
+def merge_chunk_results(results: list) -> dict:
+    """
+    Combine per-chunk analyses, given in chunk order, into one
+    {summary, risks, suggestions, health_delta}. Risks and suggestions are
+    de-duplicated; the health delta is the worst chunk's, since a risky part
+    makes the whole PR risky.
+    """
+    summaries = _unique(result.get("summary") for result in results)
+    deltas = [
+        result["health_delta"]
+        for result in results
+        if isinstance(result.get("health_delta"), (int, float))
+    ]
+    if len(summaries) == 1:
+        summary = summaries[0]
+    else:
+        summary = f"Reviewed in {len(results)} parts. " + " ".join(summaries)
+    return {
+        "summary": summary,
+        "risks": _unique(risk for result in results for risk in result.get("risks") or []),
+        "suggestions": _unique(
+            suggestion for result in results for suggestion in result.get("suggestions") or []
+        ),
+        "health_delta": min(deltas) if deltas else 0,
+    }
+
+
+def merge_compaction_reports(reports: list, failed: list) -> dict:
+    """One prompt_compaction report for a chunked analysis."""
+    return {
+        "chunks": len(reports),
+        "failed_chunks": failed,
+        "token_budget": sum(report.get("token_budget", 0) for report in reports),
+        "original_tokens": sum(report.get("original_tokens", 0) for report in reports),
+        "estimated_tokens": sum(report.get("estimated_tokens", 0) for report in reports),
+        "hunks_total": sum(report.get("hunks_total", 0) for report in reports),
+        "hunks_included": sum(report.get("hunks_included", 0) for report in reports),
+        "summarized": [item for report in reports for item in report.get("summarized", [])],
+        "dropped": [item for report in reports for item in report.get("dropped", [])],
+        "truncated": any(report.get("truncated") for report in reports),
+    }
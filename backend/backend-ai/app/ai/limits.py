@@ -0,0 +1,83 @@
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+class LimitExceeded(Exception):
+    """Raised when no slot is free; callers should answer 503 instead of waiting."""
+
+
+class InflightLimiter:
+    """
+    Caps how many LLM calls run at once. Unlike a semaphore it never queues:
+    a caller that finds every slot taken is rejected straight away, so excess
+    load turns into fast 503s rather than an unbounded backlog.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire_up_to(self, count: int) -> int:
+        """Take up to ``count`` free slots without waiting; returns how many were taken."""
+        with self._lock:
+            taken = max(0, min(count, self.limit - self.in_flight))
+            self.in_flight += taken
+            return taken
+
+    def release(self, count: int = 1) -> None:
+        with self._lock:
+            self.in_flight -= count
+
+    def try_hold(self) -> "Optional[HeldSlot]":
+        """A slot to hand to another owner (e.g. a streamed response), or None if none is free."""
+        return HeldSlot(self) if self.try_acquire() else None
+
+    def hold_up_to(self, count: int) -> "HeldSlot":
+        """acquire_up_to() as a HeldSlot; its ``count`` says how many were taken."""
+        return HeldSlot(self, self.acquire_up_to(count))
+
+    @contextmanager
+    def slot(self):
+        if not self.try_acquire():
+            raise LimitExceeded(f"{self.limit} LLM calls already in flight")
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class HeldSlot:
+    """
+    Acquired slots (``count`` of them) that several code paths may release
+    (the response's generator, and a background task that also runs when the
+    generator never started or the client left): only the first release()
+    counts.
+    """
+
+    def __init__(self, limiter: InflightLimiter, count: int = 1):
+        self._limiter = limiter
+        self.count = count
+        self._held = True
+        self._lock = threading.Lock()
+
+    @property
+    def held(self) -> bool:
+        return self._held
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._held:
+                return
+            self._held = False
+        self._limiter.release(self.count)
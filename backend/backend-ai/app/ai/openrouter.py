@@ -1,13 +1,102 @@
-from openai import OpenAI
 import os
+import threading
+from typing import Optional
 
-client = OpenAI(
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-    base_url="https://openrouter.ai/api/v1",
-    default_headers={
-        "HTTP-Referer": "https://github.com/AmoghMerudi/ai-repo-supervisor",
-        "X-Title": "AI Repo Supervisor"
-    }
-)
+import httpx
+from openai import AsyncOpenAI, OpenAI
 
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+DEFAULT_HEADERS = {
+    "HTTP-Referer": "https://github.com/AmoghMerudi/ai-repo-supervisor",
+    "X-Title": "AI Repo Supervisor"
+}
 
+# ---- Connection pool / timeout settings ----
+REQUEST_TIMEOUT = float(os.getenv("OPENROUTER_TIMEOUT", "30"))
+CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "5"))
+POOL_TIMEOUT = float(os.getenv("OPENROUTER_POOL_TIMEOUT", "5"))
+MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENROUTER_KEEPALIVE_EXPIRY", "60"))
+MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "1"))
+
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_client_lock = threading.Lock()
+
+
+def request_timeout(total: Optional[float] = None) -> httpx.Timeout:
+    """Timeout for one LLM call; ``total`` overrides OPENROUTER_TIMEOUT."""
+    return httpx.Timeout(
+        REQUEST_TIMEOUT if total is None else total,
+        connect=CONNECT_TIMEOUT,
+        pool=POOL_TIMEOUT,
+    )
+
+
+def pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def create_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> OpenAI:
+    """Build an OpenAI-compatible client backed by a keep-alive connection pool."""
+    http_client = httpx.Client(limits=pool_limits(), timeout=request_timeout())
+    return OpenAI(
+        api_key=api_key or os.getenv("OPENROUTER_API_KEY"),
+        base_url=base_url or OPENROUTER_BASE_URL,
+        default_headers=DEFAULT_HEADERS,
+        http_client=http_client,
+        max_retries=MAX_RETRIES,
+    )
+
+
+def create_async_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> AsyncOpenAI:
+    """Async twin of create_client, for use from the event loop."""
+    http_client = httpx.AsyncClient(limits=pool_limits(), timeout=request_timeout())
+    return AsyncOpenAI(
+        api_key=api_key or os.getenv("OPENROUTER_API_KEY"),
+        base_url=base_url or OPENROUTER_BASE_URL,
+        default_headers=DEFAULT_HEADERS,
+        http_client=http_client,
+        max_retries=MAX_RETRIES,
+    )
+
+
+def get_client() -> OpenAI:
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_client()
+    return _client
+
+
+def close_client() -> None:
+    """Close the shared client and its pooled connections (app shutdown)."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+def get_async_client() -> AsyncOpenAI:
+    """Return the process-wide async client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = create_async_client()
+    return _async_client
+
+
+async def aclose_clients() -> None:
+    """Close both shared clients (app shutdown)."""
+    global _async_client
+    close_client()
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.close()
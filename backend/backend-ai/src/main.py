@@ -1,15 +1,48 @@
-import sqlite3
 import json
 import os
-from fastapi import FastAPI
+import sys
+import time
+from contextlib import aclosing
+from pathlib import Path
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from datetime import datetime
-from openai import OpenAI
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from dotenv import load_dotenv
 
-# Load .env automatically
+# Load .env automatically, before the imports below read their settings
+# (app.ai.openrouter reads OPENROUTER_* at import time).
 load_dotenv()
 
+# backend/shared and backend-ai/app are on sys.path when mounted by
+# backend/main.py; add them when this service runs on its own.
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = SERVICE_DIR.parent
+for directory in (SERVICE_DIR, BACKEND_DIR):
+    if str(directory) not in sys.path:
+        sys.path.append(str(directory))
+
+from app.ai.chunked import (
+    iter_chunk_results,
+    merge_chunk_results,
+    merge_compaction_reports,
+    plan_chunks,
+)
+from app.ai.limits import HeldSlot, InflightLimiter, LimitExceeded
+from app.ai.openrouter import aclose_clients, get_async_client, get_client, request_timeout
+from shared.analysis.analyze_pull_request import analyze_pull_request
+from shared.analysis.diff_compaction import compact_diff, estimate_tokens
+from shared.analysis.diff_index import parse_diff
+from shared.analysis.pipeline import AnalysisPipeline, parse_stages
+from shared.cache import AnalysisCache, analysis_key
+from shared.metrics import registry as metrics
+from shared.pagination import InvalidCursor, decode_cursor, encode_cursor
+from shared.storage.base import analysis_record
+from shared.storage.sqlite import SQLiteHealthStorage, SQLiteStore
+from shared.storage.write_behind import WriteBehindBuffer
+
 app = FastAPI()
 
 # -----------------------------------
@@ -18,20 +51,61 @@ app = FastAPI()
 USE_AI = os.getenv("USE_AI", "1") == "1"
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "google/gemini-3-flash-preview")
+# Part of the AI cache key: bump it whenever the prompt changes.
+PROMPT_VERSION = "3"
+# Approximate token budget for the whole prompt; large diffs are compacted to fit.
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "12000"))
+# Diffs over the budget are split into up to AI_MAX_CHUNKS file groups that are
+# analyzed concurrently and merged; AI_MAX_CHUNKS=1 keeps a single prompt.
+AI_MAX_CHUNKS = int(os.getenv("AI_MAX_CHUNKS", "8"))
+AI_CHUNK_CONCURRENCY = int(os.getenv("AI_CHUNK_CONCURRENCY", "4"))
+MAX_HISTORY_PAGE = 1000  # larger reads go through /health-history/export
+
+# Identical PRs are answered from here instead of paying for another LLM call.
+ai_cache = AnalysisCache.from_env()
+metrics.collect_cache("backend-ai-llm", ai_cache)
+
+# LLM calls allowed in flight at once; requests beyond this get a fast 503.
+AI_MAX_INFLIGHT = int(os.getenv("AI_MAX_INFLIGHT", "16"))
+AI_RETRY_AFTER_SECONDS = os.getenv("AI_RETRY_AFTER_SECONDS", "2")
+llm_limiter = InflightLimiter(AI_MAX_INFLIGHT)
+
+LLM_SECONDS = metrics.histogram(
+    "llm_request_duration_seconds",
+    "LLM API calls by mode (sync, async, stream: until the stream opens) and outcome.",
+    ("mode", "outcome"),
+)
+LLM_TOKENS = metrics.counter("llm_tokens_total", "Tokens billed by the LLM API, by kind.", ("kind",))
+LLM_FALLBACKS = metrics.counter(
+    "llm_fallbacks_total", "Analyses answered without the LLM because it failed, by endpoint.", ("endpoint",)
+)
+LLM_REJECTED = metrics.counter("llm_rejected_total", "Requests turned away with 503 because AI_MAX_INFLIGHT calls were running.")
+
+def observe_llm_call(mode: str, started: float, response=None) -> None:
+    LLM_SECONDS.labels(mode, "error" if response is None else "ok").observe(time.perf_counter() - started)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.labels("prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+        LLM_TOKENS.labels("completion").inc(getattr(usage, "completion_tokens", 0) or 0)
 
 # -----------------------------------
 # Database setup
 # -----------------------------------
-conn = sqlite3.connect("health.db", check_same_thread=False)
-conn.execute("""
-CREATE TABLE IF NOT EXISTS repo_health (
-    repo TEXT,
-    timestamp TEXT,
-    score INTEGER,
-    reason TEXT
-)
-""")
-conn.commit()
+# HEALTH_DB_PATH, default backend-ai/health.db (whatever the cwd); a connection
+# per worker thread. Each service keeps its own file, as before the shared store.
+health_db = SQLiteStore.from_env(Path(__file__).resolve().parents[1] / "health.db")
+# Tagged backend-ai: with HEALTH_DB_PATH shared with backend-api, each service
+# still reads back only its own records.
+health_storage = SQLiteHealthStorage(health_db, source="backend-ai")
+
+# With WRITE_BEHIND set, records are committed in batches off the request path.
+health_writer = WriteBehindBuffer.from_env(health_storage.insert_many, "backend-ai-health")
+
+def record_health(records) -> None:
+    if health_writer is not None:
+        health_writer.submit(records)
+    else:
+        health_storage.insert_many(records)
 
 # -----------------------------------
 # Request model
@@ -49,16 +123,22 @@ class PRRequest(BaseModel):
 # -----------------------------------
 # AI helper (OpenRouter)
 # -----------------------------------
-def run_ai_analysis(payload: PRRequest):
-    if not OPENROUTER_API_KEY:
-        raise RuntimeError("OPENROUTER_API_KEY not set")
-
-    client = OpenAI(
-        api_key=OPENROUTER_API_KEY,
-        base_url="https://openrouter.ai/api/v1",
+def ai_cache_key(payload: PRRequest) -> str:
+    # The prompt also carries repo, PR number and author, so they are part of the key.
+    return analysis_key(
+        f"llm:{OPENROUTER_MODEL}",
+        PROMPT_VERSION,
+        payload.dict(),
+        payload.repo,
+        payload.pr_number,
+        payload.author,
+        AI_PROMPT_TOKEN_BUDGET,
+        AI_MAX_CHUNKS,
     )
 
-    prompt = f""" 
+def build_prompt(payload: PRRequest, diff: str, part: str = "") -> str:
+    part_line = f"Part: {part} (only this part of the diff is shown) \n    " if part else ""
+    return f""" 
     You are a senior repository supervisor. 
     Return ONLY valid JSON in this format: 
     {{ "summary": string, 
@@ -73,101 +153,396 @@ def run_ai_analysis(payload: PRRequest):
     Deletions: {payload.deletions} 
     Changed files: {payload.changed_files} 
     Lint passed: {payload.lint_passed} 
-    Diff: 
-    {payload.diff} 
+    {part_line}Diff: 
+    {diff} 
 """
 
-    response = client.chat.completions.create(
-        model=OPENROUTER_MODEL,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.2,
+def compact_prompt(payload: PRRequest, diff=None, part: str = ""):
+    """
+    Build the prompt within AI_PROMPT_TOKEN_BUDGET for ``diff`` (the payload's
+    diff by default, or one chunk of it). Returns (prompt, report), where the
+    report lists the summarized files and the hunks left out.
+    """
+    diff = (payload.diff or "") if diff is None else diff
+    diff_budget = AI_PROMPT_TOKEN_BUDGET - estimate_tokens(build_prompt(payload, "", part))
+    compacted = compact_diff(diff, diff_budget)
+    return build_prompt(payload, compacted.text, part), compacted.report
+
+def plan_analysis(payload: PRRequest) -> list:
+    """The diff chunks to analyze: just one unless the diff is over the prompt budget."""
+    index = parse_diff(payload.diff or "")
+    if (
+        AI_MAX_CHUNKS <= 1
+        or len(index.files) < 2
+        or estimate_tokens(index.text) <= AI_PROMPT_TOKEN_BUDGET
+    ):
+        return [index]
+    return plan_chunks(index, AI_PROMPT_TOKEN_BUDGET, AI_MAX_CHUNKS)
+
+def ai_messages(prompt: str) -> list:
+    return [{"role": "user", "content": prompt}]
+
+def with_compaction(content, report: dict):
+    # Tell the caller what the model did not see; non-JSON output is left as is.
+    try:
+        parsed = json.loads(content)
+    except (TypeError, ValueError):
+        return content
+    if not isinstance(parsed, dict):
+        return content
+    parsed["prompt_compaction"] = report
+    return json.dumps(parsed)
+
+def is_cacheable(content) -> bool:
+    # Only cache answers the caller can use; unparseable output is retried next time.
+    try:
+        json.loads(content)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+async def request_analysis(prompt: str, **options):
+    started, response = time.perf_counter(), None
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=OPENROUTER_MODEL,
+            messages=ai_messages(prompt),
+            temperature=0.2,
+            timeout=request_timeout(),
+            **options,
+        )
+        return response
+    finally:
+        observe_llm_call("stream" if options.get("stream") else "async", started, response)
+
+async def iter_chunk_analyses(payload: PRRequest, chunks: list, held: Optional[List[HeldSlot]] = None):
+    """
+    Analyze each chunk with its own prompt and yield (position, result or
+    exception, compaction report) as chunks finish.
+
+    The caller holds one llm_limiter slot. Every concurrent chunk call needs
+    its own, so up to AI_CHUNK_CONCURRENCY - 1 more are taken if free (without
+    waiting); with none free the chunks run one at a time on the caller's slot.
+    Either way AI_MAX_INFLIGHT bounds the OpenRouter calls in flight. The extra
+    slots are added to ``held``, when given, for an owner that may have to
+    release them before this generator is closed.
+    """
+    reports = {}
+    extra = llm_limiter.hold_up_to(min(len(chunks), AI_CHUNK_CONCURRENCY) - 1)
+    if held is not None:
+        held.append(extra)
+
+    async def analyze(position: int, chunk):
+        prompt, reports[position] = await run_in_threadpool(
+            compact_prompt, payload, chunk, f"{position + 1} of {len(chunks)}"
+        )
+        response = await request_analysis(prompt)
+        result = json.loads(response.choices[0].message.content)
+        if not isinstance(result, dict):
+            raise ValueError("chunk analysis is not a JSON object")
+        return result
+
+    try:
+        async with aclosing(iter_chunk_results(chunks, analyze, 1 + extra.count)) as results:
+            async for position, result in results:
+                yield position, result, reports.get(position)
+    finally:
+        extra.release()
+
+def merge_chunk_analyses(chunk_count: int, results: dict, reports: dict):
+    """
+    Merge per-chunk results (keyed by position) in chunk order. Returns
+    (content, failed_parts); raises if no chunk produced a usable result.
+    """
+    succeeded = [results[p] for p in range(chunk_count) if isinstance(results.get(p), dict)]
+    if not succeeded:
+        raise RuntimeError(f"all {chunk_count} chunk analyses failed")
+    failed = [p + 1 for p in range(chunk_count) if not isinstance(results.get(p), dict)]
+    merged = merge_chunk_results(succeeded)
+    merged["prompt_compaction"] = merge_compaction_reports(
+        [reports[p] for p in sorted(reports)], failed
     )
+    return json.dumps(merged), failed
+
+def run_ai_analysis(payload: PRRequest):
+    cache_key = ai_cache_key(payload)
+    cached = ai_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    if not OPENROUTER_API_KEY:
+        raise RuntimeError("OPENROUTER_API_KEY not set")
+
+    prompt, compaction = compact_prompt(payload)
+    client = get_client()
+    started, response = time.perf_counter(), None
+    try:
+        response = client.chat.completions.create(
+            model=OPENROUTER_MODEL,
+            messages=ai_messages(prompt),
+            temperature=0.2,
+            timeout=request_timeout(),
+        )
+    finally:
+        observe_llm_call("sync", started, response)
+
+    content = with_compaction(response.choices[0].message.content, compaction)
+    if is_cacheable(content):
+        ai_cache.put(cache_key, content)
+    return content
+
+async def run_ai_analysis_async(payload: PRRequest):
+    """
+    Event-loop version of run_ai_analysis. Cache hits cost no LLM slot; a miss
+    raises LimitExceeded when AI_MAX_INFLIGHT calls are already running.
+    """
+    cache_key = ai_cache_key(payload)
+    cached = await ai_cache.aget(cache_key)
+    if cached is not None:
+        return cached
 
-    return response.choices[0].message.content
+    if not OPENROUTER_API_KEY:
+        raise RuntimeError("OPENROUTER_API_KEY not set")
+
+    with llm_limiter.slot():
+        chunks = await run_in_threadpool(plan_analysis, payload)
+        if len(chunks) == 1:
+            prompt, compaction = await run_in_threadpool(compact_prompt, payload, chunks[0])
+            response = await request_analysis(prompt)
+            content = with_compaction(response.choices[0].message.content, compaction)
+            cacheable = is_cacheable(content)
+        else:
+            results, reports = {}, {}
+            async with aclosing(iter_chunk_analyses(payload, chunks)) as analyses:
+                async for position, result, report in analyses:
+                    results[position], reports[position] = result, report
+            content, failed = merge_chunk_analyses(len(chunks), results, reports)
+            # A merge missing some parts is served but not cached.
+            cacheable = not failed
+
+    if cacheable:
+        await ai_cache.aput(cache_key, content)
+    return content
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def release_held(held: List[HeldSlot]) -> None:
+    for slot in held:
+        slot.release()
+
+async def stream_analysis_events(payload: PRRequest, cached, held: List[HeldSlot]):
+    """
+    Server-Sent Events for one PR: the heuristic analysis first, then the LLM's
+    output as it is generated ("token" events, or one "chunk" event per part
+    when a large diff is analyzed in chunks), then the final parsed result.
+    ``held`` has the llm_limiter slot the caller acquired for the LLM call
+    (empty when there is none), and chunked analysis adds its extra slots to
+    it; all are released as soon as the call is done.
+    """
+    try:
+        heuristic = await run_in_threadpool(analyze_pull_request, payload.dict())
+        yield sse_event("heuristic", heuristic)
+
+        result = json.loads(cached) if cached is not None else None
+        if result is None and held:
+            try:
+                chunks = await run_in_threadpool(plan_analysis, payload)
+                if len(chunks) == 1:
+                    prompt, compaction = await run_in_threadpool(compact_prompt, payload, chunks[0])
+                    stream = await request_analysis(prompt, stream=True)
+                    parts = []
+                    async for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            parts.append(delta)
+                            yield sse_event("token", {"text": delta})
+                    content = with_compaction("".join(parts), compaction)
+                    failed = []
+                else:
+                    results, reports = {}, {}
+                    async with aclosing(iter_chunk_analyses(payload, chunks, held)) as analyses:
+                        async for position, chunk_result, report in analyses:
+                            results[position], reports[position] = chunk_result, report
+                            yield sse_event(
+                                "chunk",
+                                {
+                                    "part": position + 1,
+                                    "parts": len(chunks),
+                                    "result": chunk_result if isinstance(chunk_result, dict) else None,
+                                },
+                            )
+                    content, failed = merge_chunk_analyses(len(chunks), results, reports)
+                result = json.loads(content)
+                if not failed:
+                    await ai_cache.aput(ai_cache_key(payload), content)
+            except Exception as e:
+                print("⚠️ AI stream failed, falling back to manual logic:", e)
+                LLM_FALLBACKS.labels("stream").inc()
+                result = None
+        release_held(held)
+
+        if result is None:
+            result = await run_in_threadpool(fallback_analysis, payload)
+        else:
+            await run_in_threadpool(persist_health, [(payload.dict(), result)])
+        yield sse_event("result", result)
+    finally:
+        release_held(held)
+
+async def end_analysis_stream(events, held: List[HeldSlot]) -> None:
+    """
+    Background task of a streamed analysis, run once the response is over,
+    also when the client disconnected mid-stream or before the body started.
+    Closing the generator cancels chunk calls still running; the slots are
+    then released here rather than whenever the abandoned generator would
+    have been finalized.
+    """
+    try:
+        await events.aclose()
+    finally:
+        release_held(held)
 
 # -----------------------------------
-# API Endpoints
+# Analysis pipeline
 # -----------------------------------
-@app.post("/analyze-pr")
-def analyze_pr(payload: PRRequest):
-    # -----------------------------------
-    # AI-FIRST (with fallback)
-    # -----------------------------------
-    if USE_AI:
-        try:
-            ai_result = run_ai_analysis(payload)
-            parsed = json.loads(ai_result)
-
-            # Save basic health metric
-            conn.execute(
-                "INSERT INTO repo_health (repo, timestamp, score, reason) VALUES (?, ?, ?, ?)",
-                (
-                    payload.repo,
-                    datetime.utcnow().isoformat(),
-                    parsed.get("health_delta", 0),
-                    ",".join(parsed.get("risks", [])),
-                ),
-            )
-            conn.commit()
-
-            return parsed
-        except Exception as e:
-            print("⚠️ AI failed, falling back to manual logic:", e)
+async def llm_stage(pr: dict) -> dict:
+    try:
+        result = json.loads(await run_ai_analysis_async(PRRequest(**pr)))
+        if not isinstance(result, dict):
+            raise ValueError("LLM output is not a JSON object")
+    except LimitExceeded:
+        raise
+    except Exception:
+        # The pipeline answers with the fallback analysis instead.
+        LLM_FALLBACKS.labels("analyze-pr").inc()
+        raise
+    return result
 
-    # -----------------------------------
-    # FALLBACK: deterministic logic
-    # -----------------------------------
-    risks = []
-    if not payload.lint_passed:
-        risks.append("Lint failures detected")
-    if len(payload.diff or "") > 5000:
-        risks.append("Very large diff")
-    if (payload.additions - payload.deletions) > 500:
-        risks.append("Many additions")
+def persist_health(items) -> None:
+    try:
+        record_health([analysis_record(pr, result) for pr, result in items])
+    except Exception as e:
+        print("Warning: failed to record health:", e)
+
+# llm -> synthesis -> persist by default. Without an LLM result, synthesis is
+# the triage rules ("Fallback analysis ...") unless the heuristic passes ran.
+analysis_pipeline = AnalysisPipeline(
+    stages=("llm", "persist") if USE_AI else ("persist",),
+    llm=llm_stage,
+    persist=persist_health,
+    label="Fallback",
+    fatal=(LimitExceeded,),
+    run_sync=run_in_threadpool,
+)
 
-    suggestions = []
-    if not payload.lint_passed:
-        suggestions.append("Fix lint issues")
-    if not risks:
-        suggestions.append("Add unit tests for changed code")
+# -----------------------------------
+# Lifecycle
+# -----------------------------------
+@app.on_event("startup")
+async def open_ai_client():
+    if USE_AI and OPENROUTER_API_KEY:
+        get_async_client()
 
-    summary = f"Fallback analysis for {payload.repo} PR #{payload.pr_number}"
+@app.on_event("shutdown")
+async def close_ai_client():
+    await aclose_clients()
 
-    score = -5 if risks else 0
+@app.on_event("shutdown")
+async def flush_health_writer():
+    if health_writer is not None:
+        await run_in_threadpool(health_writer.close)
+    # After the writer's final flush.
+    health_db.close()
 
+# -----------------------------------
+# API Endpoints
+# -----------------------------------
+@app.post("/analyze-pr")
+async def analyze_pr(payload: PRRequest, stages: Optional[str] = None):
+    """
+    AI-first, falling back to the triage rules (or to the heuristic passes, when
+    requested) if the LLM is disabled or fails. ``stages`` (comma-separated:
+    structural, semantic, llm, persist) runs only those stages; the response's
+    timings_ms has the time each one took.
+    """
+    try:
+        enabled = analysis_pipeline.resolve(parse_stages(stages))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        conn.execute(
-            "INSERT INTO repo_health (repo, timestamp, score, reason) VALUES (?, ?, ?, ?)",
-            (
-                payload.repo,
-                datetime.utcnow().isoformat(),
-                score,
-                ",".join(risks),
-            ),
+        return await analysis_pipeline.arun(payload.dict(), enabled)
+    except LimitExceeded:
+        LLM_REJECTED.labels().inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Too many AI analyses in progress, retry shortly",
+            headers={"Retry-After": AI_RETRY_AFTER_SECONDS},
         )
-        conn.commit()
-    except Exception:
-        pass
 
-    return {
-        "summary": summary,
-        "risks": risks,
-        "suggestions": suggestions,
-        "health_delta": score,
-    }
+@app.post("/analyze-pr/stream")
+async def analyze_pr_stream(payload: PRRequest):
+    """
+    Streaming variant of /analyze-pr (text/event-stream). Events, in order:
+    "heuristic" (analyze_pull_request result, sent immediately), zero or more
+    "token" ({"text": ...} pieces of LLM output) or, for diffs analyzed in
+    parts, "chunk" ({"part", "parts", "result"}) events, and "result" (same
+    shape as /analyze-pr).
+    """
+    cached = None
+    held: List[HeldSlot] = []
+    if USE_AI:
+        cached = await ai_cache.aget(ai_cache_key(payload))
+        if cached is None and OPENROUTER_API_KEY:
+            slot = llm_limiter.try_hold()
+            if slot is None:
+                LLM_REJECTED.labels().inc()
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many AI analyses in progress, retry shortly",
+                    headers={"Retry-After": AI_RETRY_AFTER_SECONDS},
+                )
+            held.append(slot)
+
+    events = stream_analysis_events(payload, cached, held)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(end_analysis_stream, events, held),
+    )
+
+def fallback_analysis(payload: PRRequest):
+    # -----------------------------------
+    # FALLBACK: deterministic logic
+    # -----------------------------------
+    return analysis_pipeline.run(payload.dict(), ("persist",))
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 @app.get("/health-history")
-def health_history(repo: str):
-    cur = conn.execute(
-        "SELECT timestamp, score, reason FROM repo_health WHERE repo = ? ORDER BY timestamp DESC LIMIT 20",
-        (repo,),
-    )
+def health_history(repo: str, limit: int = 20, cursor: Optional[str] = None):
+    """
+    The newest `limit` health records for repo. Pass the returned next_cursor
+    back as cursor for the next (older) page.
+    """
+    limit = max(1, min(limit, MAX_HISTORY_PAGE))
+    try:
+        after = decode_cursor(cursor, 2)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after is not None and not (isinstance(after[0], str) and isinstance(after[1], int)):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+    # Keyset on (timestamp, rowid), as the export reads.
+    records = health_storage.page(repo, limit + 1, tuple(after) if after is not None else None)
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor([records[-1]["timestamp"], records[-1]["_id"]])
     rows = [
-        {"timestamp": r[0], "score": r[1], "reason": r[2]}
-        for r in cur.fetchall()
+        {"timestamp": r["timestamp"], "score": r["score"], "health_delta": r["health_delta"], "reason": r["reason"]}
+        for r in records
     ]
-    return {"repo": repo, "history": rows}
+    return {"repo": repo, "history": rows, "next_cursor": next_cursor}
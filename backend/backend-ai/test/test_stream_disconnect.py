@@ -0,0 +1,96 @@
+"""
+/analyze-pr/stream gives back every llm_limiter slot of a chunked analysis,
+and cancels its chunk calls, as soon as the response ends, also when the
+client disconnects mid-stream.
+
+    python -m pytest backend/backend-ai/test
+"""
+
+import asyncio
+import importlib.util
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+MAIN = Path(__file__).resolve().parents[1] / "src" / "main.py"
+
+PR = {
+    "repo": "org/a", "pr_number": 1, "author": "dev", "additions": 3,
+    "deletions": 1, "changed_files": 3, "diff": "+x\n", "lint_passed": True,
+}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("HEALTH_DB_PATH", str(tmp_path / "health.db"))
+    monkeypatch.setenv("USE_AI", "1")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setenv("AI_MAX_INFLIGHT", "8")
+    monkeypatch.setenv("AI_CHUNK_CONCURRENCY", "4")
+    monkeypatch.delenv("WRITE_BEHIND", raising=False)
+    monkeypatch.delenv("ANALYSIS_CACHE_DB", raising=False)
+    spec = importlib.util.spec_from_file_location("backend_ai_main", MAIN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    # Three parts: the first is answered at once, the others never are.
+    module.calls = {"started": 0, "cancelled": 0}
+
+    async def request_analysis(prompt, **options):
+        module.calls["started"] += 1
+        if not prompt.endswith("1 of 3"):
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                module.calls["cancelled"] += 1
+                raise
+        message = SimpleNamespace(content=json.dumps({"summary": prompt, "health_delta": -1}))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(module, "plan_analysis", lambda payload: ["a", "b", "c"])
+    monkeypatch.setattr(module, "compact_prompt", lambda payload, chunk=None, part="": (f"part {part}", {}))
+    monkeypatch.setattr(module, "request_analysis", request_analysis)
+    yield module
+    module.health_db.close()
+
+
+async def stream_until_disconnect(app):
+    """POST a PR, then leave once the first "chunk" event is being sent."""
+    chunk_sent = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": json.dumps(PR).encode(), "more_body": False}
+        await chunk_sent.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if b"event: chunk" in message.get("body", b""):
+            chunk_sent.set()
+            # A client that stops reading: the generator is left at its yield.
+            await asyncio.Event().wait()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/analyze-pr/stream",
+        "raw_path": b"/analyze-pr/stream", "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+
+def test_disconnect_releases_chunk_slots(service):
+    async def run():
+        await stream_until_disconnect(service.app)
+        # Checked before the loop runs anything else, so not left to the GC.
+        return service.llm_limiter.in_flight
+
+    assert asyncio.run(run()) == 0
+    # Every call still waiting was cancelled (a part may not have started yet).
+    assert service.calls["cancelled"] == service.calls["started"] - 1 >= 1
@@ -1,27 +1,58 @@
 import os
-import sqlite3
-from datetime import datetime
+import sys
+from pathlib import Path
+from typing import List, Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from src.ai.analyze_pull_request import analyze_pull_request
+# backend/shared is on sys.path when mounted by backend/main.py; add it when
+# this service runs on its own.
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from shared.cache import AnalysisCache
+from shared.analysis.batch import shutdown_process_pool
+from shared.analysis.pipeline import AnalysisPipeline, parse_stages
+from shared.export import EXPORT_MEDIA_TYPES, export_chunks, export_filename
+from shared.metrics import registry as metrics
+from shared.ndjson import NDJSONError, process_ndjson_batch
+from shared.pagination import InvalidCursor, decode_cursor, encode_cursor
+from shared.storage.base import analysis_record
+from shared.storage.sqlite import SQLiteHealthStorage, SQLiteStore
+from shared.storage.write_behind import WriteBehindBuffer
 
 DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"
+# Largest JSON batch accepted by /analyze-pr/batch; stream bigger ones as NDJSON.
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+# NDJSON lines analyzed and written together while the upload is still arriving.
+BATCH_GROUP_SIZE = int(os.getenv("BATCH_GROUP_SIZE", "64"))
+MAX_HISTORY_PAGE = 1000  # larger reads go through /health-history/export
 
 app = FastAPI()
 
+# Identical PRs (CI re-runs, retried Action calls) are answered from here.
+analysis_cache = AnalysisCache.from_env()
+metrics.collect_cache("backend-api-analysis", analysis_cache)
+
 # ---- Database setup ----
-conn = sqlite3.connect("health.db", check_same_thread=False)
-conn.execute("""
-CREATE TABLE IF NOT EXISTS repo_health (
-    repo TEXT,
-    timestamp TEXT,
-    score INTEGER,
-    reason TEXT
-)
-""")
-conn.commit()
+# HEALTH_DB_PATH, default backend-api/health.db (whatever the cwd); a connection
+# per worker thread. Each service keeps its own file, as before the shared store.
+health_db = SQLiteStore.from_env(Path(__file__).resolve().parents[1] / "health.db")
+# Tagged backend-api: with HEALTH_DB_PATH shared with backend-ai, each service
+# still reads back only its own records.
+health_storage = SQLiteHealthStorage(health_db, source="backend-api")
+
+# With WRITE_BEHIND set, records are committed in batches off the request path.
+health_writer = WriteBehindBuffer.from_env(health_storage.insert_many, "backend-api-health")
+
+def record_health(records) -> None:
+    if health_writer is not None:
+        health_writer.submit(records)
+    else:
+        health_storage.insert_many(records)
 
 # ---- Request model ----
 class PRRequest(BaseModel):
@@ -34,60 +65,150 @@ class PRRequest(BaseModel):
     diff: str
     lint_passed: bool
 
-# ---- API Endpoints ----
+class BatchRequest(BaseModel):
+    prs: List[PRRequest]
 
-# Public analyze endpoint (NO authentication for hackathon/demo)
-@app.post("/analyze-pr")
-def analyze_pr(payload: PRRequest):
-    result = analyze_pull_request(payload.dict())
-    if DEMO_MODE:
-        result["summary"] = (
-            result["summary"]
-            or "This pull request introduces focused, high-impact changes."
-        )
+def apply_demo_defaults(result: dict) -> dict:
+    result["summary"] = (
+        result["summary"]
+        or "This pull request introduces focused, high-impact changes."
+    )
 
-        result.setdefault("structural_signals", [])
-        result.setdefault("semantic_insights", [])
-        result.setdefault(
-            "synthesis",
-            "This change alters core behavior; review the critical paths carefully.",
-        )
+    result.setdefault("structural_signals", [])
+    result.setdefault("semantic_insights", [])
+    result.setdefault(
+        "synthesis",
+        "This change alters core behavior; review the critical paths carefully.",
+    )
 
-        if not result.get("risks"):
-            result["risks"] = [
-                "No major risks detected, but changes affect core logic."
-            ]
+    if not result.get("risks"):
+        result["risks"] = [
+            "No major risks detected, but changes affect core logic."
+        ]
 
-        if not result.get("suggestions"):
-            result["suggestions"] = [
-                "Consider a quick manual review of the modified logic."
-            ]
+    if not result.get("suggestions"):
+        result["suggestions"] = [
+            "Consider a quick manual review of the modified logic."
+        ]
+    return result
 
-    # Optional: record a simple health metric to sqlite
+def persist_health(items) -> None:
+    """The pipeline's persist stage: one health record per (pr, result), in one transaction."""
     try:
-        score = 0 if result.get("risks") else 10
-        conn.execute(
-            "INSERT INTO repo_health (repo, timestamp, score, reason) VALUES (?, ?, ?, ?)",
-            (
-                payload.repo,
-                datetime.utcnow().isoformat(),
-                score,
-                ",".join(result.get("risks", [])),
-            ),
-        )
-        conn.commit()
+        record_health([analysis_record(pr, result) for pr, result in items])
     except Exception:
         # ignore DB errors in demo mode
         pass
 
-    return result
+# parse -> structural -> semantic -> synthesis -> persist, with the heuristic
+# result cached; DEMO_MODE fills in the blanks before the row is recorded.
+analysis_pipeline = AnalysisPipeline(
+    stages=("structural", "semantic", "persist"),
+    persist=persist_health,
+    cache=analysis_cache,
+    finish=apply_demo_defaults if DEMO_MODE else None,
+)
+
+def process_batch(prs: List[dict]) -> List[dict]:
+    """
+    Analyze PRs (cache first, misses across the process pool) and record their
+    health rows in a single transaction. Results are in input order.
+    """
+    return analysis_pipeline.run_many(prs)
+
+# ---- Lifecycle ----
+@app.on_event("shutdown")
+def stop_analysis_pool():
+    shutdown_process_pool()
+
+@app.on_event("shutdown")
+def flush_health_writer():
+    if health_writer is not None:
+        health_writer.close()
+    # After the writer's final flush.
+    health_db.close()
+
+# ---- API Endpoints ----
+
+# Public analyze endpoint (NO authentication for hackathon/demo)
+@app.post("/analyze-pr")
+def analyze_pr(payload: PRRequest, stages: Optional[str] = None):
+    """
+    ``stages`` (comma-separated: structural, semantic, persist) runs only those
+    stages; the response's timings_ms has the time each one took.
+    """
+    try:
+        enabled = analysis_pipeline.resolve(parse_stages(stages))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return analysis_pipeline.run(payload.dict(), enabled)
+
+@app.post("/analyze-pr/batch")
+def analyze_pr_batch(payload: BatchRequest):
+    """Analyze many PRs (e.g. a history backfill); results are returned in request order."""
+    if len(payload.prs) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BATCH_SIZE} PRs per batch; use /analyze-pr/batch/ndjson for more",
+        )
+    return {"results": process_batch([pr.dict() for pr in payload.prs])}
+
+@app.post("/analyze-pr/batch/ndjson")
+async def analyze_pr_batch_ndjson(request: Request):
+    """
+    Streaming-upload batch: one PR JSON object per line. Groups of
+    BATCH_GROUP_SIZE lines are analyzed and written while the upload is still
+    arriving. The response is NDJSON with one {"index", "result"} or
+    {"index", "error"} line per input line, in input order.
+    """
+    try:
+        lines = await process_ndjson_batch(
+            request.stream(),
+            lambda item: PRRequest.parse_obj(item).dict(),
+            process_batch,
+            BATCH_GROUP_SIZE,
+        )
+    except NDJSONError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 @app.get("/health-history")
-def health_history(repo: str):
-    cur = conn.execute("SELECT timestamp, score, reason FROM repo_health WHERE repo = ? ORDER BY timestamp DESC LIMIT 20", (repo,))
-    rows = [{"timestamp": r[0], "score": r[1], "reason": r[2]} for r in cur.fetchall()]
-    return {"repo": repo, "history": rows}
+def health_history(repo: str, limit: int = 20, cursor: Optional[str] = None):
+    """
+    The newest `limit` health records for repo. Pass the returned next_cursor
+    back as cursor for the next (older) page.
+    """
+    limit = max(1, min(limit, MAX_HISTORY_PAGE))
+    try:
+        after = decode_cursor(cursor, 2)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after is not None and not (isinstance(after[0], str) and isinstance(after[1], int)):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+    # Keyset on (timestamp, rowid), as the export reads.
+    records = health_storage.page(repo, limit + 1, tuple(after) if after is not None else None)
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor([records[-1]["timestamp"], records[-1]["_id"]])
+    rows = [
+        {"timestamp": r["timestamp"], "score": r["score"], "health_delta": r["health_delta"], "reason": r["reason"]}
+        for r in records
+    ]
+    return {"repo": repo, "history": rows, "next_cursor": next_cursor}
+
+@app.get("/health-history/export")
+def export_health_history(repo: str, format: str = "ndjson"):
+    """Stream a repo's full health history, oldest first, as NDJSON (default) or CSV."""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_MEDIA_TYPES)}")
+    # export() pages through the (repo, timestamp) index a batch at a time.
+    return StreamingResponse(
+        export_chunks(health_storage.export(repo), ("timestamp", "score", "health_delta", "reason"), format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(repo, format)}"'},
+    )
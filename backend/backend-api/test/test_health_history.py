@@ -0,0 +1,53 @@
+"""
+/health-history pages: walking next_cursor visits every record once, newest first.
+
+    python -m pytest backend/backend-api/test
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+MAIN = Path(__file__).resolve().parents[1] / "src" / "main.py"
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("HEALTH_DB_PATH", str(tmp_path / "health.db"))
+    monkeypatch.delenv("WRITE_BEHIND", raising=False)
+    spec = importlib.util.spec_from_file_location("backend_api_main", MAIN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    yield module
+    module.health_storage.close()
+
+
+def test_history_pages(service):
+    # 45 records, with pairs of equal timestamps to page through.
+    service.health_storage.insert_many([
+        {"repo": "org/a", "pr_number": n, "timestamp": f"2026-01-01T00:00:{n // 2:02d}",
+         "score": n % 7, "health_delta": -(n % 3), "reason": f"r{n}"}
+        for n in range(45)
+    ])
+    service.health_storage.insert_many([{"repo": "org/b", "pr_number": 1, "timestamp": "2026-01-02T00:00:00"}])
+    client = TestClient(service.app)
+
+    first = client.get("/health-history", params={"repo": "org/a"}).json()
+    assert len(first["history"]) == 20 and first["next_cursor"]
+
+    reasons, cursor = [], None
+    while True:
+        params = {"repo": "org/a", "limit": 7}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/health-history", params=params).json()
+        reasons += [row["reason"] for row in page["history"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert reasons == [f"r{n}" for n in reversed(range(45))]
+    assert [row["reason"] for row in first["history"]] == reasons[:20]
+
+    assert client.get("/health-history", params={"repo": "org/a", "cursor": "bogus"}).status_code == 400
@@ -1,44 +1,121 @@
+import asyncio
+import functools
+import json
 import os
+import sys
 import traceback
-from datetime import datetime
-from typing import List, Dict, Any, Optional
-
-from fastapi import FastAPI, HTTPException, Request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
 
 # Use pymongo to talk to MongoDB Atlas
 import pymongo
-from pymongo.errors import PyMongoError
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError, PyMongoError
 from pymongo.collection import Collection
 from pymongo import ReturnDocument
 
+# backend/shared is on sys.path when mounted by backend/main.py; add it when
+# this service runs on its own.
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from shared.analysis.pipeline import AnalysisPipeline, parse_stages
+from shared.cache import ResponseCache, etag_matches
+from shared.export import EXPORT_MEDIA_TYPES, export_chunks, export_filename
+from shared.live import hub as live_hub
+from shared.metrics import registry as metrics
+from shared.ndjson import NDJSONError, process_ndjson_batch
+from shared.pagination import InvalidCursor, decode_cursor, encode_cursor
+from shared.storage.memory import MemoryHealthStorage, MemoryHistoryStore
+from shared.storage.base import HealthStorage, analysis_record
+from shared.storage.mongo import MongoHealthStorage
+from shared.storage.write_behind import WriteBehindBuffer
+
 app = FastAPI()
 
 # ---- MongoDB setup ----
 MONGODB_URI = os.environ.get("MONGODB_URI", "").strip()
 MONGODB_DB = os.environ.get("MONGODB_DB", "ai_repo_supervisor")
+# Connections per server in the client's pool, and threads that run blocking
+# pymongo calls for the endpoints (run_db). One thread per connection: more would
+# only wait on the pool, fewer would leave connections idle under load.
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "32"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "4"))
+MONGO_EXECUTOR_THREADS = int(os.environ.get("MONGO_EXECUTOR_THREADS", str(MONGO_MAX_POOL_SIZE)))
 
 mongo_client: Optional[pymongo.MongoClient] = None
 repo_collection: Optional[Collection] = None
 repo_summary: Optional[Collection] = None
-
-# In-memory fallback if Mongo is not configured or unavailable (keeps behavior in demos)
-_in_memory_history: List[Dict[str, Any]] = []
-_in_memory_summary: Dict[str, Dict[str, Any]] = {}  # keyed by repo
+# Every history, summary, trend and export read and every history write goes
+# through the shared storage layer: MongoHealthStorage on repo_health (with the
+# hourly/daily/weekly rollups behind /health-trend and the repo_summary
+# documents), else MemoryHealthStorage. repo_collection and repo_summary stay
+# for summary maintenance and reconciliation.
+health_storage: HealthStorage
 
 RECENT_LIMIT = 20  # keep last N PRs in summary.recent
 INITIAL_REPO_HEALTH = 100  # base health for new repos
+# In-memory history: newest N records per repo, and a budget across all repos.
+IN_MEMORY_HISTORY_PER_REPO = int(os.environ.get("IN_MEMORY_HISTORY_PER_REPO", "1000"))
+IN_MEMORY_HISTORY_LIMIT = int(os.environ.get("IN_MEMORY_HISTORY_LIMIT", "50000"))
+# With MongoDB, also serve /health-history from memory once a repo has been read.
+# Only safe when this process is the sole writer of repo_health.
+HISTORY_CACHE = os.environ.get("HISTORY_CACHE", "").strip().lower() in ("1", "true", "on", "yes")
+
+# The store behind MemoryHealthStorage if Mongo is not configured or unavailable
+# (keeps behavior in demos); with HISTORY_CACHE it is a read cache in front of Mongo.
+_in_memory_history = MemoryHistoryStore(IN_MEMORY_HISTORY_PER_REPO, IN_MEMORY_HISTORY_LIMIT)
+# Encoded /repo-summary, /repos and /health-history responses, dropped for a
+# repo whenever a write for it lands; polling clients revalidate with ETags.
+read_cache = ResponseCache.from_env()
+metrics.collect_cache("backend-db-read", read_cache)
+if HISTORY_CACHE:
+    metrics.collect_cache("backend-db-history", _in_memory_history)
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "1000"))
+BATCH_GROUP_SIZE = int(os.environ.get("BATCH_GROUP_SIZE", "64"))
+MAX_REPOS_PAGE = 200
+MAX_HISTORY_PAGE = 1000  # larger reads go through /health-history/export
+HISTORY_FIELDS = ("timestamp", "pr_number", "pr_score", "health_delta", "overall_health", "reason")
+# Seconds between background repo_summary reconciliation runs; 0 disables them.
+SUMMARY_RECONCILE_INTERVAL = float(os.environ.get("SUMMARY_RECONCILE_INTERVAL", "3600"))
+# Summaries updated more recently than this are left alone by reconciliation: the
+# matching repo_health insert may still be in flight.
+SUMMARY_RECONCILE_GRACE = float(os.environ.get("SUMMARY_RECONCILE_GRACE", "60"))
+# "auto" writes the summary update and the PR insert in one transaction when the
+# deployment supports it (replica set or sharded cluster); "on" / "off" force it.
+MONGODB_TRANSACTIONS = os.environ.get("MONGODB_TRANSACTIONS", "auto").strip().lower()
+use_transactions = False
 
 if MONGODB_URI:
     try:
-        mongo_client = pymongo.MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
+        mongo_client = pymongo.MongoClient(
+            MONGODB_URI,
+            serverSelectionTimeoutMS=5000,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=min(MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE),
+        )
         db = mongo_client[MONGODB_DB]
         repo_collection = db["repo_health"]
         repo_summary = db["repo_summary"]
-        # indexes
-        repo_collection.create_index([("repo", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)])
-        repo_summary.create_index([("repo", pymongo.ASCENDING)], unique=True)
-        print("Connected to MongoDB:", MONGODB_DB)
+        # Creates the indexes of repo_health, its rollups and repo_summary.
+        health_storage = MongoHealthStorage(repo_collection, db["repo_health_rollup"], repo_summary)
+        if MONGODB_TRANSACTIONS == "auto":
+            # Standalone servers reject transactions; replica sets report setName.
+            hello = mongo_client.admin.command("hello")
+            use_transactions = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        else:
+            use_transactions = MONGODB_TRANSACTIONS in ("1", "true", "on", "yes")
+        print("Connected to MongoDB:", MONGODB_DB, "(transactions)" if use_transactions else "")
     except PyMongoError as e:
         print("Warning: could not connect to MongoDB, falling back to in-memory store:", str(e))
         mongo_client = None
@@ -47,6 +124,39 @@ if MONGODB_URI:
 else:
     print("MONGODB_URI not set — using in-memory history (demo mode)")
 
+if repo_collection is None:
+    health_storage = MemoryHealthStorage(_in_memory_history)
+    # The store is the storage itself here, not a cache in front of it.
+    HISTORY_CACHE = False
+
+# pymongo blocks; endpoints must not call it on the event loop, where one slow
+# query would stall every other request. Created on first use.
+_mongo_executor: Optional[ThreadPoolExecutor] = None
+
+STORAGE_SECONDS = metrics.histogram(
+    "storage_operation_duration_seconds",
+    "Calls to the health storage backends, by backend and operation.",
+    ("backend", "operation"),
+)
+
+def _timed_db(func: Callable, *args: Any) -> Any:
+    # Time spent in the call itself, not waiting for an executor thread.
+    backend = "memory" if repo_collection is None else "mongo"
+    with STORAGE_SECONDS.labels(backend, func.__name__.lstrip("_")).time():
+        return func(*args)
+
+async def run_db(func: Callable, *args: Any) -> Any:
+    """
+    Run func(*args), which may call MongoDB, on the bounded Mongo executor. In
+    demo mode (no MongoDB) it runs inline: the in-memory store does not block.
+    """
+    global _mongo_executor
+    if repo_collection is None:
+        return _timed_db(func, *args)
+    if _mongo_executor is None:
+        _mongo_executor = ThreadPoolExecutor(MONGO_EXECUTOR_THREADS, thread_name_prefix="backend-db-mongo")
+    return await asyncio.get_running_loop().run_in_executor(_mongo_executor, functools.partial(_timed_db, func, *args))
+
 # ---- Request model ----
 class PRRequest(BaseModel):
     repo: str
@@ -62,62 +172,50 @@ class PRRequest(BaseModel):
         extra = "ignore"  # ignore unexpected fields, don't fail with 422
 
 # ---- Helper functions for summary maintenance ----
-def _update_in_memory_summary_with_doc(doc: Dict[str, Any]) -> None:
-    repo = doc["repo"]
-    s = _in_memory_summary.setdefault(
-        repo,
-        {
-            "repo": repo,
-            "total_prs": 0,
-            "cumulative_score": 0,
-            "avg_score": 0.0,
-            "current_health": INITIAL_REPO_HEALTH,
-            "last": None,
-            "recent": [],
-            "updated_at": None,
-        },
-    )
-
-    pr_score = int(doc.get("pr_score", doc.get("score", 0)))
-    health_delta = int(doc.get("health_delta", 0))
-
-    s["total_prs"] += 1
-    s["cumulative_score"] += pr_score
-    s["avg_score"] = s["cumulative_score"] / s["total_prs"] if s["total_prs"] else 0.0
-
-    # apply delta to current health
-    s["current_health"] = s.get("current_health", INITIAL_REPO_HEALTH) + health_delta
-
-    s["last"] = {"pr_number": doc.get("pr_number"), "score": pr_score, "author": doc.get("author"), "timestamp": doc.get("timestamp"), "overall_health": s["current_health"]}
-    s["recent"].insert(0, {"pr_number": doc.get("pr_number"), "score": pr_score, "timestamp": doc.get("timestamp"), "author": doc.get("author"), "overall_health": s["current_health"]})
-    if len(s["recent"]) > RECENT_LIMIT:
-        s["recent"].pop()
-    s["updated_at"] = datetime.utcnow().isoformat()
-
-def _update_repo_summary(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def _update_repo_summary(docs: List[Dict[str, Any]], session=None) -> Optional[Dict[str, Any]]:
     """
     Atomically upsert/aggregate per-repo summary in repo_summary collection using an
     aggregation-pipeline update without unsupported stages like $setOnInsert.
-    Returns the updated summary document or None on failure.
+    Applies one or more PR docs of a repo, oldest first, in a single round trip;
+    the updated summary document (avg_score included) comes back from the same
+    call. Returns None on failure, except inside a transaction (``session``),
+    where the error is raised so the transaction aborts.
     """
     if repo_summary is None:
         return None
 
-    repo = doc["repo"]
-    pr_score = int(doc.get("pr_score", doc.get("score", 0)))
-    health_delta = int(doc.get("health_delta", 0))
-    pr_number = doc.get("pr_number")
-    author = doc.get("author")
-    ts = doc.get("timestamp", datetime.utcnow().isoformat())
-
-    # small helper doc inserted into recent
-    new_recent_item = {
-        "pr_number": pr_number,
-        "score": pr_score,
-        "timestamp": ts,
-        "author": author,
-        "overall_health_delta": health_delta,
-    }
+    repo = docs[0]["repo"]
+    pr_scores = [int(doc.get("pr_score", doc.get("score", 0))) for doc in docs]
+    health_deltas = [int(doc.get("health_delta", 0)) for doc in docs]
+    last = docs[-1]
+    pr_score = pr_scores[-1]
+    pr_number = last.get("pr_number")
+    author = last.get("author")
+    ts = last.get("timestamp", datetime.utcnow().isoformat())
+
+    # health after each doc, as an offset from the summary's health before the update
+    health_offsets = []
+    offset = 0
+    for delta in health_deltas:
+        offset += delta
+        health_offsets.append(offset)
+
+    # small helper docs inserted into recent, newest first
+    new_recent_items = [
+        {
+            "pr_number": doc.get("pr_number"),
+            "score": score,
+            "timestamp": doc.get("timestamp", ts),
+            "author": doc.get("author"),
+            "overall_health_delta": delta,
+            "overall_health": {
+                "$add": [{"$ifNull": ["$current_health", INITIAL_REPO_HEALTH]}, health_offset]
+            },
+        }
+        for doc, score, delta, health_offset in zip(
+            reversed(docs), reversed(pr_scores), reversed(health_deltas), reversed(health_offsets)
+        )
+    ][:RECENT_LIMIT]
 
     try:
         # Aggregation-pipeline update using only supported stages/operators.
@@ -127,50 +225,160 @@ def _update_repo_summary(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
                     # ensure repo field exists
                     "repo": {"$ifNull": ["$repo", repo]},
                     # increment counters safely even if document absent
-                    "total_prs": {"$add": [{"$ifNull": ["$total_prs", 0]}, 1]},
-                    "cumulative_score": {"$add": [{"$ifNull": ["$cumulative_score", 0]}, pr_score]},
-                    # initialize current_health from INITIAL_REPO_HEALTH if missing, then add delta
-                    "current_health": {"$add": [{"$ifNull": ["$current_health", INITIAL_REPO_HEALTH]}, health_delta]},
+                    "total_prs": {"$add": [{"$ifNull": ["$total_prs", 0]}, len(docs)]},
+                    "cumulative_score": {"$add": [{"$ifNull": ["$cumulative_score", 0]}, sum(pr_scores)]},
+                    # initialize current_health from INITIAL_REPO_HEALTH if missing, then add deltas
+                    "current_health": {"$add": [{"$ifNull": ["$current_health", INITIAL_REPO_HEALTH]}, sum(health_deltas)]},
                     # last-* fields set to current PR values
                     "last_score": pr_score,
                     "last_pr_number": pr_number,
                     "last_author": author,
                     "last_timestamp": ts,
                     "updated_at": datetime.utcnow().isoformat(),
-                    # prepend new_recent_item and keep RECENT_LIMIT
+                    # prepend new_recent_items and keep RECENT_LIMIT
                     "recent": {
                         "$slice": [
-                            {"$concatArrays": [[new_recent_item], {"$ifNull": ["$recent", []]}]},
+                            {"$concatArrays": [new_recent_items, {"$ifNull": ["$recent", []]}]},
                             RECENT_LIMIT,
                         ]
                     },
-                    # keep avg_score computed after update (separate write below)
                 }
-            }
+            },
+            # avg_score from the counters updated by the stage above
+            {
+                "$set": {
+                    "avg_score": {
+                        "$cond": [
+                            {"$gt": ["$total_prs", 0]},
+                            {"$divide": ["$cumulative_score", "$total_prs"]},
+                            0.0,
+                        ]
+                    }
+                }
+            },
         ]
 
-        res = repo_summary.find_one_and_update(
+        return repo_summary.find_one_and_update(
             {"repo": repo},
             pipeline_update,
             upsert=True,
             return_document=ReturnDocument.AFTER,
+            session=session,
         )
-
-        if res:
-            total = res.get("total_prs", 0)
-            cumulative = res.get("cumulative_score", 0)
-            avg = (cumulative / total) if total else 0.0
-            # ensure avg_score is set
-            repo_summary.update_one({"repo": repo}, {"$set": {"avg_score": avg}})
-            # return the latest doc
-            res = repo_summary.find_one({"repo": repo})
-            return res
-
-        return None
     except PyMongoError as e:
+        if session is not None:
+            raise
         print("Warning: failed to update repo_summary:", str(e))
         return None
 
+def _summary_from_history(repo: str, totals: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rebuild a repo's summary fields from repo_health, given its totals from the
+    $group in _reconcile_summaries. Only the RECENT_LIMIT newest PRs are read.
+    """
+    rows = list(
+        repo_collection.find({"repo": repo}, {"_id": 0})
+        .sort("timestamp", pymongo.DESCENDING)
+        .limit(RECENT_LIMIT)
+    )
+    total = totals["total_prs"]
+    cumulative = totals["cumulative_score"]
+    last = rows[0] if rows else {}
+    return {
+        "repo": repo,
+        "total_prs": total,
+        "cumulative_score": cumulative,
+        "avg_score": (cumulative / total) if total else 0.0,
+        "current_health": last.get("overall_health", INITIAL_REPO_HEALTH),
+        "last_score": last.get("pr_score", last.get("score", 0)),
+        "last_pr_number": last.get("pr_number"),
+        "last_author": last.get("author"),
+        "last_timestamp": last.get("timestamp"),
+        "recent": [
+            {
+                "pr_number": r.get("pr_number"),
+                "score": r.get("pr_score", r.get("score", 0)),
+                "timestamp": r.get("timestamp"),
+                "author": r.get("author"),
+                "overall_health_delta": r.get("health_delta", 0),
+                "overall_health": r.get("overall_health"),
+            }
+            for r in rows
+        ],
+    }
+
+def _summary_drifted(summary: Optional[Dict[str, Any]], totals: Dict[str, Any]) -> bool:
+    if summary is None:
+        return True
+    if (
+        summary.get("total_prs") != totals["total_prs"]
+        or summary.get("cumulative_score") != totals["cumulative_score"]
+        or summary.get("current_health") != totals["current_health"]
+    ):
+        return True
+    # Summaries written before recent items carried overall_health.
+    return any("overall_health" not in item for item in summary.get("recent", []))
+
+def _reconcile_summaries(repo: Optional[str] = None, grace: float = SUMMARY_RECONCILE_GRACE) -> Dict[str, Any]:
+    """
+    Compare repo_summary against totals aggregated from repo_health (one repo, or
+    all of them) and rewrite the summaries that drifted. A rewrite only lands if
+    the summary was not updated meanwhile, so it never undoes a concurrent PR.
+    """
+    if repo_collection is None or repo_summary is None:
+        return {"checked": 0, "repaired": [], "skipped": []}
+
+    match = [{"$match": {"repo": repo}}] if repo is not None else []
+    pipeline = match + [
+        {"$sort": {"repo": 1, "timestamp": -1}},
+        {
+            "$group": {
+                "_id": "$repo",
+                "total_prs": {"$sum": 1},
+                "cumulative_score": {"$sum": {"$ifNull": ["$pr_score", {"$ifNull": ["$score", 0]}]}},
+                "current_health": {"$first": "$overall_health"},
+            }
+        },
+    ]
+    cutoff = (datetime.utcnow() - timedelta(seconds=grace)).isoformat()
+    checked = 0
+    repaired: List[str] = []
+    skipped: List[str] = []
+    for totals in repo_collection.aggregate(pipeline, allowDiskUse=True):
+        checked += 1
+        name = totals["_id"]
+        summary = repo_summary.find_one({"repo": name})
+        if not _summary_drifted(summary, totals):
+            continue
+        if summary is not None and (summary.get("updated_at") or "") > cutoff:
+            skipped.append(name)
+            continue
+        fields = _summary_from_history(name, totals)
+        fields["reconciled_at"] = datetime.utcnow().isoformat()
+        if summary is None:
+            fields["updated_at"] = fields["last_timestamp"]
+            del fields["repo"]  # set from the filter on insert
+            result = repo_summary.update_one({"repo": name}, {"$setOnInsert": fields}, upsert=True)
+            changed = result.upserted_id is not None
+        else:
+            result = repo_summary.update_one(
+                {"repo": name, "updated_at": summary.get("updated_at")}, {"$set": fields}
+            )
+            changed = result.modified_count == 1
+        (repaired if changed else skipped).append(name)
+    read_cache.invalidate(repaired)
+    return {"checked": checked, "repaired": repaired, "skipped": skipped}
+
+async def _reconcile_periodically() -> None:
+    while True:
+        await asyncio.sleep(SUMMARY_RECONCILE_INTERVAL)
+        try:
+            report = await run_db(_reconcile_summaries)
+            if report["repaired"]:
+                print("Reconciled repo_summary drift for:", ", ".join(report["repaired"]))
+        except PyMongoError as e:
+            print("Warning: repo_summary reconciliation failed:", str(e))
+
 def _coerce_payload(payload_raw: Dict[str, Any]) -> Dict[str, Any]:
     """Coerce common field types from strings to expected types."""
     p = dict(payload_raw)  # shallow copy
@@ -191,10 +399,240 @@ def _coerce_payload(payload_raw: Dict[str, Any]) -> Dict[str, Any]:
             p["lint_passed"] = bool(v)
     return p
 
+def _health_doc(pr: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """The repo_health document for one analyzed PR (overall_health is set when stored)."""
+    # pr_score: descriptive metric stored per-PR; health_delta: signed impact (policy)
+    doc = analysis_record(pr, result)
+    # The ObjectId _id, assigned before the insert, already makes replays idempotent.
+    del doc["overall_health"], doc["record_id"]
+    doc["pr_score"] = doc["score"]  # explicit per-PR score; score is the legacy field
+    doc.update(
+        author=pr.get("author", "unknown"),
+        additions=pr.get("additions", 0),
+        deletions=pr.get("deletions", 0),
+        changed_files=pr.get("changed_files", 0),
+    )
+    return doc
+
+def _persist_analyses(items: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+    """The pipeline's persist stage: store the docs together, then report overall_health."""
+    docs = [_health_doc(pr, result) for pr, result in items]
+    # One summary update per repo (giving overall_health) plus the PR inserts,
+    # committed together when the deployment supports transactions.
+    _record_batch(docs)
+    for (_, result), doc in zip(items, docs):
+        result["overall_health"] = doc["overall_health"]
+
+def _with_score_impact(result: Dict[str, Any]) -> Dict[str, Any]:
+    result["health_score_impact"] = result.get("health_delta", 0)
+    result.setdefault("pr_score", 0 if result.get("risks") else 10)
+    return result
+
+def _remember_in_memory(docs: List[Dict[str, Any]], stored: bool = True) -> None:
+    """
+    Keep docs in the in-memory store. With MongoDB, ``stored=False`` marks docs
+    whose write failed: their repos stop being served from memory, which would
+    no longer match the database. Docs a concurrent prime() already loaded
+    from the database are skipped by _id rather than held twice.
+    """
+    _in_memory_history.extend(docs)
+    if repo_collection is not None and not stored:
+        for repo in {doc["repo"] for doc in docs}:
+            _in_memory_history.invalidate(repo)
+
+def _apply_summaries(docs_by_repo: Dict[str, List[Dict[str, Any]]], session=None) -> None:
+    """Update each repo's summary once and set overall_health on its docs."""
+    for repo, repo_docs in docs_by_repo.items():
+        if repo_summary is None:
+            # Memory: the storage's own totals, before these docs go in.
+            health = health_storage.summary(repo)["current_health"] + sum(doc["health_delta"] for doc in repo_docs)
+        else:
+            summary = _update_repo_summary(repo_docs, session)
+            health = summary.get("current_health") if summary else None
+        if health is None:
+            for doc in repo_docs:
+                doc["overall_health"] = INITIAL_REPO_HEALTH
+            continue
+        # The summary holds the health after the last doc; walk back to each doc's own.
+        for doc in reversed(repo_docs):
+            doc["overall_health"] = health
+            health -= doc["health_delta"]
+
+def _write_transaction(docs: List[Dict[str, Any]], docs_by_repo: Dict[str, List[Dict[str, Any]]]) -> None:
+    def write(session):
+        _apply_summaries(docs_by_repo, session)
+        health_storage.insert_many(docs, session=session)
+
+    with mongo_client.start_session() as session:
+        session.with_transaction(write)
+
+def _apply_rollups(docs: List[Dict[str, Any]]) -> None:
+    """Add stored docs to the trend rollups (outside a transaction)."""
+    if not docs:
+        return
+    try:
+        health_storage.rollups.apply(docs)
+    except PyMongoError as e:
+        # Trends only; POST /health-trend/rebuild recomputes them from repo_health.
+        print("Warning: failed to update health rollups:", str(e))
+
+def _record_batch(docs: List[Dict[str, Any]]) -> None:
+    """
+    Store PR docs (in arrival order) with one summary update per repo, one
+    insert_many and one rollup bulk write, setting each doc's overall_health on
+    the way. With transactions available, all of it commits together;
+    otherwise, with write-behind enabled, the insert is queued.
+    """
+    try:
+        _store_batch(docs)
+    finally:
+        # After the write (even a partial one), so a read that raced it is not
+        # cached as current.
+        read_cache.invalidate({doc["repo"] for doc in docs})
+    for doc in docs:
+        live_hub.publish(doc["repo"], "pr", _live_event(doc))
+
+def _live_event(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """What a /subscribe client gets for a recorded PR: the change to its repo's summary."""
+    return {
+        "repo": doc["repo"],
+        "pr_number": doc.get("pr_number"),
+        "author": doc.get("author"),
+        "timestamp": doc.get("timestamp"),
+        "pr_score": doc.get("pr_score"),
+        "health_delta": doc.get("health_delta", 0),
+        "current_health": doc.get("overall_health"),
+        "risks": [risk for risk in (doc.get("reason") or "").split(",") if risk],
+    }
+
+def _store_batch(docs: List[Dict[str, Any]]) -> None:
+    docs_by_repo: Dict[str, List[Dict[str, Any]]] = {}
+    for doc in docs:
+        docs_by_repo.setdefault(doc["repo"], []).append(doc)
+        # Assigned here (not by the driver) so in-memory docs page the same way.
+        doc.setdefault("_id", ObjectId())
+
+    if use_transactions:
+        try:
+            _write_transaction(docs, docs_by_repo)
+        except PyMongoError as e:
+            # Nothing was committed; keep the PRs in memory rather than lose them.
+            print("Warning: failed to write PR docs to MongoDB, falling back to in-memory:", str(e))
+            for doc in docs:
+                doc.setdefault("overall_health", INITIAL_REPO_HEALTH)
+            _remember_in_memory(docs, stored=False)
+            return
+    elif history_writer is not None:
+        _apply_summaries(docs_by_repo)
+        # The docs' fixed _ids make a replayed or retried insert a no-op.
+        history_writer.submit(docs)
+        _apply_rollups(docs)
+    else:
+        _apply_summaries(docs_by_repo)
+        try:
+            # Rollups after, outside the insert: a failure there loses no PRs.
+            health_storage.insert_many(docs, rollups=False)
+        except BulkWriteError as e:
+            # ordered=True: everything before the first failure was written.
+            print("Warning: failed to write PR docs to MongoDB, falling back to in-memory:", str(e))
+            written = e.details.get("nInserted", 0)
+            _apply_rollups(docs[:written])
+            if HISTORY_CACHE:
+                _remember_in_memory(docs[:written])
+            _remember_in_memory(docs[written:], stored=False)
+            return
+        except PyMongoError as e:
+            print("Warning: failed to write PR docs to MongoDB, falling back to in-memory:", str(e))
+            _remember_in_memory(docs, stored=False)
+            return
+        _apply_rollups(docs)
+
+    if HISTORY_CACHE:
+        _remember_in_memory(docs)
+
+def _insert_history(docs: List[Dict[str, Any]]) -> None:
+    """Write-behind flush: insert repo_health docs, skipping ones already stored."""
+    try:
+        # Rollups were applied when the docs were queued.
+        health_storage.insert_many(docs, ordered=False, rollups=False)
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+    # /health-history read while these were queued did not include them.
+    read_cache.invalidate({doc["repo"] for doc in docs})
+
+# With WRITE_BEHIND set (and no transactions, which need the insert inside them),
+# repo_health inserts leave the request path and are written in batches; the
+# summary update that yields overall_health stays synchronous.
+history_writer: Optional[WriteBehindBuffer] = None
+if repo_collection is not None and not use_transactions:
+    history_writer = WriteBehindBuffer.from_env(
+        _insert_history,
+        "backend-db-history",
+        encode=json_util.dumps,
+        decode=json_util.loads,
+    )
+
+def _process_batch(payloads: List[PRRequest]) -> List[Dict[str, Any]]:
+    return analysis_pipeline.run_many([payload.dict() for payload in payloads])
+
+def _parse_pr(item: Any) -> PRRequest:
+    if not isinstance(item, dict):
+        raise ValueError("PR must be a JSON object")
+    return PRRequest.parse_obj(_coerce_payload(item))
+
+# Deterministic demo analysis: the triage rules ("Mock analysis ...") unless the
+# heuristic passes are requested, then persist on the Mongo executor.
+analysis_pipeline = AnalysisPipeline(
+    stages=("persist",),
+    persist=_persist_analyses,
+    label="Mock",
+    finish=_with_score_impact,
+    run_sync=run_db,
+)
+
+# ---- Lifecycle ----
+_reconcile_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_summary_reconciliation():
+    global _reconcile_task
+    if repo_summary is not None and SUMMARY_RECONCILE_INTERVAL > 0:
+        _reconcile_task = asyncio.create_task(_reconcile_periodically())
+
+@app.on_event("shutdown")
+async def stop_summary_reconciliation():
+    global _reconcile_task
+    if _reconcile_task is not None:
+        _reconcile_task.cancel()
+        _reconcile_task = None
+
+@app.on_event("shutdown")
+async def flush_history_writer():
+    if history_writer is not None:
+        await run_in_threadpool(history_writer.close)
+
+@app.on_event("shutdown")
+async def stop_mongo_executor():
+    global _mongo_executor
+    if _mongo_executor is not None:
+        # Lets queued calls finish without holding up the event loop.
+        await run_in_threadpool(_mongo_executor.shutdown)
+        _mongo_executor = None
+
 # ---- API Endpoints ----
 
 @app.post("/analyze-pr")
-async def analyze_pr(request: Request):
+async def analyze_pr(request: Request, stages: Optional[str] = None):
+    """
+    ``stages`` (comma-separated: structural, semantic, persist) runs only those
+    stages; the response's timings_ms has the time each one took.
+    """
+    try:
+        enabled = analysis_pipeline.resolve(parse_stages(stages))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # Accept raw JSON and validate/coerce to avoid 422 on client mistakes.
     try:
         payload_json = await request.json()
@@ -214,244 +652,292 @@ async def analyze_pr(request: Request):
 
     # now proceed with analysis logic (protected with general try/except to avoid 500 on unexpected errors)
     try:
-        # Basic deterministic "analysis" for demo purposes
-        risks: List[str] = []
-        if not payload.lint_passed:
-            risks.append("Lint failures detected")
-        if len(payload.diff or "") > 5000:
-            risks.append("Very large diff")
-        if (payload.additions - payload.deletions) > 500:
-            risks.append("Many additions")
-
-        suggestions: List[str] = []
-        if not payload.lint_passed:
-            suggestions.append("Fix lint issues")
-        if not risks:
-            suggestions.append("Add unit tests for changed code")
-
-        summary_text = f"Mock analysis for {payload.repo} PR #{payload.pr_number} — {'issues found' if risks else 'low risk'}"
-
-        # pr_score: descriptive metric stored per-PR; health_delta: signed impact (policy)
-        pr_score = 0 if risks else 10
-        health_delta = -5 if risks else 0
-        reason = ",".join(risks)
-
-        # create base doc (we will attach overall_health shortly)
-        doc: Dict[str, Any] = {
-            "repo": payload.repo,
-            "timestamp": datetime.utcnow().isoformat(),
-            "score": pr_score,          # legacy field kept
-            "pr_score": pr_score,       # explicit per-PR score
-            "reason": reason,
-            "pr_number": payload.pr_number,
-            "author": payload.author,
-            "additions": payload.additions,
-            "deletions": payload.deletions,
-            "changed_files": payload.changed_files,
-            "health_delta": health_delta,
-        }
+        # Returns the analysis including health_score_impact and overall_health.
+        return await analysis_pipeline.arun(payload.dict(), enabled)
+    except Exception:
+        # Log stack for debugging, but return safe 500 response
+        print("Unhandled error in /analyze-pr:", traceback.format_exc())
+        raise HTTPException(status_code=500, detail="Internal server error during analysis")
 
-        # Update summary first to compute new current_health atomically (if DB is available)
-        new_summary_doc = None
-        wrote_to_db = False
-        if repo_summary is not None:
-            new_summary_doc = _update_repo_summary(doc)
-        else:
-            # in-memory summary update will compute current_health
-            _update_in_memory_summary_with_doc(doc)
-            new_summary_doc = _in_memory_summary.get(doc["repo"])
-
-        # overall_health should reflect the updated current_health after applying this PR
-        overall_health = None
-        if new_summary_doc is not None:
-            overall_health = new_summary_doc.get("current_health") if isinstance(new_summary_doc, dict) else None
-            if overall_health is None:
-                overall_health = new_summary_doc.get("current_health", INITIAL_REPO_HEALTH) if isinstance(new_summary_doc, dict) else INITIAL_REPO_HEALTH
-        else:
-            # fallback: use in-memory summary if available
-            s = _in_memory_summary.get(doc["repo"])
-            overall_health = s.get("current_health") if s else INITIAL_REPO_HEALTH
+@app.post("/analyze-pr/batch")
+async def analyze_pr_batch(request: Request):
+    """
+    Analyze many PRs in one call (e.g. a history backfill). Body: a JSON list of
+    PRs or {"prs": [...]}. Returns {"results": [...]} in request order; an invalid
+    item gets {"error": ...} in its place instead of failing the whole batch.
+    """
+    try:
+        body = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid or missing JSON body")
 
-        doc["overall_health"] = overall_health
+    items = body.get("prs") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail='JSON body must be a list of PRs or {"prs": [...]}')
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BATCH_SIZE} PRs per batch; use /analyze-pr/batch/ndjson for more",
+        )
 
-        # Now insert PR doc into repo_health if collection available
-        if repo_collection is not None:
-            try:
-                repo_collection.insert_one(doc)
-                wrote_to_db = True
-            except PyMongoError as e:
-                print("Warning: failed to write PR doc to MongoDB, falling back to in-memory:", str(e))
-                _in_memory_history.append(doc)
-                if len(_in_memory_history) > 1000:
-                    _in_memory_history.pop(0)
-        else:
-            _in_memory_history.append(doc)
-            if len(_in_memory_history) > 1000:
-                _in_memory_history.pop(0)
-
-        # Return analysis including health_score_impact
-        return {
-            "summary": summary_text,
-            "risks": risks,
-            "suggestions": suggestions,
-            "health_score_impact": health_delta,
-            "health_delta": health_delta,
-            "pr_score": pr_score,
-            "overall_health": overall_health,
-        }
+    results: List[Any] = [None] * len(items)
+    payloads: List[PRRequest] = []
+    positions: List[int] = []
+    for i, item in enumerate(items):
+        try:
+            payloads.append(_parse_pr(item))
+            positions.append(i)
+        except ValueError as e:
+            results[i] = {"error": f"Invalid request payload: {e}"}
+
+    try:
+        analyzed = await run_db(_process_batch, payloads)
     except Exception:
-        # Log stack for debugging, but return safe 500 response
-        print("Unhandled error in /analyze-pr:", traceback.format_exc())
+        print("Unhandled error in /analyze-pr/batch:", traceback.format_exc())
         raise HTTPException(status_code=500, detail="Internal server error during analysis")
+    for i, result in zip(positions, analyzed):
+        results[i] = result
+    return {"results": results}
+
+@app.post("/analyze-pr/batch/ndjson")
+async def analyze_pr_batch_ndjson(request: Request):
+    """
+    Streaming-upload batch: one PR JSON object per line, analyzed and stored in
+    groups of BATCH_GROUP_SIZE while the upload arrives. Responds with NDJSON,
+    one {"index", "result"} or {"index", "error"} line per input line, in order.
+    """
+    try:
+        lines = await process_ndjson_batch(
+            request.stream(), _parse_pr, _process_batch, BATCH_GROUP_SIZE, run_sync=run_db
+        )
+    except NDJSONError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "mongo": repo_collection is not None}
+    return {
+        "status": "ok",
+        "mongo": repo_collection is not None,
+        "in_memory_history": _in_memory_history.stats(),
+        "write_behind": history_writer.stats() if history_writer is not None else None,
+        "read_cache": read_cache.stats(),
+    }
+
+async def _cached_read(request: Request, key: Any, repo: Optional[str], read: Callable) -> Response:
+    """
+    JSON response of ``await read()``, from read_cache while no write to repo
+    (None: any repo) has landed, and a bodiless 304 when the client's
+    If-None-Match already names it.
+    """
+    cached = read_cache.get(key)
+    if cached is None:
+        generation = read_cache.generation(repo)
+        body = json.dumps(
+            jsonable_encoder(await read()), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        etag = read_cache.put(key, repo, generation, body)
+    else:
+        etag, body = cached
+    # no-cache: clients may keep the body but must revalidate it on every poll.
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def _history_row(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "timestamp": r.get("timestamp"),
+        "pr_number": r.get("pr_number"),
+        "pr_score": r.get("pr_score", r.get("score")),
+        "health_delta": r.get("health_delta", 0),
+        "overall_health": r.get("overall_health"),
+        "reason": r.get("reason"),
+    }
+
+def _read_history(repo: str, limit: int, after: Optional[Tuple[str, ObjectId]] = None) -> List[Dict[str, Any]]:
+    """
+    Newest `limit` repo_health docs for repo, older than `after` (timestamp, _id)
+    if given. First pages come from the in-memory cache when it is enabled.
+    """
+    if not HISTORY_CACHE or after is not None:
+        return health_storage.page(repo, limit, after)
+    docs = _in_memory_history.cached_recent(repo, limit)
+    if docs is None:
+        version = _in_memory_history.version(repo)
+        docs = health_storage.page(repo, limit)
+        _in_memory_history.prime(repo, docs, complete=len(docs) < limit, version=version)
+    return docs
 
 @app.get("/health-history")
-async def health_history(repo: str, limit: int = 20):
+async def health_history(request: Request, repo: str, limit: int = 20, cursor: Optional[str] = None):
     """
     Returns the most recent `limit` health records for the given repo.
     Each record now contains overall_health (repo health at the time of that PR).
+    Pass the returned next_cursor back as cursor for the next (older) page;
+    /health-history/export streams the whole history.
     """
+    limit = max(1, min(limit, MAX_HISTORY_PAGE))
     try:
-        if repo_collection is not None:
-            try:
-                cursor = repo_collection.find({"repo": repo}).sort("timestamp", pymongo.DESCENDING).limit(limit)
-                rows = [
-                    {
-                        "timestamp": r.get("timestamp"),
-                        "pr_number": r.get("pr_number"),
-                        "pr_score": r.get("pr_score", r.get("score")),
-                        "health_delta": r.get("health_delta", 0),
-                        "overall_health": r.get("overall_health"),
-                        "reason": r.get("reason"),
-                    }
-                    for r in cursor
-                ]
-            except PyMongoError as e:
-                print("Warning: error querying MongoDB:", str(e))
-                raise HTTPException(status_code=500, detail="DB query error")
-        else:
-            rows = [
-                {
-                    "timestamp": r.get("timestamp"),
-                    "pr_number": r.get("pr_number"),
-                    "pr_score": r.get("pr_score", r.get("score")),
-                    "health_delta": r.get("health_delta", 0),
-                    "overall_health": r.get("overall_health"),
-                    "reason": r.get("reason"),
-                }
-                for r in reversed(_in_memory_history) if r.get("repo") == repo
-            ][:limit]
-        return {"repo": repo, "history": rows}
+        values = decode_cursor(cursor, 2)
+        after = (values[0], ObjectId(values[1])) if values is not None else None
+    except (InvalidCursor, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+    return await _cached_read(
+        request, ("health-history", repo, limit, cursor), repo, lambda: _health_history_page(repo, limit, after)
+    )
+
+async def _health_history_page(repo: str, limit: int, after: Optional[Tuple[str, ObjectId]]) -> Dict[str, Any]:
+    try:
+        docs = await run_db(_read_history, repo, limit + 1, after)
+    except PyMongoError as e:
+        print("Warning: error querying MongoDB:", str(e))
+        raise HTTPException(status_code=500, detail="DB query error")
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1].get("timestamp"), str(docs[-1]["_id"])])
+    return {"repo": repo, "history": [_history_row(r) for r in docs], "next_cursor": next_cursor}
+
+def _iter_history(repo: str):
+    """Every history record of repo, oldest first, read from a batched cursor."""
+    records = health_storage.export(repo)
+    try:
+        for record in records:
+            yield _history_row(record)
+    except PyMongoError as e:
+        # Headers are already sent; the export ends short and the log says why.
+        print("Warning: history export for", repo, "failed:", str(e))
+    finally:
+        records.close()
+
+@app.get("/health-history/export")
+async def export_health_history(repo: str, format: str = "ndjson"):
+    """
+    Stream a repo's full health history, oldest first, as NDJSON (default) or
+    CSV. Rows are encoded as the cursor yields them; nothing is buffered whole.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_MEDIA_TYPES)}")
+    return StreamingResponse(
+        export_chunks(_iter_history(repo), HISTORY_FIELDS, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(repo, format)}"'},
+    )
+
+@app.get("/health-trend")
+async def health_trend(
+    repo: str,
+    bucket: str = "day",
+    since: Optional[str] = Query(None, alias="from"),
+    until: Optional[str] = Query(None, alias="to"),
+):
+    """
+    Health trend for a repo, one point per hour/day/week bucket that has PRs,
+    oldest first, from the bucket containing `from` up to `to` (ISO dates or
+    datetimes, UTC). Served from pre-aggregated rollups, never from raw history.
+    """
+    try:
+        points = await run_db(health_storage.trend, repo, bucket, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PyMongoError:
+        raise HTTPException(status_code=500, detail="DB error")
+    return {"repo": repo, "bucket": bucket, "points": points}
+
+def _rebuild_rollups(repo: str) -> int:
+    health_storage.rollups.clear(repo)
+    count = 0
+    chunk: List[Dict[str, Any]] = []
+    for record in health_storage.export(repo, batch_size=1000):
+        chunk.append(record)
+        if len(chunk) == 1000:
+            health_storage.rollups.apply(chunk)
+            count += len(chunk)
+            chunk = []
+    health_storage.rollups.apply(chunk)
+    return count + len(chunk)
+
+@app.post("/health-trend/rebuild")
+async def rebuild_health_trend(repo: str):
+    """
+    Recompute a repo's rollups from its stored history, e.g. for PRs recorded
+    before rollups existed. PRs recorded while this runs may be counted twice.
+    """
+    if repo_collection is None:
+        # In-memory rollups are updated with every PR and cannot drift; the
+        # store may no longer hold every record they count.
+        return {"repo": repo, "records": None}
+    try:
+        records = await run_db(_rebuild_rollups, repo)
     except PyMongoError:
         raise HTTPException(status_code=500, detail="DB error")
+    return {"repo": repo, "records": records}
+
+def _read_summary(repo: str) -> Dict[str, Any]:
+    summary = health_storage.summary(repo)
+    summary["recent"] = [
+        {
+            "pr_number": r.get("pr_number"),
+            "score": r.get("score", 0),
+            "timestamp": r.get("timestamp"),
+            "author": r.get("author"),
+            "overall_health": r.get("overall_health"),
+        }
+        for r in _read_history(repo, RECENT_LIMIT)
+    ]
+    return summary
 
 @app.get("/repo-summary")
-async def repo_summary_endpoint(repo: str):
+async def repo_summary_endpoint(request: Request, repo: str):
     """
     Return the summary document for a repo (from repo_summary collection or in-memory).
     Contains current_health (current overall health) and stats.
     """
-    # Prefer repo_health data as source of truth.
-    if repo_collection is not None:
-        try:
-            cursor = (
-                repo_collection.find({"repo": repo})
-                .sort("timestamp", pymongo.DESCENDING)
-            )
-            rows = list(cursor)
-            if not rows:
-                return {
-                    "repo": repo,
-                    "total_prs": 0,
-                    "cumulative_score": 0,
-                    "avg_score": 0.0,
-                    "current_health": INITIAL_REPO_HEALTH,
-                    "recent": [],
-                }
-            total = len(rows)
-            cumulative = sum(r.get("pr_score", r.get("score", 0)) for r in rows)
-            avg = (cumulative / total) if total else 0.0
-            current_health = rows[0].get("overall_health", INITIAL_REPO_HEALTH)
-            recent = [
-                {
-                    "pr_number": r.get("pr_number"),
-                    "score": r.get("pr_score", r.get("score", 0)),
-                    "timestamp": r.get("timestamp"),
-                    "author": r.get("author"),
-                    "overall_health": r.get("overall_health"),
-                }
-                for r in rows[:RECENT_LIMIT]
-            ]
-            return {
-                "repo": repo,
-                "total_prs": total,
-                "cumulative_score": cumulative,
-                "avg_score": avg,
-                "current_health": current_health,
-                "recent": recent,
-                "updated_at": rows[0].get("timestamp"),
-            }
-        except PyMongoError:
-            raise HTTPException(status_code=500, detail="DB error")
-
-    # In-memory summary fallback
-    s = _in_memory_summary.get(repo)
-    if not s:
-        # synthesize from in-memory history if no summary entry exists
-        rows = [r for r in reversed(_in_memory_history) if r.get("repo") == repo]
-        total = len(rows)
-        cumulative = sum(r.get("pr_score", r.get("score", 0)) for r in rows)
-        avg = (cumulative / total) if total else 0.0
-        recent = rows[:RECENT_LIMIT]
-        current_health = s.get("current_health") if s else INITIAL_REPO_HEALTH
-        return {"repo": repo, "total_prs": total, "cumulative_score": cumulative, "avg_score": avg, "current_health": current_health, "last": recent[0] if recent else None, "recent": recent}
-    return s
+    return await _cached_read(request, ("repo-summary", repo), repo, lambda: _repo_summary(repo))
 
+async def _repo_summary(repo: str) -> Dict[str, Any]:
+    # With MongoDB, the incrementally maintained repo_summary document: one
+    # indexed lookup, however many PRs the repo has.
+    try:
+        return await run_db(_read_summary, repo)
+    except PyMongoError:
+        raise HTTPException(status_code=500, detail="DB error")
+
+
+@app.post("/repo-summary/reconcile")
+async def reconcile_repo_summary(repo: Optional[str] = None):
+    """
+    Check repo_summary against repo_health (one repo, or all) and repair drift.
+    Also runs every SUMMARY_RECONCILE_INTERVAL seconds in the background.
+    """
+    try:
+        return await run_db(_reconcile_summaries, repo)
+    except PyMongoError:
+        raise HTTPException(status_code=500, detail="DB error")
 
 @app.get("/repos")
-async def list_repos(limit: int = 50):
+async def list_repos(request: Request, limit: int = 50, cursor: Optional[str] = None):
     """
-    Returns a list of repo summary documents for dashboard listing.
+    Returns a page of repo summaries for dashboard listing, most recently updated
+    first. Pass the returned next_cursor back as cursor for the following page.
     """
-    if repo_collection is not None:
-        try:
-            pipeline = [
-                {"$sort": {"timestamp": -1}},
-                {
-                    "$group": {
-                        "_id": "$repo",
-                        "repo": {"$first": "$repo"},
-                        "current_health": {"$first": "$overall_health"},
-                        "updated_at": {"$first": "$timestamp"},
-                        "total_prs": {"$sum": 1},
-                        "cumulative_score": {
-                            "$sum": {"$ifNull": ["$pr_score", "$score"]}
-                        },
-                    }
-                },
-                {
-                    "$addFields": {
-                        "avg_score": {
-                            "$cond": [
-                                {"$gt": ["$total_prs", 0]},
-                                {"$divide": ["$cumulative_score", "$total_prs"]},
-                                0,
-                            ]
-                        }
-                    }
-                },
-                {"$sort": {"updated_at": -1}},
-                {"$limit": limit},
-                {"$project": {"_id": 0}},
-            ]
-            repos = list(repo_collection.aggregate(pipeline))
-            return {"repos": repos}
-        except PyMongoError:
-            raise HTTPException(status_code=500, detail="DB error")
-
-    repos = list(_in_memory_summary.values())
-    repos.sort(key=lambda r: r.get("updated_at") or "", reverse=True)
-    return {"repos": repos[:limit]}
+    limit = max(1, min(limit, MAX_REPOS_PAGE))
+    try:
+        after = decode_cursor(cursor, 2)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Any repo's write can change the listing: scoped to None.
+    return await _cached_read(request, ("repos", limit, cursor), None, lambda: _repos_page(limit, after))
+
+async def _repos_page(limit: int, after: Optional[List[Any]]) -> Dict[str, Any]:
+    try:
+        repos = await run_db(health_storage.repos, limit + 1, tuple(after) if after is not None else None)
+    except PyMongoError:
+        raise HTTPException(status_code=500, detail="DB error")
+
+    next_cursor = None
+    if len(repos) > limit:
+        repos = repos[:limit]
+        next_cursor = encode_cursor([repos[-1].get("updated_at"), repos[-1]["repo"]])
+    return {"repos": repos, "next_cursor": next_cursor}
@@ -0,0 +1,113 @@
+"""
+Benchmark: one prompt with the whole diff versus map-reduce chunked analysis
+(backend-ai/app/ai/chunked.py), across PR sizes.
+
+The stub model's latency grows with prompt size (--latency-per-kchar, like a
+real model's prefill), so a single huge prompt is slow while chunks of bounded
+size run side by side.
+
+    python backend/bench/bench_chunked_analysis.py --files 10 50 200 500 --concurrency 4 8
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR / "backend-ai"))
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.ai.chunked import iter_chunk_results, merge_chunk_results, plan_chunks  # noqa: E402
+from app.ai.openrouter import create_async_client  # noqa: E402
+from shared.analysis.diff_compaction import compact_diff  # noqa: E402
+from shared.analysis.diff_index import parse_diff  # noqa: E402
+from stub_llm import StubLLMServer  # noqa: E402
+
+LINES = [
+    "+    if token is None:",
+    "+        raise PermissionError('missing token')",
+    "+    rows = db.query(sql, params)",
+    "+    return render(template, context)",
+    "     logger.debug('unchanged context line')",
+    "-    legacy_call(arguments)",
+]
+
+
+def make_diff(files: int, lines_per_file: int = 40, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for i in range(files):
+        path = f"pkg{i % 12}/module_{i}.py"
+        body = [rng.choice(LINES) for _ in range(lines_per_file)]
+        old = sum(1 for line in body if line[0] in " -")
+        new = sum(1 for line in body if line[0] in " +")
+        parts.append(f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n")
+        parts.append(f"@@ -1,{old} +1,{new} @@\n" + "\n".join(body) + "\n")
+    return "".join(parts)
+
+
+async def ask(client, diff_text: str) -> dict:
+    response = await client.chat.completions.create(
+        model="stub",
+        messages=[{"role": "user", "content": f"Review this diff as JSON.\n{diff_text}"}],
+    )
+    return json.loads(response.choices[0].message.content)
+
+
+async def single_prompt(client, diff: str) -> float:
+    start = time.perf_counter()
+    await ask(client, diff)
+    return time.perf_counter() - start
+
+
+async def chunked(client, diff: str, budget: int, max_chunks: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    chunks = plan_chunks(parse_diff(diff), budget, max_chunks)
+
+    async def analyze(position, chunk):
+        return await ask(client, compact_diff(chunk, budget).text)
+
+    results = {}
+    async for position, result in iter_chunk_results(chunks, analyze, concurrency):
+        results[position] = result
+    merge_chunk_results([results[p] for p in range(len(chunks))])
+    return time.perf_counter() - start
+
+
+async def main_async(args) -> None:
+    with StubLLMServer(latency=args.latency, latency_per_kchar=args.latency_per_kchar) as server:
+        client = create_async_client(api_key="stub", base_url=server.base_url)
+        await ask(client, "")  # warm up the connection pool
+        header = f"{'files':>6} {'diff KB':>8} {'single':>9}"
+        header += "".join(f" {f'chunked c={c}':>13}" for c in args.concurrency)
+        print(header)
+        for files in args.files:
+            diff = make_diff(files)
+            row = f"{files:>6} {len(diff) / 1024:>8.0f}"
+            row += f" {await single_prompt(client, diff) * 1000:>7.0f}ms"
+            for concurrency in args.concurrency:
+                elapsed = await chunked(client, diff, args.budget, args.max_chunks, concurrency)
+                row += f" {elapsed * 1000:>11.0f}ms"
+            print(row)
+        await client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 50, 200, 500])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--budget", type=int, default=12000, help="prompt tokens per chunk")
+    parser.add_argument("--max-chunks", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub base latency (s)")
+    parser.add_argument(
+        "--latency-per-kchar", type=float, default=0.01, help="stub latency per 1000 prompt chars (s)"
+    )
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: cold start of backend/main.py in each BACKEND_MOUNT_MODE.
+
+Every run is a fresh interpreter, so imports are never warm. It reports the time
+to import backend.main, to finish the startup handlers (what uvicorn waits for
+before it accepts connections), the first response from / and the first
+response from each service's /health, which in lazy mode includes loading it.
+
+Set MONGODB_URI (or pass --mongodb-uri) to include the MongoDB connection; an
+unreachable address shows the 5s server selection wait that eager mode puts in
+front of every request.
+
+    python backend/bench/bench_cold_start.py --runs 5
+    python backend/bench/bench_cold_start.py --mongodb-uri mongodb://127.0.0.1:1
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+
+MODES = ("eager", "lazy", "background")
+SERVICES = ("/api", "/ai", "/db")
+
+# Runs in the child interpreter; prints one JSON object of millisecond timings.
+CHILD = """
+import json, sys, time
+import httpx  # used by the test client only; not part of the timings
+started = time.perf_counter()
+sys.path.insert(0, {repo!r})
+from backend.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    ready = time.perf_counter()
+    client.get("/")
+    root = time.perf_counter()
+    timings = {{"import": imported - started, "startup": ready - imported, "first /": root - ready}}
+    for prefix in {services!r}:
+        begin = time.perf_counter()
+        client.get(prefix + "/health")
+        timings["first " + prefix] = time.perf_counter() - begin
+print(json.dumps({{name: seconds * 1000 for name, seconds in timings.items()}}))
+"""
+
+
+def run_once(mode: str, env: dict, cwd: str) -> dict:
+    env = dict(env, BACKEND_MOUNT_MODE=mode)
+    code = CHILD.format(repo=str(REPO_DIR), services=SERVICES)
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=cwd, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--mongodb-uri", default=os.environ.get("MONGODB_URI", ""))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            MONGODB_URI=args.mongodb_uri,
+            HEALTH_DB_PATH=str(Path(tmp) / "health.db"),
+            PYTHONDONTWRITEBYTECODE="1",
+        )
+        columns = None
+        for mode in args.modes.split(","):
+            runs = [run_once(mode, env, tmp) for _ in range(args.runs)]
+            if columns is None:
+                columns = list(runs[0])
+                print(f"{'median ms':<11}" + "".join(f"{name:>12}" for name in columns))
+            medians = [statistics.median(run[name] for run in runs) for name in columns]
+            print(f"{mode:<11}" + "".join(f"{value:>12.1f}" for value in medians))
+
+
+if __name__ == "__main__":
+    main()
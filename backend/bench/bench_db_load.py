@@ -0,0 +1,143 @@
+"""
+Load test: backend-db under concurrent mixed reads and writes, with MongoDB
+calls made on the event loop ("inline", how the endpoints used to call pymongo)
+versus on the bounded Mongo executor (run_db).
+
+Requests go to the ASGI app in-process at a fixed --rate, each a write
+(POST /analyze-pr, with probability --write-ratio) or one of the reads
+(/health-history, /repo-summary, /repos). Latency percentiles are reported per
+endpoint.
+
+With MONGODB_URI set this runs against that server, in a throwaway database that
+is dropped afterwards (a local mongod: mongodb://127.0.0.1:27017). Otherwise the
+collections are the stand-in from mongo_standin.py with --rtt of latency per
+call, which shows the queueing but says nothing about server-side costs.
+
+    python backend/bench/bench_db_load.py --rate 300 --seconds 10
+    MONGODB_URI=mongodb://127.0.0.1:27017 python backend/bench/bench_db_load.py
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from bench_summary_update import use_collections  # noqa: E402
+
+REPOS = 50
+READ_PARAMS = {
+    "/health-history": lambda repo: {"repo": repo, "limit": 20},
+    "/repo-summary": lambda repo: {"repo": repo},
+    "/repos": lambda repo: {"limit": 20},
+}
+READS = tuple(READ_PARAMS)
+
+
+def load_backend_db(name: str):
+    spec = importlib.util.spec_from_file_location(name, BACKEND_DIR / "backend-db" / "src" / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def inline(func, *args):
+    return func(*args)
+
+
+def percentile(values, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+async def drive(db, rate: float, seconds: float, write_ratio: float) -> dict:
+    """
+    Open loop: requests are due at a fixed rate whether or not earlier ones
+    finished, and latency runs from when a request was due, so time spent
+    waiting for a blocked event loop is counted.
+    """
+    latencies = {"POST /analyze-pr": []}
+    latencies.update({f"GET {path}": [] for path in READS})
+    rng = random.Random(1)
+
+    async def request(http, due: float, n: int) -> None:
+        repo = f"org/repo{rng.randrange(REPOS)}"
+        if rng.random() < write_ratio:
+            label = "POST /analyze-pr"
+            response = await http.post("/analyze-pr", json={"repo": repo, "pr_number": n, "lint_passed": n % 3 != 0})
+        else:
+            path = rng.choice(READS)
+            label = f"GET {path}"
+            response = await http.get(path, params=READ_PARAMS[path](repo))
+        response.raise_for_status()
+        latencies[label].append(time.perf_counter() - due)
+
+    await db.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=db.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend-db") as http:
+            start = time.perf_counter()
+            tasks = []
+            for n in range(int(rate * seconds)):
+                due = start + n / rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.ensure_future(request(http, due, n)))
+            await asyncio.gather(*tasks)
+    finally:
+        await db.app.router.shutdown()
+    return latencies
+
+
+def report(label: str, latencies: dict) -> None:
+    print(f"{label}:")
+    for endpoint, values in latencies.items():
+        values.sort()
+        print(
+            f"  {endpoint:<22} {len(values):>7}"
+            f"  p50 {percentile(values, 0.50) * 1000:>8.2f} ms"
+            f"  p95 {percentile(values, 0.95) * 1000:>8.2f} ms"
+            f"  p99 {percentile(values, 0.99) * 1000:>8.2f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200, help="requests per second")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--rtt", type=float, default=0.002, help="stand-in latency per Mongo call (s)")
+    parser.add_argument("--modes", default="inline,executor")
+    args = parser.parse_args()
+
+    uri = os.environ.get("MONGODB_URI", "").strip()
+    for mode in args.modes.split(","):
+        if uri:
+            os.environ["MONGODB_DB"] = f"bench_db_load_{uuid.uuid4().hex[:8]}"
+        db = load_backend_db(f"backend_db_load_{mode}")
+        if not uri:
+            use_collections(db, args.rtt)
+        if mode == "inline":
+            db.run_db = db.analysis_pipeline.run_sync = inline
+        try:
+            latencies = asyncio.run(drive(db, args.rate, args.seconds, args.write_ratio))
+        finally:
+            if uri:
+                db.mongo_client.drop_database(os.environ["MONGODB_DB"])
+                db.mongo_client.close()
+        report(mode, latencies)
+    if not uri:
+        print(f"(stand-in collections, {args.rtt * 1000:.1f} ms per call; set MONGODB_URI for a real server)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Timings for every HealthStorage backend: bulk insert throughput, history,
+summary and trend latency and export throughput. Their conformance tests are
+in shared/test/test_storage.py.
+
+SQLite runs on a temporary file. Mongo uses MONGODB_URI (a throwaway database,
+dropped afterwards) when it is set, and the in-process stand-in from
+mongo_standin.py otherwise; stand-in timings say nothing about a real server.
+
+    python backend/bench/bench_health_storage.py --records 100000
+    python backend/bench/bench_health_storage.py --backends sqlite,memory
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from shared.storage.memory import MemoryHealthStorage, MemoryHistoryStore  # noqa: E402
+from shared.storage.mongo import MongoHealthStorage  # noqa: E402
+from shared.storage.sqlite import SQLiteHealthStorage, SQLiteStore  # noqa: E402
+
+START = datetime(2026, 1, 1)
+
+
+def ts(seconds: int) -> str:
+    return (START + timedelta(seconds=seconds)).isoformat()
+
+
+def record(repo: str, n: int, seconds: int) -> dict:
+    return {
+        "repo": repo,
+        "pr_number": n,
+        "timestamp": ts(seconds),
+        "score": n % 7,
+        "health_delta": -(n % 3),
+        "overall_health": None,
+        "reason": f"r{n}",
+    }
+
+
+# ---- backends ----
+def open_sqlite(tmp: str, name: str):
+    return SQLiteHealthStorage(SQLiteStore(Path(tmp) / f"{name}.db"))
+
+
+def open_memory(tmp: str, name: str):
+    return MemoryHealthStorage(MemoryHistoryStore(per_repo_limit=1_000_000, max_records=10_000_000))
+
+
+def open_mongo(tmp: str, name: str):
+    uri = os.environ.get("MONGODB_URI", "").strip()
+    if not uri:
+        from mongo_standin import Collection
+
+        return MongoHealthStorage(Collection(name), rollups=Collection(f"{name}-rollups"))
+    import pymongo
+
+    client = pymongo.MongoClient(uri, serverSelectionTimeoutMS=5000)
+    db = client[f"bench_health_storage_{uuid.uuid4().hex[:8]}"]
+    storage = MongoHealthStorage(db["repo_health"], rollups=db["repo_health_rollup"])
+    close = storage.close
+
+    def drop() -> None:
+        close()
+        client.drop_database(db.name)
+        client.close()
+
+    storage.close = drop
+    return storage
+
+
+BACKENDS = {"sqlite": open_sqlite, "memory": open_memory, "mongo": open_mongo}
+
+
+# ---- performance ----
+def performance(storage, records: int, repos: int, batch: int) -> str:
+    data = [record(f"org/repo{n % repos}", n, n) for n in range(records)]
+    start = time.perf_counter()
+    for first in range(0, records, batch):
+        storage.insert_many(data[first:first + batch])
+    insert = records / (time.perf_counter() - start)
+
+    def latency(call) -> float:
+        samples = []
+        for _ in range(200):
+            repo = f"org/repo{random.randrange(repos)}"
+            begin = time.perf_counter()
+            call(repo)
+            samples.append(time.perf_counter() - begin)
+        return statistics.median(samples) * 1000
+
+    history = latency(lambda repo: storage.history(repo, 20))
+    summary = latency(storage.summary)
+    start = time.perf_counter()
+    exported = sum(1 for _ in storage.export(batch_size=1000))
+    export = exported / (time.perf_counter() - start)
+    if exported != records:
+        raise AssertionError(f"exported {exported} of {records} records")
+    trend = latency(lambda repo: storage.trend(repo, "day"))
+    return (
+        f"insert {insert:>9.0f}/s  history p50 {history:>7.3f} ms  summary p50 {summary:>7.3f} ms"
+        f"  trend p50 {trend:>7.3f} ms  export {export:>9.0f}/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", default="sqlite,memory,mongo")
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--repos", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=500, help="records per insert_many")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.backends.split(","):
+            label = name
+            if name == "mongo" and not os.environ.get("MONGODB_URI", "").strip():
+                label = "mongo*"
+            storage = BACKENDS[name](tmp, name)
+            try:
+                print(f"{label:<8} {performance(storage, args.records, args.repos, args.batch)}")
+            finally:
+                storage.close()
+    if "mongo" in args.backends and not os.environ.get("MONGODB_URI", "").strip():
+        print("* in-process stand-in (MONGODB_URI not set)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: LiveHub (shared/live.py) fan-out to many idle subscribers.
+
+Each subscriber is driven the way StreamingResponse drives /subscribe: a task
+iterating the hub's stream and handing frames to a (here, discarding) sender.
+Reports memory per idle subscriber, the CPU the idle subscribers use, and the
+time from publish() until every subscriber has the event.
+
+    python backend/bench/bench_live_fanout.py --subscribers 10000 --events 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from shared.live import LiveHub  # noqa: E402
+
+
+async def run(subscribers: int, events: int) -> None:
+    hub = LiveHub(max_subscribers=subscribers, keepalive=0)
+    done = asyncio.Event()
+    reached = 0  # subscribers that have the latest event
+
+    async def consume(slot: int) -> None:
+        nonlocal reached
+        # Only every other subscriber filters, so both paths are exercised.
+        stream = await hub.subscribe(["org/a"] if slot % 2 else None)
+        async for frame in stream:
+            if b"event: pr" in frame:
+                reached += frame.count(b"event: pr")
+                if reached == subscribers:
+                    done.set()
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.ensure_future(consume(slot)) for slot in range(subscribers)]
+    while hub.subscribers < subscribers:
+        await asyncio.sleep(0.01)
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - base) / subscribers
+    tracemalloc.stop()
+
+    cpu = time.process_time()
+    await asyncio.sleep(1.0)
+    idle_cpu = time.process_time() - cpu
+
+    latencies = []
+    for n in range(events):
+        reached = 0
+        done.clear()
+        start = time.perf_counter()
+        hub.publish("org/a", "pr", {"repo": "org/a", "pr_number": n, "current_health": 100 - n})
+        await done.wait()
+        latencies.append(time.perf_counter() - start)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies.sort()
+    print(
+        f"{subscribers:>7} subscribers  {per_subscriber / 1024:>5.1f} KiB each"
+        f"  idle CPU {idle_cpu * 1000:>5.1f} ms/s"
+        f"  fan-out p50 {statistics.median(latencies) * 1000:>7.2f} ms"
+        f"  max {latencies[-1] * 1000:>7.2f} ms"
+        f"  ({statistics.median(latencies) / subscribers * 1e6:.2f} us/subscriber)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", default="1000,10000", help="comma-separated counts")
+    parser.add_argument("--events", type=int, default=50)
+    args = parser.parse_args()
+    for count in args.subscribers.split(","):
+        asyncio.run(run(int(count), args.events))
+
+
+if __name__ == "__main__":
+    main()
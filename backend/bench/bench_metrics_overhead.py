@@ -0,0 +1,83 @@
+"""
+Benchmark: cost of the /metrics instrumentation (shared/metrics.py), enabled
+versus METRICS_ENABLED=0.
+
+Each mode runs in a fresh interpreter (the flag is read at import): the
+aggregated app serves --requests in-process requests to a cheap route and to
+/api/analyze-pr, and a tight loop measures one labelled histogram observation.
+
+    python backend/bench/bench_metrics_overhead.py --requests 3000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+
+CHILD = r"""
+import asyncio, json, sys, time
+sys.path.insert(0, {repo!r})
+import httpx
+from backend.main import app
+from shared.metrics import registry
+
+PR = {{"repo": "org/a", "pr_number": 1, "author": "a", "additions": 10, "deletions": 2,
+       "changed_files": 1, "diff": "+x = 1\n", "lint_passed": True}}
+
+async def main(requests):
+    await app.router.startup()
+    out = {{}}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            for label, call in (
+                ("GET /api/health", lambda: http.get("/api/health")),
+                ("POST /api/analyze-pr", lambda: http.post("/api/analyze-pr?stages=structural,semantic", json=PR)),
+            ):
+                for _ in range(200):
+                    await call()
+                start = time.perf_counter()
+                for _ in range(requests):
+                    await call()
+                out[label] = (time.perf_counter() - start) / requests * 1e6
+    finally:
+        await app.router.shutdown()
+    histogram = registry.histogram("bench_seconds", "bench", ("op",))
+    start = time.perf_counter()
+    for _ in range(200000):
+        histogram.labels("x").observe(0.001)
+    out["labels().observe()"] = (time.perf_counter() - start) / 200000 * 1e6
+    print(json.dumps(out))
+
+asyncio.run(main({requests}))
+"""
+
+
+def run(enabled: bool, requests: int, cwd: str) -> dict:
+    env = dict(os.environ, METRICS_ENABLED="1" if enabled else "0", HEALTH_DB_PATH=str(Path(cwd) / "health.db"))
+    env.pop("MONGODB_URI", None)
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(repo=str(REPO_DIR), requests=requests)],
+        env=env, cwd=cwd, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as cwd:
+        results = {mode: run(mode == "enabled", args.requests, cwd) for mode in ("disabled", "enabled")}
+    for label in results["enabled"]:
+        off, on = results["disabled"][label], results["enabled"][label]
+        print(f"{label:<24} disabled {off:>8.2f} us  enabled {on:>8.2f} us  (+{on - off:.2f} us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: a new OpenAI client per request (the old run_ai_analysis behavior)
+versus the shared, pooled client from backend-ai/app/ai/openrouter.py.
+
+Runs against a local stub OpenAI-compatible server, so it measures client-side
+cost only: client construction, TCP connection setup and pool reuse.
+
+    python backend/bench/bench_openrouter_client.py --requests 200 --concurrency 8
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from openai import OpenAI
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend-ai"))
+
+from app.ai.openrouter import create_client  # noqa: E402
+from stub_llm import StubLLMServer  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Summarize this diff: +print('hi')"}]
+
+
+def _call(client: OpenAI) -> float:
+    start = time.perf_counter()
+    client.chat.completions.create(model="stub", messages=MESSAGES)
+    return time.perf_counter() - start
+
+
+def per_request_client(base_url: str) -> float:
+    start = time.perf_counter()
+    client = OpenAI(api_key="stub", base_url=base_url)
+    _call(client)
+    client.close()
+    return time.perf_counter() - start
+
+
+def run(label: str, fn, requests: int, concurrency: int, server: StubLLMServer) -> None:
+    connections_before = server.connections
+    start = time.perf_counter()
+    if concurrency == 1:
+        latencies = [fn() for _ in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(lambda _: fn(), range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{label:<34} {requests / elapsed:>8.1f} req/s"
+        f"  p50 {statistics.median(latencies) * 1000:>7.2f} ms"
+        f"  p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:>7.2f} ms"
+        f"  connections {server.connections - connections_before:>4}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.005, help="stub model latency (s)")
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency) as server:
+        pooled = create_client(api_key="stub", base_url=server.base_url)
+        for concurrency in (1, args.concurrency):
+            print(f"-- concurrency {concurrency}")
+            run(
+                "new client per request",
+                lambda: per_request_client(server.base_url),
+                args.requests,
+                concurrency,
+                server,
+            )
+            run("shared pooled client", lambda: _call(pooled), args.requests, concurrency, server)
+        pooled.close()
+
+
+if __name__ == "__main__":
+    main()
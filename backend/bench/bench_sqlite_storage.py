@@ -0,0 +1,150 @@
+"""
+Benchmark: concurrent repo_health writes and /health-history reads, old
+SQLite setup versus shared/storage/sqlite.py.
+
+"legacy" is what backend-api and backend-ai did before: one connection shared by
+all threads behind a lock, rollback journal, no index, a commit per insert.
+"store" is SQLiteHealthStorage, as the services run it: WAL, a connection per
+thread, the (repo, timestamp) index, records tagged with their source and
+record_id, rollups updated in the same transaction. Both start from the same
+preloaded records in a temporary directory.
+
+    python backend/bench/bench_sqlite_storage.py --rows 200000 --writers 4 --readers 8
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from shared.storage.sqlite import SQLiteHealthStorage, SQLiteStore  # noqa: E402
+
+REPOS = 500
+# The statements backend-api and backend-ai used to run.
+LEGACY_INSERT = "INSERT INTO repo_health (repo, timestamp, score, reason) VALUES (?, ?, ?, ?)"
+LEGACY_RECENT = "SELECT timestamp, score, reason FROM repo_health WHERE repo = ? ORDER BY timestamp DESC LIMIT ?"
+
+
+class Legacy:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS repo_health (repo TEXT, timestamp TEXT, score INTEGER, reason TEXT)"
+        )
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def insert_many(self, records) -> None:
+        with self.lock:
+            for r in records:
+                self.conn.execute(LEGACY_INSERT, (r["repo"], r["timestamp"], r["score"], r["reason"]))
+                self.conn.commit()
+
+    def history(self, repo: str, limit: int = 20):
+        with self.lock:
+            return self.conn.execute(LEGACY_RECENT, (repo, limit)).fetchall()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def make_record(repo: str, timestamp: str, score: int) -> dict:
+    return {
+        "repo": repo,
+        "pr_number": None,
+        "timestamp": timestamp,
+        "score": score,
+        "health_delta": 0,
+        "overall_health": None,
+        "reason": "",
+        "record_id": uuid.uuid4().hex,
+    }
+
+
+def make_records(count: int, start: datetime):
+    return [
+        make_record(f"org/repo{i % REPOS}", (start + timedelta(seconds=i)).isoformat(), random.choice((0, 10)))
+        for i in range(count)
+    ]
+
+
+def open_legacy(path: str, records) -> Legacy:
+    legacy = Legacy(path)
+    legacy.conn.executemany(LEGACY_INSERT, [(r["repo"], r["timestamp"], r["score"], r["reason"]) for r in records])
+    legacy.conn.commit()
+    return legacy
+
+
+def open_store(path: str, records) -> SQLiteHealthStorage:
+    storage = SQLiteHealthStorage(SQLiteStore(path), source="backend-api")
+    storage.insert_many(records)
+    return storage
+
+
+def run(label: str, store, writers: int, readers: int, seconds: float) -> None:
+    stop = threading.Event()
+    writes = [0] * writers
+    read_latencies = [[] for _ in range(readers)]
+    clock = datetime(2030, 1, 1)
+
+    def writer(slot: int) -> None:
+        n = 0
+        while not stop.is_set():
+            n += 1
+            ts = (clock + timedelta(microseconds=slot * 10_000_000 + n)).isoformat()
+            store.insert_many([make_record(f"org/repo{random.randrange(REPOS)}", ts, 10)])
+            writes[slot] += 1
+
+    def reader(slot: int) -> None:
+        while not stop.is_set():
+            start = time.perf_counter()
+            store.history(f"org/repo{random.randrange(REPOS)}", 20)
+            read_latencies[slot].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(value for values in read_latencies for value in values)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    print(
+        f"{label:<8} writes {sum(writes) / seconds:>8.0f}/s"
+        f"  reads {len(latencies) / seconds:>8.0f}/s"
+        f"  read p50 {statistics.median(latencies) * 1000 if latencies else 0:>7.2f} ms"
+        f"  p95 {p95 * 1000:>7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000, help="preloaded records")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    records = make_records(args.rows, datetime(2025, 1, 1))
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, factory in (("legacy", open_legacy), ("store", open_store)):
+            store = factory(str(Path(tmp) / f"{label}.db"), records)
+            run(label, store, args.writers, args.readers, args.seconds)
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: backend-db summary maintenance per analyzed PR, old round-trip
+pattern versus the single pipeline update in backend-db/src/main.py.
+
+There is no mongod here, so collections are the in-process stand-in from
+mongo_standin.py with a fixed latency per call (--rtt), which is what the
+round-trip count costs against a real server.
+
+    python backend/bench/bench_summary_update.py --prs 200 --rtt 0.002
+"""
+
+import argparse
+import importlib.util
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from mongo_standin import Collection  # noqa: E402
+from shared.analysis.analyze_pull_request import triage  # noqa: E402
+from shared.storage.mongo import MongoHealthStorage  # noqa: E402
+
+
+def load_backend_db():
+    os.environ.pop("MONGODB_URI", None)
+    spec = importlib.util.spec_from_file_location(
+        "backend_db_bench", BACKEND_DIR / "backend-db" / "src" / "main.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_doc(db, repo: str, number: int) -> dict:
+    pr = db.PRRequest(repo=repo, pr_number=number, lint_passed=number % 4 != 0).dict()
+    return db._health_doc(pr, triage(pr, "Mock"))
+
+
+def legacy_record(db, doc: dict) -> None:
+    """The previous flow: pipeline update, avg_score update, re-read, insert."""
+    summary = db._update_repo_summary([doc])
+    total = summary.get("total_prs", 0)
+    avg = summary.get("cumulative_score", 0) / total if total else 0.0
+    db.repo_summary.update_one({"repo": doc["repo"]}, {"$set": {"avg_score": avg}})
+    summary = db.repo_summary.find_one({"repo": doc["repo"]})
+    doc["overall_health"] = summary["current_health"]
+    db.repo_collection.insert_one(doc)
+
+
+def current_record(db, doc: dict) -> None:
+    db._record_batch([doc])
+
+
+def use_collections(db, rtt: float) -> None:
+    db.repo_summary = Collection("repo_summary", rtt)
+    db.repo_collection = Collection("repo_health", rtt)
+    # Trend rollups are not what this measures: no latency, not counted.
+    db.health_storage = MongoHealthStorage(
+        db.repo_collection, Collection("repo_health_rollup"), db.repo_summary, create_indexes=False
+    )
+
+
+def run(label, db, record, prs: int, rtt: float) -> dict:
+    use_collections(db, rtt)
+    latencies = []
+    for number in range(prs):
+        doc = make_doc(db, f"org/repo{number % 5}", number)
+        start = time.perf_counter()
+        record(db, doc)
+        latencies.append(time.perf_counter() - start)
+    round_trips = db.repo_summary.round_trips + db.repo_collection.round_trips
+    latencies.sort()
+    print(
+        f"{label:<28} {round_trips / prs:>5.1f} round trips/PR"
+        f"  p50 {statistics.median(latencies) * 1000:>6.2f} ms"
+        f"  p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:>6.2f} ms"
+    )
+    return {doc["repo"]: doc for doc in db.repo_summary.docs}
+
+
+def run_batch(db, prs: int, batch: int, rtt: float) -> None:
+    use_collections(db, rtt)
+    start = time.perf_counter()
+    for first in range(0, prs, batch):
+        docs = [make_doc(db, f"org/repo{n % 5}", n) for n in range(first, min(first + batch, prs))]
+        db._record_batch(docs)
+    elapsed = time.perf_counter() - start
+    round_trips = db.repo_summary.round_trips + db.repo_collection.round_trips
+    print(
+        f"{f'_record_batch x{batch}':<28} {round_trips / prs:>5.1f} round trips/PR"
+        f"  {elapsed / prs * 1000:>6.2f} ms/PR amortized"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prs", type=int, default=200)
+    parser.add_argument("--rtt", type=float, default=0.002, help="latency per Mongo call (s)")
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+
+    db = load_backend_db()
+    legacy = run("legacy (3 summary calls)", db, legacy_record, args.prs, args.rtt)
+    current = run("single pipeline update", db, current_record, args.prs, args.rtt)
+    run_batch(db, args.prs, args.batch, args.rtt)
+
+    fields = ("total_prs", "cumulative_score", "avg_score", "current_health")
+    for repo, summary in legacy.items():
+        assert all(summary[f] == current[repo][f] for f in fields), repo
+    print("summaries match:", ", ".join(fields))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+In-process stand-in for the slice of the pymongo Collection API the backend
+uses, with an artificial per-call latency to model network round trips.
+
+It understands equality and comparison filters, operator and pipeline updates
+($set / $addFields stages with the expression operators backend-db uses),
+bulk_write of UpdateOne requests, sort/limit/skip cursors and simple
+aggregations ($match, $sort, $group, $limit, $skip, $project, $addFields). It is for benchmarks only: no indexes, and
+anything outside that slice raises NotImplementedError.
+"""
+
+import copy
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+from pymongo import ReturnDocument
+
+_ids = itertools.count(1)
+
+
+def _get(doc, path):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _set(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def evaluate(expr, doc):
+    """Evaluate an aggregation expression against ``doc``."""
+    if isinstance(expr, str):
+        return _get(doc, expr[1:]) if expr.startswith("$") else expr
+    if isinstance(expr, list):
+        return [evaluate(item, doc) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) == 1:
+        op, arg = next(iter(expr.items()))
+        if op.startswith("$"):
+            return _operator(op, arg, doc)
+    return {key: evaluate(value, doc) for key, value in expr.items()}
+
+
+def _operator(op, arg, doc):
+    if op == "$literal":
+        return arg
+    args = evaluate(arg, doc) if op != "$cond" else arg
+    if op == "$ifNull":
+        return next((value for value in args[:-1] if value is not None), args[-1])
+    if op == "$add":
+        return sum(args)
+    if op == "$subtract":
+        return args[0] - args[1]
+    if op == "$multiply":
+        result = 1
+        for value in args:
+            result *= value
+        return result
+    if op == "$divide":
+        return args[0] / args[1]
+    if op in ("$gt", "$gte", "$lt", "$lte", "$eq", "$ne"):
+        return _compare(op, args[0], args[1])
+    if op == "$cond":
+        if isinstance(arg, dict):
+            arg = [arg["if"], arg["then"], arg["else"]]
+        return evaluate(arg[1] if evaluate(arg[0], doc) else arg[2], doc)
+    if op == "$concatArrays":
+        return [item for array in args for item in array]
+    if op == "$slice":
+        return args[0][: args[1]] if args[1] >= 0 else args[0][args[1]:]
+    if op == "$size":
+        return len(args)
+    if op == "$max":
+        return max(args) if isinstance(args, list) else args
+    if op == "$min":
+        return min(args) if isinstance(args, list) else args
+    raise NotImplementedError(op)
+
+
+def _compare(op, left, right):
+    if op == "$eq":
+        return left == right
+    if op == "$ne":
+        return left != right
+    if left is None or right is None:
+        return False
+    if op == "$gt":
+        return left > right
+    if op == "$gte":
+        return left >= right
+    if op == "$lt":
+        return left < right
+    return left <= right
+
+
+def matches(doc, query):
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            for op, operand in condition.items():
+                if op == "$in":
+                    if value not in operand:
+                        return False
+                elif op == "$nin":
+                    if value in operand:
+                        return False
+                elif op == "$exists":
+                    if (value is not None) != bool(operand):
+                        return False
+                elif not _compare(op, value, operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _sort_key(spec):
+    def key(doc):
+        parts = []
+        for field, direction in spec:
+            value = _get(doc, field)
+            # None sorts first ascending, like BSON null.
+            parts.append((_Reverse if direction < 0 else _Forward)((value is not None, value)))
+        return parts
+
+    return key
+
+
+class _Forward:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value < other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class _Reverse(_Forward):
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def _project(doc, projection):
+    if not projection:
+        return doc
+    include = {key for key, flag in projection.items() if flag and key != "_id"}
+    if include:
+        result = {key: doc[key] for key in include if key in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {key: value for key, value in doc.items() if projection.get(key, 1)}
+
+
+def _normalize_sort(key, direction=None):
+    if isinstance(key, str):
+        return [(key, direction if direction is not None else 1)]
+    return list(key)
+
+
+class Cursor:
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        self._sort = _normalize_sort(key, direction)
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def batch_size(self, count):
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        docs = self._collection._run(self._query, self._sort, self._skip, self._limit)
+        return iter([_project(doc, self._projection) for doc in docs])
+
+
+class Collection:
+    """A thread-safe, latency-injecting stand-in for pymongo's Collection."""
+
+    def __init__(self, name="collection", latency=0.0):
+        self.name = name
+        self.latency = latency
+        self.round_trips = 0
+        self.docs = []
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _run(self, query, sort=None, skip=0, limit=0):
+        self._round_trip()
+        with self._lock:
+            docs = [copy.deepcopy(doc) for doc in self.docs if matches(doc, query)]
+        if sort:
+            docs.sort(key=_sort_key(sort))
+        docs = docs[skip:]
+        return docs[:limit] if limit else docs
+
+    # ---- reads ----
+    def find(self, query=None, projection=None, **kwargs):
+        cursor = Cursor(self, query, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    def find_one(self, query=None, projection=None, **kwargs):
+        docs = list(self.find(query, projection, **kwargs).limit(1))
+        return docs[0] if docs else None
+
+    def count_documents(self, query, **kwargs):
+        return len(self._run(query))
+
+    def aggregate(self, pipeline, **kwargs):
+        self._round_trip()
+        with self._lock:
+            docs = [copy.deepcopy(doc) for doc in self.docs]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif name == "$sort":
+                docs.sort(key=_sort_key(list(spec.items())))
+            elif name == "$limit":
+                docs = docs[:spec]
+            elif name == "$skip":
+                docs = docs[spec:]
+            elif name in ("$addFields", "$set"):
+                for doc in docs:
+                    for field, expr in spec.items():
+                        _set(doc, field, evaluate(expr, doc))
+            elif name == "$project":
+                docs = [_project_stage(doc, spec) for doc in docs]
+            elif name == "$group":
+                docs = _group(docs, spec)
+            else:
+                raise NotImplementedError(name)
+        return iter(docs)
+
+    # ---- writes ----
+    def create_index(self, keys, **kwargs):
+        self._round_trip()
+        return "_".join(f"{field}_{direction}" for field, direction in _normalize_sort(keys))
+
+    def insert_one(self, doc, session=None):
+        self._round_trip()
+        with self._lock:
+            doc.setdefault("_id", next(_ids))
+            self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc["_id"], acknowledged=True)
+
+    def insert_many(self, docs, ordered=True, session=None):
+        self._round_trip()
+        with self._lock:
+            for doc in docs:
+                doc.setdefault("_id", next(_ids))
+                self.docs.append(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_ids=[doc["_id"] for doc in docs], acknowledged=True)
+
+    def update_one(self, query, update, upsert=False, session=None):
+        self._round_trip()
+        with self._lock:
+            before, after, upserted = self._update(query, update, upsert)
+        return SimpleNamespace(
+            matched_count=0 if before is None else 1,
+            modified_count=int(before is not None and before != after),
+            upserted_id=after["_id"] if upserted else None,
+        )
+
+    def find_one_and_update(
+        self, query, update, projection=None, upsert=False,
+        return_document=ReturnDocument.BEFORE, session=None, **kwargs
+    ):
+        self._round_trip()
+        with self._lock:
+            before, after, _ = self._update(query, update, upsert)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return None if doc is None else _project(copy.deepcopy(doc), projection)
+
+    def bulk_write(self, requests, ordered=True, session=None):
+        """UpdateOne requests only, applied in one round trip."""
+        self._round_trip()
+        upserted = 0
+        with self._lock:
+            for request in requests:
+                if type(request).__name__ != "UpdateOne":
+                    raise NotImplementedError(type(request).__name__)
+                _, _, was_upserted = self._update(request._filter, request._doc, request._upsert)
+                upserted += was_upserted
+        return SimpleNamespace(upserted_count=upserted, acknowledged=True)
+
+    def delete_many(self, query, session=None):
+        self._round_trip()
+        with self._lock:
+            kept = [doc for doc in self.docs if not matches(doc, query)]
+            deleted, self.docs = len(self.docs) - len(kept), kept
+        return SimpleNamespace(deleted_count=deleted)
+
+    def _update(self, query, update, upsert):
+        target = next((doc for doc in self.docs if matches(doc, query)), None)
+        upserted = False
+        if target is None:
+            if not upsert:
+                return None, None, False
+            target = {key: value for key, value in query.items() if not key.startswith("$")}
+            target["_id"] = next(_ids)
+            self.docs.append(target)
+            upserted = True
+        before = None if upserted else copy.deepcopy(target)
+        if isinstance(update, list):
+            for stage in update:
+                (name, spec), = stage.items()
+                if name not in ("$set", "$addFields"):
+                    raise NotImplementedError(name)
+                values = {field: evaluate(expr, target) for field, expr in spec.items()}
+                for field, value in values.items():
+                    _set(target, field, value)
+        else:
+            for op, fields in update.items():
+                for field, value in fields.items():
+                    if op == "$set" or (op == "$setOnInsert" and upserted):
+                        _set(target, field, value)
+                    elif op == "$inc":
+                        _set(target, field, (_get(target, field) or 0) + value)
+                    elif op in ("$max", "$min"):
+                        current = _get(target, field)
+                        pick = max if op == "$max" else min
+                        _set(target, field, value if current is None else pick(current, value))
+                    elif op != "$setOnInsert":
+                        raise NotImplementedError(op)
+        return before, target, upserted
+
+
+def _project_stage(doc, spec):
+    if all(value in (0, False) for value in spec.values()):
+        return _project(doc, spec)
+    result = {}
+    if spec.get("_id", 1) and "_id" in doc:
+        result["_id"] = doc["_id"]
+    for field, value in spec.items():
+        if field == "_id":
+            continue
+        if value in (1, True):
+            if field in doc:
+                result[field] = doc[field]
+        else:
+            result[field] = evaluate(value, doc)
+    return result
+
+
+def _group(docs, spec):
+    groups = {}
+    order = []
+    for doc in docs:
+        key = evaluate(spec["_id"], doc)
+        hashable = repr(key)
+        if hashable not in groups:
+            groups[hashable] = {"_id": key}
+            order.append(hashable)
+        group = groups[hashable]
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expr), = accumulator.items()
+            value = evaluate(expr, doc)
+            if op == "$sum":
+                group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+            elif op == "$first":
+                group.setdefault(field, value)
+            elif op == "$last":
+                group[field] = value
+            elif op == "$max":
+                group[field] = value if field not in group else max(group[field], value)
+            elif op == "$min":
+                group[field] = value if field not in group else min(group[field], value)
+            elif op == "$push":
+                group.setdefault(field, []).append(value)
+            else:
+                raise NotImplementedError(op)
+    return [groups[key] for key in order]
@@ -0,0 +1,141 @@
+"""
+Local OpenAI-compatible stub server used by the benchmarks.
+
+It answers POST /v1/chat/completions with a fixed JSON analysis after an
+optional artificial latency, over HTTP/1.1 keep-alive, so client-side costs
+(connection setup, pooling, concurrency) can be measured without a real model.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_ANALYSIS = {
+    "summary": "Stub analysis.",
+    "risks": [],
+    "suggestions": ["Add tests."],
+    "health_delta": 0,
+}
+
+
+class StubLLMServer:
+    """
+    Run the stub in a background thread::
+
+        with StubLLMServer(latency=0.05) as server:
+            client = OpenAI(api_key="stub", base_url=server.base_url)
+
+    ``latency`` is a fixed delay per call; ``latency_per_kchar`` adds delay
+    proportional to the prompt size, to mimic a model's prefill time.
+    """
+
+    def __init__(self, latency: float = 0.0, latency_per_kchar: float = 0.0, content=None):
+        self.latency = latency
+        self.latency_per_kchar = latency_per_kchar
+        self.content = json.dumps(content or STUB_ANALYSIS)
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "StubLLMServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", "0"))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages", []))
+                delay = stub.latency + stub.latency_per_kchar * prompt_chars / 1000
+                if delay:
+                    time.sleep(delay)
+                if request.get("stream"):
+                    self._stream(request)
+                else:
+                    self._complete(request, prompt_chars)
+
+            def _complete(self, request, prompt_chars):
+                body = json.dumps(
+                    {
+                        "id": "stub",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": stub.content},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": prompt_chars // 4,
+                            "completion_tokens": len(stub.content) // 4,
+                            "total_tokens": (prompt_chars + len(stub.content)) // 4,
+                        },
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, request):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                pieces = [stub.content[i:i + 16] for i in range(0, len(stub.content), 16)]
+                for piece in pieces + [None]:
+                    chunk = {
+                        "id": "stub",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "delta": {"content": piece} if piece else {},
+                                "finish_reason": None if piece else "stop",
+                            }
+                        ],
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
@@ -1,10 +1,14 @@
+import asyncio
+import os
 import sys
 from importlib.util import module_from_spec, spec_from_file_location
 from pathlib import Path
+from typing import List, Optional
 
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
 from starlette.routing import Mount, Route
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -16,6 +20,14 @@ BACKEND_DB_DIR = BASE_DIR / "backend-db"
 for directory in (BACKEND_API_DIR, BACKEND_AI_DIR, BACKEND_DB_DIR):
     sys.path.insert(0, str(directory))
 
+# Code shared by the services lives in backend/shared
+if str(BASE_DIR) not in sys.path:
+    sys.path.append(str(BASE_DIR))
+
+from shared.analysis.pipeline import observe_stages  # noqa: E402
+from shared.live import TooManySubscribers, hub  # noqa: E402
+from shared.metrics import MEDIA_TYPE, MetricsMiddleware, registry as metrics  # noqa: E402
+
 
 def _load_app(module_name: str, module_path: Path):
     if not module_path.exists():
@@ -30,15 +42,132 @@ def _load_app(module_name: str, module_path: Path):
     return module.app
 
 
-api_app = _load_app("backend_api_main", BACKEND_API_DIR / "src" / "main.py")
-ai_app = _load_app("backend_ai_main", BACKEND_AI_DIR / "src" / "main.py")
-db_app = _load_app("backend_db_main", BACKEND_DB_DIR / "src" / "main.py")
+# When the services are imported and started. Importing them pulls in openai and
+# pymongo, opens the SQLite files and waits up to 5s for MongoDB, so:
+#   eager       at import, before the server accepts anything (the default)
+#   lazy        on the first request under a service's prefix
+#   background  in parallel threads as soon as the server is up; requests that
+#               arrive for a service before it is ready wait for it
+BACKEND_MOUNT_MODE = os.environ.get("BACKEND_MOUNT_MODE", "eager").strip().lower()
+if BACKEND_MOUNT_MODE not in ("eager", "lazy", "background"):
+    raise ValueError("BACKEND_MOUNT_MODE must be eager, lazy or background")
+
+
+class LazyApp:
+    """
+    ASGI app standing in for a service until it is needed: the first request
+    (or warm()) imports the module in a worker thread and runs its startup
+    handlers, and concurrent requests wait for that one load. A failed load is
+    retried by the next request.
+    """
+
+    def __init__(self, module_name: str, module_path: Path):
+        self.module_name = module_name
+        self.module_path = module_path
+        self.app: Optional[FastAPI] = None
+        self._started = False
+        self._loading: Optional[asyncio.Future] = None
+
+    def load_now(self) -> FastAPI:
+        """Import the service in this thread; its startup still runs in startup()."""
+        if self.app is None:
+            self.app = _load_app(self.module_name, self.module_path)
+        return self.app
+
+    def warm(self) -> "asyncio.Future":
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load())
+        return self._loading
+
+    async def _load(self) -> FastAPI:
+        try:
+            if self.app is None:
+                self.app = await run_in_threadpool(_load_app, self.module_name, self.module_path)
+            await self.startup()
+        except BaseException:
+            self._loading = None
+            raise
+        return self.app
+
+    async def get(self) -> FastAPI:
+        if self._started:
+            return self.app
+        # shield: a client that disconnects must not cancel the load for everyone.
+        return await asyncio.shield(self.warm())
+
+    async def startup(self) -> None:
+        # Only once it succeeded: get() keeps retrying a service whose startup raised.
+        if self.app is not None and not self._started:
+            await self.app.router.startup()
+            self._started = True
+
+    async def shutdown(self) -> None:
+        if self._loading is not None and not self._loading.done():
+            # Let an in-flight load finish so the service's resources get closed.
+            await asyncio.wait([self._loading])
+        if self._started:
+            self._started = False
+            await self.app.router.shutdown()
+
+    async def __call__(self, scope, receive, send):
+        service_app = await self.get()
+        await service_app(scope, receive, send)
+
+
+SERVICES = {
+    "/api": LazyApp("backend_api_main", BACKEND_API_DIR / "src" / "main.py"),
+    "/ai": LazyApp("backend_ai_main", BACKEND_AI_DIR / "src" / "main.py"),
+    "/db": LazyApp("backend_db_main", BACKEND_DB_DIR / "src" / "main.py"),
+}
+
+if BACKEND_MOUNT_MODE == "eager":
+    for service in SERVICES.values():
+        service.load_now()
 
 app = FastAPI(title="AI Repo Supervisor Backend")
 
-app.mount("/api", api_app)
-app.mount("/ai", ai_app)
-app.mount("/db", db_app)
+for prefix, service in SERVICES.items():
+    app.mount(prefix, service)
+
+# Scraped from /metrics. With METRICS_ENABLED=0 none of this is installed and the
+# services' timers are no-ops.
+if metrics.enabled:
+    # Latency of every route, mounted services included.
+    app.add_middleware(MetricsMiddleware)
+
+    STAGE_SECONDS = metrics.histogram(
+        "analysis_stage_duration_seconds",
+        "Stages of the PR analysis pipeline (batch: heuristics across the process pool), by outcome.",
+        ("stage", "outcome"),
+    )
+    observe_stages(
+        lambda stage, seconds, failed: STAGE_SECONDS.labels(stage, "error" if failed else "ok").observe(seconds)
+    )
+    metrics.callback(
+        "backend_service_started", "Whether a mounted service is loaded and started.", "gauge", ("service",),
+        lambda: [((prefix,), int(service._started)) for prefix, service in SERVICES.items()],
+    )
+    metrics.callback(
+        "live_subscribers", "Open /subscribe streams.", "gauge", (), lambda: [((), hub.subscribers)]
+    )
+
+
+# Starlette does not run startup/shutdown handlers of mounted apps; forward them.
+@app.on_event("startup")
+async def start_services():
+    if BACKEND_MOUNT_MODE == "eager":
+        for service in SERVICES.values():
+            # Through warm(), so a request arriving meanwhile waits for this startup.
+            await service.warm()
+    elif BACKEND_MOUNT_MODE == "background":
+        for service in SERVICES.values():
+            service.warm()
+
+
+@app.on_event("shutdown")
+async def stop_services():
+    for service in SERVICES.values():
+        await service.shutdown()
 
 
 @app.get("/")
@@ -53,13 +182,44 @@ def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_exposition():
+    """Prometheus text format: request, LLM, storage, cache and pipeline metrics."""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+    return Response(metrics.render(), media_type=MEDIA_TYPE)
+
+
+@app.get("/subscribe")
+async def subscribe(request: Request, repo: Optional[List[str]] = Query(None)):
+    """
+    Server-sent events instead of polling /db/repos and /db/repo-summary: a
+    `pr` event for every PR the db service records (repo, pr_number,
+    current_health, health_delta, pr_score, risks), for the given repos or all.
+    On reconnect the browser's Last-Event-ID resumes the stream; a `resync`
+    event means events were missed (or the server restarted since the id was
+    sent) and the client should refetch.
+    """
+    try:
+        events = await hub.subscribe(repo, request.headers.get("last-event-id"))
+    except TooManySubscribers as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx would otherwise hold events back.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 def _collect_routes(app_instance: FastAPI, prefix: str = ""):
     routes = []
     for route in app_instance.routes:
         if isinstance(route, Mount):
             mount_prefix = f"{prefix}{route.path}"
-            if isinstance(route.app, FastAPI):
-                routes.extend(_collect_routes(route.app, mount_prefix))
+            mounted = route.app.app if isinstance(route.app, LazyApp) else route.app
+            if isinstance(mounted, FastAPI):
+                routes.extend(_collect_routes(mounted, mount_prefix))
         elif isinstance(route, APIRoute):
             methods = sorted(m for m in (route.methods or []) if m not in {"HEAD", "OPTIONS"})
             routes.append(
@@ -82,7 +242,9 @@ def _collect_routes(app_instance: FastAPI, prefix: str = ""):
 
 
 @app.get("/dashboard/routes", response_class=JSONResponse)
-def dashboard_routes():
+async def dashboard_routes():
+    # The listing covers every service, so load any that are deferred.
+    await asyncio.gather(*(service.get() for service in SERVICES.values()))
     routes = _collect_routes(app)
     routes.sort(key=lambda r: (r["path"], ",".join(r["methods"])))
     return {"routes": routes}
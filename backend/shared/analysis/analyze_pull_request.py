@@ -0,0 +1,308 @@
+# backend/shared/analysis/analyze_pull_request.py
+
+from shared.analysis.diff_scanner import scan_diff
+from shared.analysis.keyword_matcher import DEFAULT_MATCHER
+
+# Part of the analysis cache key: bump it whenever the output for the same
+# input changes, so cached results from older logic are not served.
+ANALYZER_VERSION = "3"
+# What cache keys use: the version plus the loaded risk rules.
+ANALYZER_CACHE_VERSION = f"{ANALYZER_VERSION}:{DEFAULT_MATCHER.fingerprint}"
+
+BUILTIN_DOMAINS = ("auth", "db", "infra", "config")
+
+
+def analyze_pull_request(input: dict, diff_index=None) -> dict:
+    """
+    Heuristic PR analysis. ``diff_index`` may be a DiffIndex already parsed from
+    ``input["diff"]``, so callers that need the parsed diff do not parse it twice.
+
+    The parse, structural, semantic and synthesis stages of
+    shared.analysis.pipeline, run back to back.
+    """
+    signals = parse_pass(input, diff_index)
+    return synthesize(input, structural_pass(input, signals), semantic_pass(input, signals))
+
+
+def parse_pass(input: dict, diff_index=None):
+    """Per-file signals of the diff (see scan_diff)."""
+    return scan_diff(diff_index if diff_index is not None else input.get("diff", ""))
+
+
+# -----------------------------
+# Structural pass
+# -----------------------------
+def structural_pass(input: dict, signals) -> dict:
+    """Size and surface area: what changed, not what the change means."""
+    additions = input.get("additions", 0)
+    deletions = input.get("deletions", 0)
+    changed_files = input.get("changed_files", 0)
+    file_paths = signals.file_paths
+    top_dirs = sorted({path.split("/")[0] for path in file_paths if "/" in path})
+    extensions = sorted({path.split(".")[-1] for path in file_paths if "." in path})
+
+    total_changes = additions + deletions
+    size_bucket = "small"
+    if total_changes > 300:
+        size_bucket = "large"
+    elif total_changes > 100:
+        size_bucket = "medium"
+
+    structural_signals = [
+        f"Change size: {size_bucket} ({additions} additions, {deletions} deletions).",
+        f"Files changed: {changed_files}.",
+    ]
+
+    if top_dirs:
+        structural_signals.append(f"Directories touched: {', '.join(top_dirs)}.")
+    if extensions:
+        structural_signals.append(f"File types: {', '.join(extensions)}.")
+
+    return {
+        "size_bucket": size_bucket,
+        "many_files": changed_files > 5,
+        "structural_signals": structural_signals,
+        "files": [file_signals.to_dict() for file_signals in signals.files],
+    }
+
+
+# -----------------------------
+# Semantic pass
+# -----------------------------
+def semantic_pass(input: dict, signals) -> dict:
+    """Which sensitive domains and logic the added lines touch."""
+    lint_passed = input.get("lint_passed", True)
+    added_conditionals = signals.added_conditionals
+    tests_touched = signals.tests_touched
+
+    touches_auth = signals.touches("auth")
+    touches_db = signals.touches("db")
+    touches_infra = signals.touches("infra")
+    touches_config = signals.touches("config")
+    # Org-specific domains configured in the risk rules file.
+    extra_domains = sorted(signals.domains - set(BUILTIN_DOMAINS))
+
+    semantic_insights = []
+
+    if added_conditionals > 0:
+        semantic_insights.append(
+            f"Added {added_conditionals} new conditional branches, which can introduce new logic paths."
+        )
+
+    if touches_auth:
+        semantic_insights.append(
+            "Authentication-related logic appears in the diff (auth/token/login)."
+        )
+
+    if touches_db:
+        semantic_insights.append(
+            "Data persistence signals detected (db/database/schema)."
+        )
+
+    if touches_infra or touches_config:
+        semantic_insights.append(
+            "Operational configuration or infrastructure may be affected."
+        )
+
+    for domain in extra_domains:
+        files = signals.files_for(domain)
+        location = f" in {', '.join(files)}" if files else ""
+        semantic_insights.append(f"Sensitive {domain} terms appear{location}.")
+
+    if tests_touched:
+        semantic_insights.append("Test files were modified, indicating potential coverage updates.")
+    else:
+        semantic_insights.append("No test files detected in the diff.")
+
+    if not lint_passed:
+        semantic_insights.append(
+            "Lint checks failed; treat other risks as higher confidence."
+        )
+
+    return {
+        "added_conditionals": added_conditionals,
+        "tests_touched": tests_touched,
+        "touches_auth": touches_auth,
+        "touches_db": touches_db,
+        "touches_ops": touches_infra or touches_config,
+        "extra_domains": extra_domains,
+        "semantic_insights": semantic_insights,
+        "domain_hits": {
+            domain: [hit.to_dict() for hit in hits]
+            for domain, hits in signals.domain_hits.items()
+        },
+    }
+
+
+# -----------------------------
+# Synthesis pass
+# -----------------------------
+def synthesize(input: dict, structural=None, semantic=None) -> dict:
+    """
+    Combine the structural and semantic passes (either may be None when that
+    stage did not run) into the analysis result.
+    """
+    additions = input.get("additions", 0)
+    deletions = input.get("deletions", 0)
+    lint_passed = input.get("lint_passed", True)
+    total_changes = additions + deletions
+
+    size_bucket = structural["size_bucket"] if structural else None
+    many_files = bool(structural and structural["many_files"])
+    added_conditionals = semantic["added_conditionals"] if semantic else 0
+    tests_touched = bool(semantic and semantic["tests_touched"])
+    touches_auth = bool(semantic and semantic["touches_auth"])
+    touches_db = bool(semantic and semantic["touches_db"])
+    touches_ops = bool(semantic and semantic["touches_ops"])
+    extra_domains = semantic["extra_domains"] if semantic else []
+
+    synthesis = "Changes appear low risk based on size and surface area."
+    if touches_auth:
+        synthesis = (
+            "This change touches authentication-sensitive logic. A small diff can still introduce"
+            " high-impact failure modes (e.g., auth bypass or token handling errors)."
+        )
+    elif touches_db:
+        synthesis = (
+            "This change touches data persistence. Review for schema drift, migrations, or"
+            " backward compatibility issues."
+        )
+    elif touches_ops:
+        synthesis = (
+            "This change affects operational configuration. Misconfiguration can lead to"
+            " service instability or deployment issues."
+        )
+    elif added_conditionals > 0:
+        synthesis = (
+            "New conditional logic was added. Review edge cases and ensure new branches"
+            " are exercised by tests."
+        )
+
+    # -----------------------------
+    # Summary
+    # -----------------------------
+    summary = "This pull request makes small, focused changes."
+    if size_bucket == "large":
+        summary = "This pull request introduces a large set of changes across the codebase."
+    elif size_bucket == "medium":
+        summary = "This pull request introduces moderate changes affecting multiple areas."
+
+    # -----------------------------
+    # Risks + suggestions
+    # -----------------------------
+    risks = []
+    if size_bucket == "large":
+        risks.append(
+            "Large pull request increases review complexity and the risk of hidden bugs."
+        )
+    if many_files:
+        risks.append(
+            "Changes span many files, increasing the chance of integration issues."
+        )
+    if touches_auth:
+        risks.append(
+            "Authentication-related logic was modified, which is security-sensitive."
+        )
+    if touches_db:
+        risks.append("Data persistence changes can introduce migration or integrity risk.")
+    for domain in extra_domains:
+        risks.append(f"Changes touch the sensitive {domain} domain.")
+    if not lint_passed:
+        risks.append("Lint checks failed, indicating potential code quality problems.")
+
+    suggestions = []
+    if size_bucket == "large":
+        suggestions.append("Consider splitting this pull request into smaller changes.")
+    if not lint_passed:
+        suggestions.append("Resolve lint issues before merging to maintain code quality.")
+    if touches_auth and not tests_touched:
+        suggestions.append("Add or review tests covering authentication edge cases.")
+    if touches_db and not tests_touched:
+        suggestions.append("Add or review tests covering data migrations and queries.")
+    if added_conditionals > 0 and not tests_touched:
+        suggestions.append("Add tests for new logic branches and edge cases.")
+
+    # -----------------------------
+    # Scores
+    # -----------------------------
+    semantic_score = 50
+    if touches_auth:
+        semantic_score += 20
+    if touches_db:
+        semantic_score += 10
+    if many_files:
+        semantic_score += 10
+    if not lint_passed:
+        semantic_score -= 10
+    semantic_score = max(0, min(100, semantic_score))
+
+    # -----------------------------
+    # Health delta
+    # -----------------------------
+    health_delta = 0
+    if size_bucket == "large":
+        health_delta -= 3
+    if not lint_passed:
+        health_delta -= 2
+    if not risks:
+        health_delta += 2
+
+    baseline_score = max(0, 100 - min(total_changes / 10, 50))
+
+    result = {"summary": summary}
+    if structural:
+        result["structural_signals"] = structural["structural_signals"]
+    if semantic:
+        result["semantic_insights"] = semantic["semantic_insights"]
+    result.update(
+        {
+            "synthesis": synthesis,
+            "risks": risks,
+            "suggestions": suggestions,
+            "health_delta": health_delta,
+            "baseline_score": baseline_score,
+        }
+    )
+    if semantic:
+        result["semantic_score"] = semantic_score
+        result["domain_hits"] = semantic["domain_hits"]
+    if structural:
+        result["files"] = structural["files"]
+    return result
+
+
+# -----------------------------
+# Triage
+# -----------------------------
+def triage(input: dict, label: str = "Quick") -> dict:
+    """
+    The quick rules used when neither the heuristic passes nor an LLM run: lint,
+    diff size and net additions only. ``label`` names the analysis in the summary.
+    """
+    lint_passed = input.get("lint_passed", True)
+    risks = []
+    if not lint_passed:
+        risks.append("Lint failures detected")
+    if len(input.get("diff") or "") > 5000:
+        risks.append("Very large diff")
+    if (input.get("additions", 0) - input.get("deletions", 0)) > 500:
+        risks.append("Many additions")
+
+    suggestions = []
+    if not lint_passed:
+        suggestions.append("Fix lint issues")
+    if not risks:
+        suggestions.append("Add unit tests for changed code")
+
+    return {
+        "summary": (
+            f"{label} analysis for {input.get('repo')} PR #{input.get('pr_number')}"
+            f" — {'issues found' if risks else 'low risk'}"
+        ),
+        "risks": risks,
+        "suggestions": suggestions,
+        # pr_score: descriptive metric stored per PR; health_delta: its signed
+        # effect on the repo's health.
+        "health_delta": -5 if risks else 0,
+        "pr_score": 0 if risks else 10,
+    }
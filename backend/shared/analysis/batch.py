@@ -0,0 +1,92 @@
+# backend/shared/analysis/batch.py
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from shared.analysis.analyze_pull_request import analyze_pull_request
+
+# Worker processes for batch analysis; 0 means one per CPU.
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0")) or os.cpu_count() or 1
+# Batches smaller than this are analyzed in the calling process: shipping a few
+# PRs to a worker costs more than it saves.
+MIN_POOL_BATCH = int(os.getenv("ANALYSIS_MIN_POOL_BATCH", "8"))
+# PRs sent to a worker per task, to amortize pickling and IPC.
+MAX_GROUP_SIZE = 32
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def analyze_group(prs: List[dict]) -> List[dict]:
+    return [analyze_pull_request(pr) for pr in prs]
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the process-wide analysis pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS)
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the worker processes (app shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _discard_broken_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _groups(prs: List[dict]) -> List[List[dict]]:
+    size = max(1, min(MAX_GROUP_SIZE, -(-len(prs) // ANALYSIS_WORKERS)))
+    return [prs[start:start + size] for start in range(0, len(prs), size)]
+
+
+def _use_pool(prs: List[dict]) -> bool:
+    return ANALYSIS_WORKERS > 1 and len(prs) >= MIN_POOL_BATCH
+
+
+def analyze_batch(prs: List[dict]) -> List[dict]:
+    """
+    Analyze many PRs across the process pool; results are in input order. If a
+    worker dies, the pool is replaced on next use and this batch runs in-process.
+    """
+    if not _use_pool(prs):
+        return analyze_group(prs)
+    pool = get_process_pool()
+    try:
+        return [result for group in pool.map(analyze_group, _groups(prs)) for result in group]
+    except BrokenProcessPool:
+        _discard_broken_pool(pool)
+        return analyze_group(prs)
+
+
+async def analyze_batch_async(prs: List[dict]) -> List[dict]:
+    """analyze_batch() for the event loop."""
+    loop = asyncio.get_running_loop()
+    if not _use_pool(prs):
+        return await loop.run_in_executor(None, analyze_group, prs)
+    pool = get_process_pool()
+    try:
+        groups = await asyncio.gather(
+            *(loop.run_in_executor(pool, analyze_group, group) for group in _groups(prs))
+        )
+    except BrokenProcessPool:
+        _discard_broken_pool(pool)
+        return await loop.run_in_executor(None, analyze_group, prs)
+    return [result for group in groups for result in group]
@@ -0,0 +1,254 @@
+# backend/shared/analysis/diff_compaction.py
+
+from shared.analysis.diff_index import ADDED, REMOVED, DiffIndex, parse_diff
+from shared.analysis.diff_scanner import _count_conditional_lines
+from shared.analysis.keyword_matcher import DEFAULT_MATCHER
+
+# Rough size of a token for budgeting; close enough for code and English.
+CHARS_PER_TOKEN = 4
+
+# Files whose content says little about risk: listed with their change counts
+# instead of being sent verbatim.
+LOCKFILE_NAMES = {
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "bun.lockb",
+    "poetry.lock",
+    "pipfile.lock",
+    "pdm.lock",
+    "uv.lock",
+    "cargo.lock",
+    "gemfile.lock",
+    "composer.lock",
+    "go.sum",
+    "mix.lock",
+    "flake.lock",
+    "packages.lock.json",
+}
+GENERATED_SUFFIXES = (
+    ".min.js",
+    ".min.css",
+    ".map",
+    ".pb.go",
+    ".pb.h",
+    ".pb.cc",
+    "_pb2.py",
+    "_pb2_grpc.py",
+    ".g.dart",
+    ".designer.cs",
+    ".snap",
+)
+GENERATED_DIRS = {"dist", "__generated__", "generated"}
+VENDORED_DIRS = {"vendor", "vendored", "node_modules", "third_party", "third-party", "bower_components"}
+# Looked for near the top of a new file's content.
+GENERATED_MARKERS = ("@generated", "do not edit")
+_MARKER_WINDOW = 1024
+
+# List at most this many files in the "omitted" note appended to the diff.
+MAX_NOTE_FILES = 40
+_NOTE_LINE_CHARS = 80
+
+
+def estimate_tokens(text_or_length) -> int:
+    length = text_or_length if isinstance(text_or_length, int) else len(text_or_length)
+    return -(-length // CHARS_PER_TOKEN)
+
+
+def summary_kind(path: str, first_added: str = ""):
+    """Return "lockfile", "generated" or "vendored" for files to summarize, else None."""
+    lowered = path.lower()
+    parts = lowered.split("/")
+    if parts[-1] in LOCKFILE_NAMES:
+        return "lockfile"
+    if any(part in VENDORED_DIRS for part in parts[:-1]):
+        return "vendored"
+    if (
+        lowered.endswith(GENERATED_SUFFIXES)
+        or any(part in GENERATED_DIRS for part in parts[:-1])
+        or ".generated." in parts[-1]
+    ):
+        return "generated"
+    head = first_added[:_MARKER_WINDOW].lower()
+    if any(marker in head for marker in GENERATED_MARKERS):
+        return "generated"
+    return None
+
+
+class CompactDiff:
+    """The diff text to put in a prompt plus a report of what was left out."""
+
+    __slots__ = ("text", "report")
+
+    def __init__(self, text: str, report: dict):
+        self.text = text
+        self.report = report
+
+
+def _hunk_end(index: DiffIndex, hunk) -> int:
+    if hunk.end > hunk.start:
+        return hunk.end
+    # A hunk with no body still has its "@@" line.
+    line_end = index.text.find("\n", hunk.start)
+    return len(index.text) if line_end == -1 else line_end + 1
+
+
+def _score_hunk(index: DiffIndex, hunk, path_domains: set, is_test: bool, matcher) -> tuple:
+    """
+    Return (score, additions, deletions) for one hunk. The score comes from its
+    added lines: risk domains (the file path's included) weigh most, then added
+    conditionals; test files rank below code.
+    """
+    text = index.text
+    runs = hunk.runs
+    added_parts = []
+    additions = deletions = 0
+    for i in range(0, len(runs), 4):
+        kind = runs[i]
+        if kind == ADDED:
+            added_parts.append(text[runs[i + 1]:runs[i + 2]])
+            additions += runs[i + 3]
+        elif kind == REMOVED:
+            deletions += runs[i + 3]
+    added = "".join(added_parts).lower()
+    domains = set(path_domains)
+    for _, _, term_domains in matcher.finditer(added):
+        domains.update(term_domains)
+    score = 4 * len(domains) + min(_count_conditional_lines(added), 10) + (0 if added else -1)
+    return (score / 2 if is_test else score + 2), additions, deletions
+
+
+def _omitted_note(summarized: list, dropped: list) -> str:
+    entries = [
+        f"{item['file']}: {item['kind']}, +{item['additions']} -{item['deletions']} lines (summarized)"
+        for item in summarized
+    ]
+    entries.extend(
+        f"{item['file']}: {item['hunks']} hunk(s) omitted, +{item['additions']} -{item['deletions']} lines"
+        for item in dropped
+    )
+    if not entries:
+        return ""
+    shown = entries[:MAX_NOTE_FILES]
+    if len(entries) > len(shown):
+        shown.append(f"... and {len(entries) - len(shown)} more file(s)")
+    return "\n[Omitted from this diff]\n" + "\n".join(shown) + "\n"
+
+
+def compact_diff(diff, token_budget: int, matcher=DEFAULT_MATCHER) -> CompactDiff:
+    """
+    Fit a diff (text or DiffIndex) into roughly ``token_budget`` tokens. Lockfiles,
+    generated and vendored files are replaced by a one-line summary; the remaining
+    hunks are ranked by risk signal and kept greedily, highest first, then emitted
+    in their original order with their file headers. Everything left out is listed
+    in a short note at the end of the text and in ``report``.
+    """
+    index = diff if isinstance(diff, DiffIndex) else parse_diff(diff)
+    text = index.text
+    report = {
+        "token_budget": token_budget,
+        # Counted over the files, so a DiffIndex holding a subset of them works too.
+        "original_tokens": estimate_tokens(
+            sum(file_diff.end - file_diff.start for file_diff in index.files) or len(text)
+        ),
+        "estimated_tokens": 0,
+        "hunks_total": 0,
+        "hunks_included": 0,
+        "summarized": [],
+        "dropped": [],
+        "truncated": False,
+    }
+
+    if not index.files:
+        # Not a unified diff: all we can do is cut it to size.
+        limit = max(token_budget, 0) * CHARS_PER_TOKEN
+        if len(text) > limit:
+            text = text[:limit]
+            report["truncated"] = True
+        report["estimated_tokens"] = estimate_tokens(text)
+        return CompactDiff(text, report)
+
+    candidates = []  # (score, file_position, hunk_position, hunk, additions, deletions)
+    headers = {}
+    for file_position, file_diff in enumerate(index.files):
+        hunks = file_diff.hunks
+        report["hunks_total"] += len(hunks)
+        first_added = next(
+            (text[start:end] for _, start, end, _, _, _ in file_diff.iter_runs(ADDED)), ""
+        )
+        kind = summary_kind(file_diff.path, first_added)
+        if kind is not None:
+            report["summarized"].append(
+                {
+                    "file": file_diff.path,
+                    "kind": kind,
+                    "additions": file_diff.additions,
+                    "deletions": file_diff.deletions,
+                }
+            )
+            continue
+        header_end = hunks[0].start if hunks else file_diff.end
+        headers[file_position] = text[file_diff.start:header_end]
+        lowered_path = file_diff.path.lower()
+        path_domains = matcher.domains_in(lowered_path)
+        is_test = "test" in lowered_path or "spec" in lowered_path
+        if not hunks:
+            # Renames, mode changes and binary files: only the header carries information.
+            candidates.append((4 * len(path_domains), file_position, -1, None, 0, 0))
+        for hunk_position, hunk in enumerate(hunks):
+            score, additions, deletions = _score_hunk(index, hunk, path_domains, is_test, matcher)
+            candidates.append((score, file_position, hunk_position, hunk, additions, deletions))
+
+    candidates.sort(key=lambda item: (-item[0], item[1], item[2]))
+    remaining = token_budget * CHARS_PER_TOKEN - len(_omitted_note(report["summarized"], []))
+    full_size = sum(len(header) for header in headers.values()) + sum(
+        _hunk_end(index, hunk) - hunk.start for _, _, _, hunk, _, _ in candidates if hunk is not None
+    )
+    if full_size > remaining:
+        # Leave room for the lines listing dropped hunks.
+        remaining -= min(remaining // 4, _NOTE_LINE_CHARS * MAX_NOTE_FILES)
+    included_headers = set()
+    included = []
+    dropped_by_file = {}
+    for score, file_position, hunk_position, hunk, additions, deletions in candidates:
+        cost = 0 if file_position in included_headers else len(headers[file_position])
+        if hunk is not None:
+            cost += _hunk_end(index, hunk) - hunk.start
+        if cost <= remaining:
+            remaining -= cost
+            included_headers.add(file_position)
+            if hunk is not None:
+                included.append((file_position, hunk_position, hunk))
+            continue
+        if hunk is None:
+            continue
+        dropped = dropped_by_file.get(file_position)
+        if dropped is None:
+            dropped = dropped_by_file[file_position] = {
+                "file": index.files[file_position].path,
+                "hunks": 0,
+                "additions": 0,
+                "deletions": 0,
+            }
+        dropped["hunks"] += 1
+        dropped["additions"] += additions
+        dropped["deletions"] += deletions
+
+    hunks_by_file = {file_position: [] for file_position in included_headers}
+    for file_position, hunk_position, hunk in included:
+        hunks_by_file[file_position].append((hunk_position, hunk))
+    parts = []
+    for file_position in sorted(hunks_by_file):
+        parts.append(headers[file_position])
+        for _, hunk in sorted(hunks_by_file[file_position], key=lambda item: item[0]):
+            parts.append(text[hunk.start:_hunk_end(index, hunk)])
+
+    report["hunks_included"] = len(included)
+    report["dropped"] = [dropped_by_file[position] for position in sorted(dropped_by_file)]
+    compacted = "".join(parts)
+    if compacted and not compacted.endswith("\n"):
+        compacted += "\n"
+    compacted += _omitted_note(report["summarized"], report["dropped"])
+    report["estimated_tokens"] = estimate_tokens(compacted)
+    return CompactDiff(compacted, report)
@@ -0,0 +1,247 @@
+# backend/shared/analysis/diff_index.py
+
+import re
+from array import array
+
+# Kinds of line runs inside a hunk.
+CONTEXT = 0
+ADDED = 1
+REMOVED = 2
+NO_NEWLINE = 3  # "\ No newline at end of file"
+
+_RUN_PATTERNS = {
+    " ": re.compile(r"(?: [^\n]*\n?)+"),
+    "+": re.compile(r"(?:\+[^\n]*\n?)+"),
+    "-": re.compile(r"(?:-[^\n]*\n?)+"),
+    "\\": re.compile(r"(?:\\[^\n]*\n?)+"),
+}
+_RUN_KINDS = {" ": CONTEXT, "+": ADDED, "-": REMOVED, "\\": NO_NEWLINE}
+
+_HUNK_HEADER_RE = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class Hunk:
+    """
+    One "@@ -a,b +c,d @@" section. Lines are not copied: ``runs`` is a flat
+    array of (kind, start, end, line_count) quadruples, where start/end are
+    offsets into the original diff text.
+    """
+
+    __slots__ = ("old_start", "old_count", "new_start", "new_count", "start", "end", "runs")
+
+    def __init__(self, old_start: int, old_count: int, new_start: int, new_count: int, start: int):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+        self.start = start
+        self.end = start
+        self.runs = array("q")
+
+    def iter_runs(self):
+        """Yield (kind, start, end, line_count, old_lineno, new_lineno) for each run."""
+        runs = self.runs
+        old_lineno, new_lineno = self.old_start, self.new_start
+        for i in range(0, len(runs), 4):
+            kind, start, end, line_count = runs[i], runs[i + 1], runs[i + 2], runs[i + 3]
+            yield kind, start, end, line_count, old_lineno, new_lineno
+            if kind != ADDED and kind != NO_NEWLINE:
+                old_lineno += line_count
+            if kind != REMOVED and kind != NO_NEWLINE:
+                new_lineno += line_count
+
+
+class FileDiff:
+    """One file in the diff: its paths, the text range it covers and its hunks."""
+
+    __slots__ = ("path", "old_path", "start", "end", "hunks", "additions", "deletions")
+
+    def __init__(self, path: str, old_path: str, start: int):
+        self.path = path
+        self.old_path = old_path
+        self.start = start
+        self.end = start
+        self.hunks = []
+        self.additions = 0
+        self.deletions = 0
+
+    def iter_runs(self, kind=None):
+        for hunk in self.hunks:
+            for run in hunk.iter_runs():
+                if kind is None or run[0] == kind:
+                    yield run
+
+
+class DiffIndex:
+    """Parsed view of a unified diff that keeps only offsets into ``text``."""
+
+    __slots__ = ("text", "files")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.files = []
+
+    @property
+    def file_paths(self) -> list:
+        seen = set()
+        paths = []
+        for file_diff in self.files:
+            if file_diff.path and file_diff.path not in seen:
+                seen.add(file_diff.path)
+                paths.append(file_diff.path)
+        return paths
+
+    def slice(self, start: int, end: int) -> str:
+        return self.text[start:end]
+
+    def iter_lines(self, start: int, end: int):
+        """Yield the lines between two offsets, without their line endings."""
+        text = self.text
+        while start < end:
+            line_end = text.find("\n", start, end)
+            if line_end == -1:
+                line_end = end
+            yield text[start:line_end].rstrip("\r")
+            start = line_end + 1
+
+
+def _strip_prefix(path: str, prefix: str) -> str:
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+def _header_path(line: str, prefix: str) -> str:
+    # "+++ b/path\t2024-01-01 ..." -> "path"
+    path = line[4:].split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return ""
+    return _strip_prefix(path, prefix)
+
+
+def _line_end(text: str, start: int, end: int) -> int:
+    line_end = text.find("\n", start, end)
+    return end if line_end == -1 else line_end
+
+
+def _run_end(text: str, start: int, end: int, match_end: int, max_lines: int):
+    """Clamp a matched run to ``max_lines`` lines; return (run_end, line_count)."""
+    line_count = text.count("\n", start, match_end)
+    if match_end == end and not text.endswith("\n", start, end):
+        line_count += 1
+    if line_count <= max_lines:
+        return match_end, line_count
+    run_end = start
+    for _ in range(max_lines):
+        run_end = _line_end(text, run_end, end) + 1
+    return min(run_end, end), max_lines
+
+
+def parse_diff(text: str) -> DiffIndex:
+    """
+    Parse a unified (git or plain) diff in a single pass. Hunk bodies are walked
+    a run of same-kind lines at a time using the hunk header counts, so an added
+    line that happens to look like "+++ b/x" is still treated as content.
+    """
+    index = DiffIndex(text)
+    end = len(text)
+    current = None
+    hunk = None
+    old_left = new_left = 0
+    pos = 0
+
+    while pos < end:
+        if hunk is not None and (old_left > 0 or new_left > 0):
+            char = text[pos]
+            if char == "\n":
+                # Context line whose single leading space was stripped.
+                hunk.runs.extend((CONTEXT, pos, pos + 1, 1))
+                old_left -= 1
+                new_left -= 1
+                pos += 1
+                hunk.end = current.end = pos
+                continue
+            pattern = _RUN_PATTERNS.get(char)
+            if pattern is not None:
+                kind = _RUN_KINDS[char]
+                if kind == ADDED:
+                    max_lines = new_left
+                elif kind == REMOVED:
+                    max_lines = old_left
+                elif kind == CONTEXT:
+                    max_lines = min(old_left, new_left)
+                else:
+                    max_lines = end
+                if max_lines > 0:
+                    match_end = pattern.match(text, pos, end).end()
+                    run_end, line_count = _run_end(text, pos, end, match_end, max_lines)
+                    hunk.runs.extend((kind, pos, run_end, line_count))
+                    if kind == ADDED:
+                        new_left -= line_count
+                        current.additions += line_count
+                    elif kind == REMOVED:
+                        old_left -= line_count
+                        current.deletions += line_count
+                    elif kind == CONTEXT:
+                        old_left -= line_count
+                        new_left -= line_count
+                    pos = run_end
+                    hunk.end = current.end = pos
+                    continue
+            # The header counts were wrong; fall back to line-by-line parsing.
+            hunk = None
+
+        line_end = _line_end(text, pos, end)
+        next_pos = line_end + 1
+
+        if text.startswith("diff --git ", pos):
+            parts = text[pos:line_end].split()
+            old_path = _strip_prefix(parts[2], "a/") if len(parts) >= 4 else ""
+            path = _strip_prefix(parts[3], "b/") if len(parts) >= 4 else ""
+            current = FileDiff(path or old_path, old_path, pos)
+            index.files.append(current)
+            hunk = None
+        elif text.startswith("--- ", pos) and text.startswith("+++ ", next_pos):
+            # Plain unified diff without a "diff --git" line, or the ---/+++
+            # pair of a git file whose header we already saw.
+            old_path = _header_path(text[pos:line_end], "a/")
+            if current is None or current.hunks:
+                current = FileDiff(old_path, old_path, pos)
+                index.files.append(current)
+            elif old_path:
+                current.old_path = old_path
+            hunk = None
+        elif text.startswith("+++ ", pos) and current is not None and not current.hunks:
+            path = _header_path(text[pos:line_end], "b/")
+            if path:
+                current.path = path
+        elif text.startswith("@@ ", pos):
+            header = _HUNK_HEADER_RE.match(text, pos, line_end)
+            if header is not None:
+                if current is None:
+                    current = FileDiff("", "", pos)
+                    index.files.append(current)
+                old_start, old_count, new_start, new_count = header.groups()
+                hunk = Hunk(
+                    int(old_start),
+                    1 if old_count is None else int(old_count),
+                    int(new_start),
+                    1 if new_count is None else int(new_count),
+                    pos,
+                )
+                current.hunks.append(hunk)
+                old_left, new_left = hunk.old_count, hunk.new_count
+        elif (
+            text.startswith("\\", pos)
+            and current is not None
+            and current.hunks
+            and current.end == pos
+        ):
+            # "\ No newline at end of file" right after the last line of a hunk.
+            last_hunk = current.hunks[-1]
+            last_hunk.runs.extend((NO_NEWLINE, pos, min(next_pos, end), 1))
+            last_hunk.end = min(next_pos, end)
+
+        if current is not None:
+            current.end = min(next_pos, end)
+        pos = next_pos
+
+    return index
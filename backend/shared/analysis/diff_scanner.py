@@ -0,0 +1,210 @@
+# backend/shared/analysis/diff_scanner.py
+
+from shared.analysis.diff_index import ADDED, DiffIndex, parse_diff
+from shared.analysis.keyword_matcher import DEFAULT_MATCHER
+
+# Added runs are scanned in newline-aligned blocks of roughly this many characters,
+# so memory stays flat no matter how large a single file's change is.
+BLOCK_SIZE = 64 * 1024
+
+# "elif " contains "if ", so two needles cover every conditional keyword.
+_CONDITIONAL_NEEDLES = ("if ", "switch")
+
+
+# Keep at most this many located hits per domain; further hits are only counted.
+MAX_HITS_PER_DOMAIN = 20
+
+
+class DomainHit:
+    """
+    One risk-domain term found in the diff. ``line`` is the line number in the
+    new version of the file, or None when the term is part of the file path.
+    """
+
+    __slots__ = ("domain", "term", "path", "line")
+
+    def __init__(self, domain: str, term: str, path: str, line):
+        self.domain = domain
+        self.term = term
+        self.path = path
+        self.line = line
+
+    def to_dict(self) -> dict:
+        return {"file": self.path, "line": self.line, "term": self.term}
+
+
+class FileSignals:
+    """Signals for a single file, computed from its path and its added lines."""
+
+    __slots__ = (
+        "path",
+        "additions",
+        "deletions",
+        "added_conditionals",
+        "domain_hits",
+        "domain_hit_counts",
+        "is_test",
+    )
+
+    def __init__(self, path: str, additions: int = 0, deletions: int = 0):
+        self.path = path
+        self.additions = additions
+        self.deletions = deletions
+        self.added_conditionals = 0
+        self.domain_hits = {}
+        self.domain_hit_counts = {}
+        lowered_path = path.lower()
+        self.is_test = "test" in lowered_path or "spec" in lowered_path
+
+    @property
+    def domains(self) -> list:
+        return sorted(self.domain_hit_counts)
+
+    def add_hit(self, hit: DomainHit) -> None:
+        self.domain_hit_counts[hit.domain] = self.domain_hit_counts.get(hit.domain, 0) + 1
+        hits = self.domain_hits.setdefault(hit.domain, [])
+        if len(hits) < MAX_HITS_PER_DOMAIN:
+            hits.append(hit)
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "additions": self.additions,
+            "deletions": self.deletions,
+            "added_conditionals": self.added_conditionals,
+            "domains": self.domains,
+            "is_test": self.is_test,
+        }
+
+
+class DiffSignals:
+    """Per-file signals for a diff plus the totals analyze_pull_request needs."""
+
+    __slots__ = ("index", "files")
+
+    def __init__(self, index: DiffIndex):
+        self.index = index
+        self.files = []
+
+    @property
+    def file_paths(self) -> list:
+        return [file_signals.path for file_signals in self.files if file_signals.path]
+
+    @property
+    def added_conditionals(self) -> int:
+        return sum(file_signals.added_conditionals for file_signals in self.files)
+
+    @property
+    def tests_touched(self) -> bool:
+        return any(file_signals.is_test for file_signals in self.files)
+
+    @property
+    def domains(self) -> set:
+        found = set()
+        for file_signals in self.files:
+            found.update(file_signals.domain_hit_counts)
+        return found
+
+    @property
+    def domain_hits(self) -> dict:
+        """Located hits per domain across all files, capped at MAX_HITS_PER_DOMAIN."""
+        hits = {}
+        for file_signals in self.files:
+            for domain, file_hits in file_signals.domain_hits.items():
+                domain_hits = hits.setdefault(domain, [])
+                domain_hits.extend(file_hits[: MAX_HITS_PER_DOMAIN - len(domain_hits)])
+        return hits
+
+    def touches(self, domain: str) -> bool:
+        return any(domain in file_signals.domain_hit_counts for file_signals in self.files)
+
+    def files_for(self, domain: str) -> list:
+        return [
+            file_signals.path
+            for file_signals in self.files
+            if domain in file_signals.domain_hit_counts
+        ]
+
+
+def iter_diff_blocks(text: str, block_size: int = BLOCK_SIZE, start: int = 0, end=None):
+    """Yield (offset, block) slices of ``text[start:end]`` ending on line boundaries."""
+    end = len(text) if end is None else end
+    while start < end:
+        block_end = text.find("\n", start + block_size, end)
+        block_end = end if block_end == -1 else block_end + 1
+        yield start, text[start:block_end]
+        start = block_end
+
+
+def _line_end(block: str, start: int) -> int:
+    end = block.find("\n", start)
+    return len(block) if end == -1 else end
+
+
+def _count_conditional_lines(lowered: str) -> int:
+    # Find keyword occurrences first and only then look at the line they are on,
+    # so lines without a conditional cost nothing beyond the C-level search.
+    conditional_lines = set()
+    for needle in _CONDITIONAL_NEEDLES:
+        pos = lowered.find(needle)
+        while pos != -1:
+            conditional_lines.add(lowered.rfind("\n", 0, pos) + 1)
+            pos = lowered.find(needle, _line_end(lowered, pos))
+    return len(conditional_lines)
+
+
+def _scan_file(index: DiffIndex, file_diff, block_size: int, matcher) -> FileSignals:
+    file_signals = FileSignals(file_diff.path, file_diff.additions, file_diff.deletions)
+
+    for _, term, domains in matcher.finditer(file_diff.path.lower()):
+        for domain in domains:
+            file_signals.add_hit(DomainHit(domain, term, file_diff.path, None))
+
+    last_line_for_domain = {}
+    for _, start, end, _, _, new_lineno in file_diff.iter_runs(ADDED):
+        for block_start, block in iter_diff_blocks(index.text, block_size, start, end):
+            lowered = block.lower()
+            file_signals.added_conditionals += _count_conditional_lines(lowered)
+
+            line = new_lineno + index.text.count("\n", start, block_start)
+            counted_to = 0
+            for offset, term, domains in matcher.finditer(lowered):
+                line += lowered.count("\n", counted_to, offset)
+                counted_to = offset
+                for domain in domains:
+                    # One hit per domain per line is enough to locate it.
+                    if last_line_for_domain.get(domain) == line:
+                        continue
+                    last_line_for_domain[domain] = line
+                    file_signals.add_hit(DomainHit(domain, term, file_diff.path, line))
+
+    return file_signals
+
+
+def scan_diff(diff, block_size: int = BLOCK_SIZE, matcher=DEFAULT_MATCHER) -> DiffSignals:
+    """
+    Compute per-file signals from a diff (text or an already parsed DiffIndex):
+    added conditionals, risk-domain hits and test-file detection. Only a file's
+    path and its added lines count, so context and removed lines cannot trigger
+    a domain.
+    """
+    index = diff if isinstance(diff, DiffIndex) else parse_diff(diff)
+    signals = DiffSignals(index)
+    files_by_path = {}
+
+    for file_diff in index.files:
+        file_signals = _scan_file(index, file_diff, block_size, matcher)
+        existing = files_by_path.get(file_diff.path)
+        if existing is None:
+            files_by_path[file_diff.path] = file_signals
+            signals.files.append(file_signals)
+            continue
+        # The same path listed twice (e.g. a mode change and a content change).
+        existing.additions += file_signals.additions
+        existing.deletions += file_signals.deletions
+        existing.added_conditionals += file_signals.added_conditionals
+        for hits in file_signals.domain_hits.values():
+            for hit in hits:
+                existing.add_hit(hit)
+
+    return signals
@@ -0,0 +1,121 @@
+# backend/shared/analysis/keyword_matcher.py
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent / "risk_rules.json"
+RISK_RULES_PATH = os.getenv("RISK_RULES_PATH", "").strip()
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern matcher for risk-domain terms.
+
+    All terms are compiled into a single trie-shaped regular expression, so a text
+    is searched once regardless of how many terms or domains are configured. Like
+    Aho-Corasick it reports every occurrence of every term, including overlapping
+    ones ("auth" inside "oauth", "token" and "tokenizer"), but the automaton runs
+    inside the C regex engine instead of a per-character Python loop.
+
+    Terms are matched case-insensitively; callers pass lowercased text.
+    """
+
+    def __init__(self, rules: dict):
+        self.rules = {}
+        self._domains_by_term = {}
+        for domain, terms in rules.items():
+            lowered_terms = sorted({str(term).lower() for term in terms if term})
+            self.rules[domain] = tuple(lowered_terms)
+            for term in lowered_terms:
+                self._domains_by_term.setdefault(term, []).append(domain)
+        # Identifies the rules in cache keys: results computed with other rules
+        # (an edited risk_rules.json, another RISK_RULES_PATH) must not be served.
+        self.fingerprint = hashlib.sha256(
+            json.dumps(self.rules, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+        # The regex reports the longest term starting at each offset; shorter terms
+        # starting at the same offset are recovered from this table.
+        self._terms_at_match = {
+            term: tuple(
+                other for other in self._domains_by_term if term.startswith(other)
+            )
+            for term in self._domains_by_term
+        }
+
+        if self._domains_by_term:
+            self._pattern = re.compile(_trie_pattern(self._domains_by_term))
+        else:
+            self._pattern = None
+
+    @property
+    def domains(self) -> list:
+        return list(self.rules)
+
+    def finditer(self, lowered: str):
+        """Yield (offset, term, domains) for every term occurrence in ``lowered``."""
+        if self._pattern is None:
+            return
+        search = self._pattern.search
+        match = search(lowered)
+        while match is not None:
+            offset = match.start()
+            for term in self._terms_at_match[match.group()]:
+                yield offset, term, self._domains_by_term[term]
+            # Resume one character later so overlapping terms are not skipped.
+            match = search(lowered, offset + 1)
+
+    def domains_in(self, text: str) -> set:
+        found = set()
+        for _, _, domains in self.finditer(text.lower()):
+            found.update(domains)
+        return found
+
+
+def _trie_pattern(terms) -> str:
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [
+            re.escape(char) + build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A term ends here; longer terms are optional continuations.
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+def load_rules(path=None) -> dict:
+    """
+    Load risk-domain rules from a JSON file shaped like
+    ``{"auth": ["auth", "token"], "payments": ["stripe", "card_number"]}``.
+    Defaults to RISK_RULES_PATH, or the bundled risk_rules.json.
+    """
+    rules_path = Path(path or RISK_RULES_PATH or DEFAULT_RULES_PATH)
+    with open(rules_path, encoding="utf-8") as handle:
+        rules = json.load(handle)
+    if not isinstance(rules, dict):
+        raise ValueError(f"Risk rules in {rules_path} must be a JSON object")
+    for domain, terms in rules.items():
+        if not isinstance(terms, list):
+            raise ValueError(f"Risk rules for domain {domain!r} must be a list of terms")
+    return rules
+
+
+# Built once at import time and shared by every analysis.
+DEFAULT_MATCHER = KeywordMatcher(load_rules())
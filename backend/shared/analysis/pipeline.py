@@ -0,0 +1,315 @@
+# backend/shared/analysis/pipeline.py
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import anyio
+
+from shared.analysis.analyze_pull_request import (
+    ANALYZER_CACHE_VERSION,
+    parse_pass,
+    semantic_pass,
+    structural_pass,
+    synthesize,
+    triage,
+)
+from shared.analysis.batch import analyze_batch
+from shared.cache import analysis_key
+
+# In execution order. parse runs when structural or semantic does, synthesis
+# always; the others are chosen per service and per request.
+STAGES = ("parse", "structural", "semantic", "llm", "synthesis", "persist")
+OPTIONAL_STAGES = ("structural", "semantic", "llm", "persist")
+HEURISTIC_STAGES = ("structural", "semantic")
+
+# Process-wide totals per stage: [runs, seconds, failures].
+_stage_totals: Dict[str, List[float]] = {}
+_stage_lock = threading.Lock()
+_observers: List[Callable[[str, float, bool], None]] = []
+
+
+def observe_stages(callback: Callable[[str, float, bool], None]) -> None:
+    """Call callback(stage, seconds, failed) after every stage run (e.g. for metrics)."""
+    _observers.append(callback)
+
+
+def stage_stats() -> Dict[str, Dict[str, float]]:
+    with _stage_lock:
+        return {
+            stage: {"runs": int(runs), "seconds": seconds, "failures": int(failures)}
+            for stage, (runs, seconds, failures) in _stage_totals.items()
+        }
+
+
+def _record_stage(stage: str, seconds: float, failed: bool) -> None:
+    with _stage_lock:
+        totals = _stage_totals.setdefault(stage, [0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += 1 if failed else 0
+    for callback in _observers:
+        callback(stage, seconds, failed)
+
+
+def parse_stages(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """A ``stages`` query value ("structural,semantic") as a tuple; None when absent."""
+    if value is None or not value.strip():
+        return None
+    return tuple(stage.strip() for stage in value.split(",") if stage.strip())
+
+
+class StageTimings:
+    """Wall time per stage of one analysis, in ms. Concurrent stages overlap."""
+
+    def __init__(self):
+        self.ms: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.add(name, time.perf_counter() - start, failed)
+
+    def add(self, name: str, seconds: float, failed: bool = False) -> None:
+        self.ms[name] = round(seconds * 1000, 3)
+        _record_stage(name, seconds, failed)
+
+    def report(self) -> Dict[str, float]:
+        report = {name: self.ms[name] for name in ("cache",) + STAGES if name in self.ms}
+        report["total"] = round((time.perf_counter() - self._started) * 1000, 3)
+        return report
+
+
+class AnalysisPipeline:
+    """
+    PR analysis as stages: parse -> structural -> semantic -> llm -> synthesis
+    -> persist.
+
+    - structural and semantic are the heuristic passes of analyze_pull_request,
+      over the diff that parse scans once. Their result is cached (``cache``)
+      and a hit skips straight to persist.
+    - llm is ``llm(pr)``, an async callable returning a result dict. It runs
+      concurrently with the heuristic passes. A failure falls back to the
+      heuristics (or to triage when they did not run) unless it is one of the
+      ``fatal`` exceptions, which propagate.
+    - synthesis combines what ran: the LLM's result where it has one, with the
+      heuristic detail it lacks; the heuristic result; otherwise triage().
+      ``finish(result)`` then adjusts it for the service.
+    - persist is ``persist([(pr, result), ...])``, synchronous, and may add
+      fields to the results (e.g. overall_health).
+
+    ``stages`` are the optional stages a service runs by default; a request may
+    name others, but only llm and persist if the service provides them.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[str] = HEURISTIC_STAGES,
+        llm: Optional[Callable[[dict], Awaitable[dict]]] = None,
+        persist: Optional[Callable[[List[Tuple[dict, dict]]], None]] = None,
+        cache=None,
+        label: str = "Quick",
+        finish: Optional[Callable[[dict], dict]] = None,
+        fatal: Tuple[type, ...] = (),
+        run_sync: Callable[..., Awaitable[Any]] = anyio.to_thread.run_sync,
+    ):
+        self.llm = llm
+        self.persist = persist
+        self.cache = cache
+        self.label = label
+        self.finish = finish
+        self.fatal = fatal
+        self.run_sync = run_sync
+        self.stages = self.resolve(stages)
+
+    def resolve(self, requested: Optional[Iterable[str]] = None) -> FrozenSet[str]:
+        """The stages to run for a request (None: the defaults). Raises ValueError."""
+        if requested is None:
+            return self.stages
+        requested = set(requested) - {"parse", "synthesis"}
+        unknown = requested - set(OPTIONAL_STAGES)
+        if unknown:
+            raise ValueError(f"unknown stages: {', '.join(sorted(unknown))}; choose from {', '.join(OPTIONAL_STAGES)}")
+        if "llm" in requested and self.llm is None:
+            raise ValueError("the llm stage is not available in this service")
+        if "persist" in requested and self.persist is None:
+            raise ValueError("the persist stage is not available in this service")
+        if requested & set(HEURISTIC_STAGES):
+            requested.add("parse")
+        requested.add("synthesis")
+        return frozenset(requested)
+
+    # ---- synchronous runs (no llm) ----
+    def run(self, pr: dict, stages: Optional[Iterable[str]] = None) -> dict:
+        """One PR, in this thread. The result carries timings_ms."""
+        enabled = self.resolve(stages)
+        if "llm" in enabled:
+            raise ValueError("the llm stage needs arun()")
+        timings = StageTimings()
+        key = self._cache_key(pr, enabled)
+        result = self._cache_get(key, timings)
+        if result is None:
+            structural, semantic = self._heuristics(pr, enabled, timings)
+            result = self._synthesize(pr, structural, semantic, None, key, timings)
+        result = self._finished(result)
+        if "persist" in enabled:
+            with timings.stage("persist"):
+                self.persist([(pr, result)])
+        result["timings_ms"] = timings.report()
+        return result
+
+    def run_many(self, prs: List[dict], stages: Optional[Iterable[str]] = None) -> List[dict]:
+        """
+        Many PRs (a batch): cache first, misses across the analysis process pool,
+        then one persist call for all. Results are in input order, without timings.
+        """
+        enabled = self.resolve(stages)
+        if "llm" in enabled:
+            raise ValueError("the llm stage needs arun()")
+        keys = [self._cache_key(pr, enabled) for pr in prs]
+        results = [self.cache.get(key) if key is not None else None for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing and enabled.issuperset(HEURISTIC_STAGES):
+            # All heuristic stages at once in the worker processes, reported as "batch".
+            start = time.perf_counter()
+            failed = True
+            try:
+                fresh = analyze_batch([prs[i] for i in missing])
+                failed = False
+            finally:
+                _record_stage("batch", time.perf_counter() - start, failed)
+        else:
+            fresh = [self._synthesize(prs[i], *self._heuristics(prs[i], enabled, None), None, None, None) for i in missing]
+        for i, result in zip(missing, fresh):
+            if keys[i] is not None:
+                self.cache.put(keys[i], result)
+            results[i] = result
+        results = [self._finished(result) for result in results]
+        if "persist" in enabled and prs:
+            start = time.perf_counter()
+            failed = True
+            try:
+                self.persist(list(zip(prs, results)))
+                failed = False
+            finally:
+                _record_stage("persist", time.perf_counter() - start, failed)
+        return results
+
+    # ---- event loop ----
+    async def arun(self, pr: dict, stages: Optional[Iterable[str]] = None) -> dict:
+        """
+        One PR from the event loop: heuristic passes in a worker thread while the
+        LLM call is in flight, persist in a worker thread. Carries timings_ms.
+        """
+        enabled = self.resolve(stages)
+        timings = StageTimings()
+        key = self._cache_key(pr, enabled)
+        result = None
+        if key is not None:
+            start = time.perf_counter()
+            result = await self.cache.aget(key)
+            timings.add("cache", time.perf_counter() - start)
+        if result is None:
+            llm = asyncio.ensure_future(self._run_llm(pr, timings)) if "llm" in enabled else None
+            structural = semantic = None
+            try:
+                if "parse" in enabled:
+                    structural, semantic = await self.run_sync(self._heuristics, pr, enabled, timings)
+                llm_result = await llm if llm is not None else None
+            finally:
+                if llm is not None and not llm.done():
+                    llm.cancel()
+            result = self._synthesize(pr, structural, semantic, llm_result, None, timings)
+            if key is not None:
+                await self.cache.aput(key, result)
+        result = self._finished(result)
+        if "persist" in enabled:
+            with timings.stage("persist"):
+                await self.run_sync(self.persist, [(pr, result)])
+        result["timings_ms"] = timings.report()
+        return result
+
+    async def _run_llm(self, pr: dict, timings: StageTimings) -> Optional[dict]:
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await self.llm(pr)
+            failed = False
+            return result
+        except self.fatal:
+            raise
+        except Exception as e:
+            print("Warning: llm stage failed, using the heuristic result:", e)
+            return None
+        finally:
+            timings.add("llm", time.perf_counter() - start, failed)
+
+    # ---- stages ----
+    def _heuristics(self, pr: dict, enabled: FrozenSet[str], timings: Optional[StageTimings]):
+        structural = semantic = None
+        if "parse" not in enabled:
+            return structural, semantic
+        with self._stage(timings, "parse"):
+            signals = parse_pass(pr)
+        if "structural" in enabled:
+            with self._stage(timings, "structural"):
+                structural = structural_pass(pr, signals)
+        if "semantic" in enabled:
+            with self._stage(timings, "semantic"):
+                semantic = semantic_pass(pr, signals)
+        return structural, semantic
+
+    def _synthesize(self, pr, structural, semantic, llm_result, key, timings) -> dict:
+        with self._stage(timings, "synthesis"):
+            if structural is not None or semantic is not None:
+                result = synthesize(pr, structural, semantic)
+            elif llm_result is None:
+                result = triage(pr, self.label)
+            else:
+                result = {}
+            if llm_result is not None:
+                # The model's verdict wins; heuristic detail it does not cover stays.
+                merged = dict(llm_result)
+                for field, value in result.items():
+                    merged.setdefault(field, value)
+                result = merged
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    def _finished(self, result: dict) -> dict:
+        return self.finish(result) if self.finish is not None else result
+
+    def _cache_key(self, pr: dict, enabled: FrozenSet[str]) -> Optional[str]:
+        passes = [stage for stage in HEURISTIC_STAGES if stage in enabled]
+        if self.cache is None or not passes or "llm" in enabled:
+            return None
+        if len(passes) == len(HEURISTIC_STAGES):
+            # The key full analyze_pull_request results are cached under.
+            return analysis_key("heuristic", ANALYZER_CACHE_VERSION, pr)
+        return analysis_key("heuristic", ANALYZER_CACHE_VERSION, pr, *passes)
+
+    def _cache_get(self, key: Optional[str], timings: StageTimings) -> Optional[dict]:
+        if key is None:
+            return None
+        with timings.stage("cache"):
+            return self.cache.get(key)
+
+    @staticmethod
+    def _stage(timings: Optional[StageTimings], name: str):
+        if timings is not None:
+            return timings.stage(name)
+        return _untimed()
+
+
+@contextmanager
+def _untimed():
+    yield
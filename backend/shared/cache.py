@@ -0,0 +1,267 @@
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import anyio
+
+# Hash the diff in slices so a multi-megabyte diff is never encoded in one copy.
+_HASH_SLICE = 1 << 20
+
+
+def analysis_key(namespace: str, version: str, payload: Dict[str, Any], *extra: Any) -> str:
+    """
+    Content address for an analysis: a hash of the diff, lint result, change
+    counts and analyzer version (plus any ``extra`` values the result depends on).
+    """
+    digest = hashlib.sha256()
+    header = [
+        namespace,
+        version,
+        bool(payload.get("lint_passed", True)),
+        payload.get("additions", 0),
+        payload.get("deletions", 0),
+        payload.get("changed_files", 0),
+        *extra,
+    ]
+    digest.update(json.dumps(header, default=str).encode("utf-8"))
+    diff = payload.get("diff") or ""
+    digest.update(str(len(diff)).encode("ascii"))
+    for start in range(0, len(diff), _HASH_SLICE):
+        digest.update(diff[start:start + _HASH_SLICE].encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier result cache: a bounded in-memory LRU in front of an optional SQLite
+    table. Values are stored as JSON, so every hit returns a fresh copy that the
+    caller may mutate.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 10000,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._puts_since_prune = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    @classmethod
+    def from_env(cls) -> "AnalysisCache":
+        """Configure from ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_DB and ANALYSIS_CACHE_DB_MAX_ENTRIES."""
+        return cls(
+            max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", "256")),
+            db_path=os.getenv("ANALYSIS_CACHE_DB", "").strip() or None,
+            max_disk_entries=int(os.getenv("ANALYSIS_CACHE_DB_MAX_ENTRIES", "10000")),
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    raw = row[0]
+                    self._remember(key, raw)
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def put(self, key: str, value: Any) -> None:
+        raw = json.dumps(value)
+        with self._lock:
+            self._remember(key, raw)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, raw, time.time()),
+                )
+                self._puts_since_prune += 1
+                if self._puts_since_prune >= 100:
+                    self._puts_since_prune = 0
+                    self._prune_disk()
+            except sqlite3.Error as e:
+                print("Warning: failed to write analysis cache entry:", str(e))
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() for the event loop: only a disk-tier lookup goes to a worker thread."""
+        if self._db is None or key in self._memory:
+            return self.get(key)
+        return await anyio.to_thread.run_sync(self.get, key)
+
+    async def aput(self, key: str, value: Any) -> None:
+        if self._db is None:
+            self.put(key, value)
+        else:
+            await anyio.to_thread.run_sync(self.put, key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM analysis_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "disk": self._db is not None,
+        }
+
+    def _remember(self, key: str, raw: str) -> None:
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = raw
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self) -> None:
+        self._db.execute(
+            """
+            DELETE FROM analysis_cache WHERE key IN (
+                SELECT key FROM analysis_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_disk_entries,),
+        )
+
+
+class ResponseCache:
+    """
+    Encoded responses of read endpoints, each scoped to a repo (or to None for
+    listings across repos), with a content ETag per body. invalidate() drops a
+    repo's entries (and every None-scoped one) in O(1) by moving its
+    generation on; entries also expire after ``ttl`` seconds, which bounds how
+    long a write made by another process goes unseen.
+
+    Generations are kept for the ``max_entries`` most recently written repos.
+    An older one is dropped and folded into a floor that every untracked repo
+    reports, so no repo's generation ever goes back: dropping one can only
+    turn a cached entry into a miss, never serve a stale one.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, Tuple[Optional[str], int, float, str, bytes]]" = OrderedDict()
+        self._generations: "OrderedDict[Optional[str], int]" = OrderedDict()
+        self._floor = 0
+        self._clock = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Configure from READ_CACHE_SIZE and READ_CACHE_TTL (seconds; 0 disables caching)."""
+        return cls(
+            max_entries=int(os.getenv("READ_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("READ_CACHE_TTL", "5")),
+        )
+
+    def generation(self, repo: Optional[str]) -> int:
+        """Take before reading what will be put(), so a write during the read is noticed."""
+        with self._lock:
+            return self._generation(repo)
+
+    def get(self, key: Any) -> Optional[Tuple[str, bytes]]:
+        """(etag, body) of a current entry, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                repo, generation, expires, etag, body = entry
+                if generation == self._generation(repo) and expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return etag, body
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Any, repo: Optional[str], generation: int, body: bytes) -> str:
+        """Keep body unless the repo was written since ``generation``; returns its ETag."""
+        etag = response_etag(body)
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return etag
+        with self._lock:
+            if generation == self._generation(repo):
+                self._entries[key] = (repo, generation, time.monotonic() + self.ttl, etag, body)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return etag
+
+    def invalidate(self, repos: Iterable[str]) -> None:
+        """Call after a write to repos has landed."""
+        with self._lock:
+            for repo in [*repos, None]:
+                self._generations[repo] = next(self._clock)
+                self._generations.move_to_end(repo)
+            # None, moved on by every call, is never the oldest.
+            while len(self._generations) > max(self.max_entries, 1) + 1:
+                _, dropped = self._generations.popitem(last=False)
+                self._floor = max(self._floor, dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+        }
+
+    def _generation(self, repo: Optional[str]) -> int:
+        return self._generations.get(repo, self._floor)
+
+
+def response_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value names etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
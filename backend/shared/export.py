@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Sequence
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Lines are sent in chunks of about this many characters, not one write each.
+CHUNK_CHARS = 64 * 1024
+
+
+def export_chunks(records: Iterable[Dict[str, Any]], fields: Sequence[str], fmt: str) -> Iterator[str]:
+    """
+    Encode records as NDJSON (one object with ``fields`` per line) or CSV (a
+    header row, then one row per record) as they are read, holding one chunk at
+    a time. Pass a generator over a DB cursor to stream a result of any size.
+    """
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_MEDIA_TYPES)}")
+    if fmt == "ndjson":
+        lines = (
+            json.dumps({field: record.get(field) for field in fields}, default=str) + "\n"
+            for record in records
+        )
+    else:
+        lines = _csv_lines(records, fields)
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_CHARS:
+            yield "".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk)
+
+
+def _csv_lines(records: Iterable[Dict[str, Any]], fields: Sequence[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for record in records:
+        writer.writerow(["" if record.get(field) is None else record.get(field) for field in fields])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header, when there were no records.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_filename(name: str, fmt: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_") + f"-health.{fmt}"
@@ -0,0 +1,178 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Collection, Deque, Dict, Optional, Tuple
+
+# Seconds between keep-alive comments on idle streams (proxies drop silent ones).
+LIVE_KEEPALIVE = float(os.environ.get("LIVE_KEEPALIVE", "15"))
+
+
+class TooManySubscribers(RuntimeError):
+    pass
+
+
+class LiveHub:
+    """
+    Fan-out of server-sent events to any number of subscribers.
+
+    publish() (from any thread) encodes an event once into a bounded ring of
+    recent events and resolves the hub's current "changed" future. Subscribers
+    are generators parked on that one future: an idle subscriber costs no work
+    and no timer, and a publish wakes each of them once to copy out what it has
+    not sent yet. A subscriber that falls more than ``history`` events behind
+    (or resumes from an id the ring no longer holds) is sent a ``resync`` event
+    and should refetch its state.
+
+    Event ids are ``<epoch>-<n>``: the epoch is new in every process (and every
+    forked worker), so an id the client kept from another process, before a
+    restart or from a sibling worker, is recognised and answered with resync.
+    """
+
+    def __init__(self, history: int = 1024, max_subscribers: int = 10000, keepalive: float = LIVE_KEEPALIVE):
+        self.max_subscribers = max_subscribers
+        self.keepalive = keepalive
+        self.subscribers = 0
+        self.published = 0
+        self._events: Deque[Tuple[int, Optional[str], bytes]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Future] = None
+        self._heartbeat: Optional[asyncio.TimerHandle] = None
+        self._new_epoch()
+        if hasattr(os, "register_at_fork"):
+            # gunicorn --preload imports this in the master before forking workers.
+            os.register_at_fork(after_in_child=self._forked)
+
+    @classmethod
+    def from_env(cls) -> "LiveHub":
+        """Configure from LIVE_HISTORY and LIVE_MAX_SUBSCRIBERS."""
+        return cls(
+            history=int(os.environ.get("LIVE_HISTORY", "1024")),
+            max_subscribers=int(os.environ.get("LIVE_MAX_SUBSCRIBERS", "10000")),
+        )
+
+    def publish(self, repo: Optional[str], event: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            event_id = next(self._ids)
+            frame = (
+                f"id: {self.epoch}-{event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+            ).encode("utf-8")
+            self._events.append((event_id, repo, frame))
+            self._last_id = event_id
+            self.published += 1
+            loop = self._loop
+        if loop is not None and self.subscribers:
+            try:
+                loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                pass  # the loop is closed; nobody is listening
+
+    def last_id(self) -> str:
+        return f"{self.epoch}-{self._last_id}"
+
+    async def subscribe(
+        self, repos: Optional[Collection[str]] = None, last_event_id: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        SSE frames for events (of ``repos`` only, if given) published after
+        ``last_event_id`` (a Last-Event-ID header; default: from now on), plus
+        keep-alive comments. Raises TooManySubscribers before the first frame
+        when the hub is full.
+        """
+        if self.subscribers >= self.max_subscribers:
+            raise TooManySubscribers(f"at most {self.max_subscribers} live subscribers")
+        self._bind(asyncio.get_running_loop())
+        return self._stream(set(repos) if repos else None, last_event_id or None)
+
+    async def _stream(self, repos: Optional[set], last_event_id: Optional[str]) -> AsyncIterator[bytes]:
+        self.subscribers += 1
+        try:
+            cursor = self._cursor(last_event_id)
+            # An id this process did not hand out: the client's state is stale.
+            stale = last_event_id is not None and cursor is None
+            if cursor is None:
+                cursor = self._last_id
+            # Tell the client the stream is open (and its position) right away.
+            yield f"id: {self.epoch}-{cursor}\nevent: ready\ndata: {{}}\n\n".encode("utf-8")
+            if stale:
+                yield f"id: {self.epoch}-{cursor}\nevent: resync\ndata: {{}}\n\n".encode("utf-8")
+            while True:
+                frames, cursor, missed = self._since(cursor, repos)
+                if missed:
+                    yield f"id: {self.epoch}-{cursor}\nevent: resync\ndata: {{}}\n\n".encode("utf-8")
+                if frames:
+                    yield b"".join(frames)
+                    continue
+                await asyncio.shield(self._changed)
+                if self._last_id == cursor:
+                    yield b": keepalive\n\n"
+        finally:
+            self.subscribers -= 1
+
+    def _cursor(self, last_event_id: Optional[str]) -> Optional[int]:
+        """The position a Last-Event-ID of this epoch names; None for any other id."""
+        epoch, _, seq = (last_event_id or "").rpartition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._last_id:
+            return None
+        return int(seq)
+
+    def _new_epoch(self) -> None:
+        self.epoch = f"{os.getpid():x}{os.urandom(3).hex()}"
+        self._events.clear()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+
+    def _forked(self) -> None:
+        # Nothing of the parent's carries over, its lock (maybe held) included.
+        self._lock = threading.Lock()
+        self._loop = self._changed = self._heartbeat = None
+        self.subscribers = self.published = 0
+        self._new_epoch()
+
+    def _since(self, cursor: int, repos: Optional[set]):
+        with self._lock:
+            behind = self._last_id - cursor
+            if behind <= 0:
+                return [], cursor, False
+            missed = behind > len(self._events)
+            # Ids are consecutive: the events after cursor are the last `behind`.
+            recent = itertools.islice(self._events, max(0, len(self._events) - behind), None)
+            frames = [frame for _, repo, frame in recent if repos is None or repo in repos]
+            return frames, self._last_id, missed
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._loop is not loop or self._changed is None:
+            self._loop = loop
+            self._changed = loop.create_future()
+            self._heartbeat = None
+        if self._heartbeat is None and self.keepalive > 0:
+            self._heartbeat = loop.call_later(self.keepalive, self._beat)
+
+    def _wake(self) -> None:
+        changed, self._changed = self._changed, self._loop.create_future()
+        if changed is not None and not changed.done():
+            changed.set_result(None)
+
+    def _beat(self) -> None:
+        # One timer for the whole hub: waking everyone lets idle streams send a
+        # keep-alive. It stops when the last subscriber leaves.
+        self._heartbeat = None
+        if self.subscribers:
+            self._wake()
+            self._heartbeat = self._loop.call_later(self.keepalive, self._beat)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": self.subscribers,
+            "published": self.published,
+            "buffered": len(self._events),
+            "last_id": self.last_id(),
+        }
+
+
+# One hub per process: the services mounted in backend/main.py publish to it and
+# /subscribe streams from it.
+hub = LiveHub.from_env()
@@ -0,0 +1,310 @@
+import bisect
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) for latency histograms: sub-millisecond cache and
+# SQLite calls up to minute-long LLM requests.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The exposition format's media type (Starlette responses append the charset).
+MEDIA_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Noop:
+    """What labels() returns when metrics are disabled: every call does nothing."""
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def time(self) -> "_Noop":
+        return self
+
+    def __enter__(self) -> "_Noop":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NOOP = _Noop()
+
+
+class _CounterValue:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, histogram: _HistogramValue):
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class Metric:
+    """A metric family: one value per combination of label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), enabled: bool = True):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.enabled = enabled
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any):
+        """The value for these label values (positional, in labelnames order)."""
+        if not self.enabled:
+            return _NOOP
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_value())
+        return child
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        with self._lock:
+            children = list(self._children.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(children):
+            lines.extend(self._render_value(values, child))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_value(self) -> _CounterValue:
+        return _CounterValue()
+
+    def _render_value(self, values, child: _CounterValue) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, values)} {_number(child.value)}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), enabled=True, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames, enabled)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_value(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def _render_value(self, values, child: _HistogramValue) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _label_text(self.labelnames, values, f'le="{_number(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _label_text(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_number(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """
+    Values read at scrape time from callbacks returning (label values, value)
+    pairs, for things already counted elsewhere (cache stats, queue sizes): no
+    cost on the hot path at all.
+    """
+
+    def __init__(self, name, help, labelnames=(), enabled=True, kind: str = "gauge"):
+        super().__init__(name, help, labelnames, enabled)
+        self.kind = kind
+        self._callbacks: List[Callable[[], Iterable[Tuple[Sequence[Any], float]]]] = []
+
+    def add(self, callback: Callable[[], Iterable[Tuple[Sequence[Any], float]]]) -> None:
+        if self.enabled:
+            self._callbacks.append(callback)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for callback in list(self._callbacks):
+            try:
+                samples = list(callback())
+            except Exception as e:
+                print(f"Warning: metric {self.name} callback failed:", str(e))
+                continue
+            for values, value in samples:
+                lines.append(f"{self.name}{_label_text(self.labelnames, values)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    """
+    Metrics in the Prometheus text format, without a client library.
+
+    counter(), histogram() and callback() return the named metric, creating it
+    on first use, so each service can declare what it records at import time
+    and a module loaded twice shares the same series. With the registry
+    disabled, labels() returns a shared no-op and nothing is kept: the cost of
+    an instrumented call is the labels() call itself.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Registry":
+        """Enabled unless METRICS_ENABLED is 0/false/no."""
+        value = os.environ.get("METRICS_ENABLED", "1").strip().lower()
+        return cls(enabled=value not in ("0", "false", "no"))
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def callback(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Iterable[Tuple[Sequence[Any], float]]],
+    ) -> CallbackMetric:
+        metric = self._get(CallbackMetric, name, help, labelnames, kind=kind)
+        metric.add(callback)
+        return metric
+
+    def collect_cache(self, name: str, cache) -> None:
+        """Expose a cache's stats() hits, misses and entries, labelled cache=name."""
+        self.callback("cache_hits_total", "Cache lookups that found an entry.", "counter", ("cache",),
+                      lambda: [((name,), cache.stats()["hits"])])
+        self.callback("cache_misses_total", "Cache lookups that found nothing.", "counter", ("cache",),
+                      lambda: [((name,), cache.stats()["misses"])])
+        self.callback("cache_entries", "Entries held in memory.", "gauge", ("cache",),
+                      lambda: [((name,), cache.stats()["entries"])] if "entries" in cache.stats() else [])
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _get(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, labelnames, enabled=self.enabled, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} is already registered with a different type or labels")
+            return metric
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording http_request_duration_seconds by method, route
+    template (e.g. /db/health-history, including the prefix of the mounted app
+    that served it) and status. Paths that match no route are one "unmatched"
+    series, so scanners cannot blow up the label set.
+    """
+
+    def __init__(self, app, metrics: Optional[Registry] = None):
+        self.app = app
+        self.requests = (metrics if metrics is not None else registry).histogram(
+            "http_request_duration_seconds",
+            "HTTP requests by method, route and status, until the response is complete.",
+            ("method", "route", "status"),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        base = scope.get("root_path", "")
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Routers fill in the same scope dict: after the call it names the
+            # route that matched and the mount prefix in front of it.
+            route = scope.get("route")
+            if route is not None and hasattr(route, "path"):
+                template = scope.get("root_path", "")[len(base):] + route.path
+            else:
+                template = "unmatched"
+            self.requests.labels(scope["method"], template, status).observe(time.perf_counter() - start)
+
+
+# One registry per process: the services mounted in backend/main.py record into
+# it and /metrics renders it.
+registry = Registry.from_env()
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Tuple
+
+import anyio
+
+# A single line longer than this is rejected rather than buffered without limit.
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+class NDJSONError(ValueError):
+    pass
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Parse newline-delimited JSON from a byte stream (e.g. ``request.stream()``)
+    as it arrives. Yields (index, value) for each non-blank line, where value is
+    an NDJSONError for a line that is not valid JSON; parsing carries on after it.
+    """
+    pending = []  # pieces of the line still being received
+    pending_size = 0
+    index = 0
+    async for chunk in chunks:
+        start = 0
+        newline = chunk.find(b"\n")
+        while newline != -1:
+            pending.append(chunk[start:newline])
+            line = b"".join(pending)
+            pending, pending_size = [], 0
+            if line.strip():
+                yield index, _parse(line)
+                index += 1
+            start = newline + 1
+            newline = chunk.find(b"\n", start)
+        if start < len(chunk):
+            pending.append(chunk[start:])
+            pending_size += len(chunk) - start
+            if pending_size > MAX_LINE_BYTES:
+                raise NDJSONError(f"an NDJSON line is longer than {MAX_LINE_BYTES} bytes")
+    line = b"".join(pending)
+    if line.strip():
+        yield index, _parse(line)
+
+
+def _parse(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return NDJSONError(f"invalid JSON: {e}")
+
+
+def ndjson_line(value: Any) -> bytes:
+    return (json.dumps(value) + "\n").encode("utf-8")
+
+
+async def process_ndjson_batch(
+    chunks: AsyncIterator[bytes],
+    parse: Callable[[Any], Any],
+    process: Callable[[List[Any]], List[Any]],
+    group_size: int,
+    run_sync: Callable[..., Awaitable[Any]] = anyio.to_thread.run_sync,
+) -> AsyncIterator[bytes]:
+    """
+    Consume an NDJSON upload and hand valid items to ``process`` (run in a worker
+    thread by ``run_sync``) ``group_size`` at a time, so work starts while the
+    upload is still arriving. ``parse`` turns one decoded line into an item or raises ValueError.
+
+    Returns once the upload is read, with an async iterator of response lines:
+    one {"index", "result"} or {"index", "error"} per input line, in input order.
+    Raises NDJSONError if the upload itself cannot be read as NDJSON.
+    """
+    entries = []  # per input line: an error message, or (group task, position in group)
+    group = []
+    tasks = []
+
+    def flush_group():
+        items = [item for _, item in group]
+        task = asyncio.ensure_future(run_sync(process, items))
+        tasks.append(task)
+        for position, (index, _) in enumerate(group):
+            entries[index] = (task, position)
+        group.clear()
+
+    try:
+        async for index, value in iter_ndjson(chunks):
+            entries.append(None)
+            if isinstance(value, NDJSONError):
+                entries[index] = str(value)
+                continue
+            try:
+                group.append((index, parse(value)))
+            except ValueError as e:
+                entries[index] = f"Invalid item: {e}"
+                continue
+            if len(group) >= group_size:
+                flush_group()
+        if group:
+            flush_group()
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    async def results():
+        for index, entry in enumerate(entries):
+            if isinstance(entry, str):
+                yield ndjson_line({"index": index, "error": entry})
+                continue
+            task, position = entry
+            try:
+                yield ndjson_line({"index": index, "result": (await task)[position]})
+            except Exception as e:
+                yield ndjson_line({"index": index, "error": f"Processing failed: {e}"})
+
+    return results()
@@ -0,0 +1,27 @@
+import base64
+import json
+from typing import Any, List, Optional
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque keyset cursor: the sort-key values of the last item on a page."""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], length: int) -> Optional[List[Any]]:
+    """Inverse of encode_cursor; None for no cursor. Raises InvalidCursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor("Malformed cursor")
+    return values
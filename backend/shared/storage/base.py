@@ -0,0 +1,138 @@
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+INITIAL_REPO_HEALTH = 100
+
+# Fields of a health record as every HealthStorage accepts and returns it.
+# timestamp is an ISO-8601 string (UTC), so string order is time order. score
+# is the PR's own score; health_delta is its effect on the repo's health, and
+# overall_health the repo's health after it (None when the writer did not know).
+RECORD_FIELDS = ("repo", "pr_number", "timestamp", "score", "health_delta", "overall_health", "reason")
+# A record may also carry record_id, a unique key that SQLiteHealthStorage uses
+# to store it once however often it is written; it is not returned.
+
+
+def health_record(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a stored row/document to RECORD_FIELDS."""
+    return {
+        "repo": doc.get("repo"),
+        "pr_number": doc.get("pr_number"),
+        "timestamp": doc.get("timestamp"),
+        "score": doc.get("score", doc.get("pr_score")) or 0,
+        "health_delta": doc.get("health_delta") or 0,
+        "overall_health": doc.get("overall_health"),
+        "reason": doc.get("reason"),
+    }
+
+
+def analysis_record(pr: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The health record of one analyzed PR, as every service stores it: score is
+    the PR's own score (pr_score, else 0 with risks and 10 without) and
+    health_delta the analysis's effect on the repo's health. record_id is new
+    for each call, so a retried write of the record is recognized.
+    """
+    risks = result.get("risks") or []
+    return {
+        "repo": pr["repo"],
+        "pr_number": pr.get("pr_number"),
+        "timestamp": datetime.utcnow().isoformat(),
+        "score": result.get("pr_score", 0 if risks else 10),
+        "health_delta": result.get("health_delta", 0),
+        "overall_health": result.get("overall_health"),
+        "reason": ",".join(risks),
+        "record_id": uuid.uuid4().hex,
+    }
+
+
+def empty_summary(repo: str) -> Dict[str, Any]:
+    return {
+        "repo": repo,
+        "total_prs": 0,
+        "cumulative_score": 0,
+        "avg_score": 0.0,
+        "current_health": INITIAL_REPO_HEALTH,
+        "updated_at": None,
+    }
+
+
+def summary_from_totals(repo: str, total: int, cumulative: int, delta: int, updated_at: Optional[str]) -> Dict[str, Any]:
+    if not total:
+        return empty_summary(repo)
+    return {
+        "repo": repo,
+        "total_prs": total,
+        "cumulative_score": cumulative,
+        "avg_score": cumulative / total,
+        "current_health": INITIAL_REPO_HEALTH + delta,
+        "updated_at": updated_at,
+    }
+
+
+class HealthStorage:
+    """
+    Health history persistence, one implementation per backend:
+    SQLiteHealthStorage, MongoHealthStorage and MemoryHealthStorage.
+
+    Records go in and come out as RECORD_FIELDS dicts. Reads order records by
+    timestamp, then by insertion order for equal timestamps.
+    """
+
+    def insert_many(self, records: Sequence[Dict[str, Any]]) -> None:
+        """Store records (in arrival order) in one bulk write."""
+        raise NotImplementedError
+
+    def history(
+        self,
+        repo: str,
+        limit: int = 20,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Newest first: up to ``limit`` records with since <= timestamp < until."""
+        raise NotImplementedError
+
+    def page(self, repo: str, limit: int, after: Optional[Tuple[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Like history(), for keyset pagination: the records older than ``after``
+        (the timestamp and _id of the previous page's last record). Records
+        come as stored, with every field a writer gave them plus ``_id``, the
+        backend's key for the record.
+        """
+        raise NotImplementedError
+
+    def summary(self, repo: str) -> Dict[str, Any]:
+        """
+        total_prs, cumulative_score, avg_score, current_health
+        (INITIAL_REPO_HEALTH plus every health_delta) and updated_at (newest
+        timestamp) over all of the repo's records.
+        """
+        raise NotImplementedError
+
+    def repos(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Up to ``limit`` repo summaries, most recently updated first, after the
+        (updated_at, repo) of the previous page's last one.
+        """
+        raise NotImplementedError
+
+    def trend(
+        self, repo: str, bucket: str, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Oldest first: one point per hour/day/week ``bucket`` holding records,
+        from the bucket containing ``since`` up to ``until``. Served from
+        rollups that insert_many() maintains; see shared.storage.rollups.
+        """
+        raise NotImplementedError
+
+    def export(self, repo: Optional[str] = None, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Every record (of one repo, or all), each repo's oldest first, read
+        ``batch_size`` at a time so memory stays flat however many there are.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,294 @@
+import itertools
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .base import HealthStorage, health_record, summary_from_totals
+from .rollups import MemoryRollups
+
+
+class MemoryHistoryStore:
+    """
+    Bounded in-memory PR history: a ring buffer (deque) per repo holding its
+    newest ``per_repo_limit`` records, plus a global ``max_records`` budget.
+
+    When the budget is exceeded, the oldest record of the least recently used
+    repo goes first, so one busy repo cannot flush every other repo's history.
+    A (repo, pr_number) index points at the newest record of each PR.
+
+    Records are stored as given (the caller must not mutate them afterwards) and
+    returned newest first.
+
+    As a cache tier in front of a database, ``prime()`` loads a repo's newest
+    records from the database and marks the repo primed. After that, appends keep
+    it current and ``cached_recent()`` answers reads from memory. Take
+    ``version(repo)`` before the database read and pass it to prime(): if a
+    write landed in between, the snapshot may miss it and is discarded. A
+    record is held once per ``_id``: a write that reached the database before
+    the snapshot was read, and is appended after it was primed, is skipped.
+    """
+
+    def __init__(self, per_repo_limit: int = 1000, max_records: int = 50000):
+        self.per_repo_limit = max(1, per_repo_limit)
+        self.max_records = max(1, max_records)
+        self._repos: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._by_pr: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        self._ids: Set[Any] = set()
+        # repo -> True when every record the database holds is in memory, False
+        # when only the newest len(deque) are.
+        self._primed: Dict[str, bool] = {}
+        self._versions: Dict[str, int] = {}
+        self._clock = itertools.count(1)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ---- writes ----
+    def append(self, doc: Dict[str, Any]) -> None:
+        self.extend([doc])
+
+    def extend(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """Add records in arrival order (oldest first)."""
+        with self._lock:
+            for doc in docs:
+                self._push(doc)
+            self._enforce_budget()
+
+    def prime(
+        self, repo: str, docs: List[Dict[str, Any]], complete: bool, version: Optional[int] = None
+    ) -> bool:
+        """
+        Replace a repo's records with ``docs`` (newest first) read from the
+        database. ``complete`` means the database has no older records. Returns
+        False, changing nothing, if the repo was written since ``version``.
+        """
+        with self._lock:
+            if version is not None and self._versions.get(repo, 0) != version:
+                return False
+            self._drop(repo)
+            for doc in reversed(docs[: self.per_repo_limit]):
+                self._push(doc)
+            self._primed[repo] = complete and len(docs) <= self.per_repo_limit
+            self._enforce_budget()
+            return True
+
+    def version(self, repo: str) -> int:
+        with self._lock:
+            return self._versions.get(repo, 0)
+
+    def invalidate(self, repo: str) -> None:
+        """Stop answering reads for ``repo`` from memory until it is primed again."""
+        with self._lock:
+            self._primed.pop(repo, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._repos.clear()
+            self._by_pr.clear()
+            self._ids.clear()
+            self._primed.clear()
+            self._versions.clear()
+            self._size = 0
+
+    # ---- reads ----
+    def recent(self, repo: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to ``limit`` newest records for ``repo``, newest first."""
+        with self._lock:
+            history = self._repos.get(repo)
+            if not history:
+                return []
+            self._repos.move_to_end(repo)
+            count = len(history) if limit is None else max(0, min(limit, len(history)))
+            return list(itertools.islice(reversed(history), count))
+
+    def cached_recent(self, repo: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Like recent(), but None unless memory is known to hold the repo's newest
+        ``limit`` records: the caller should read the database and prime().
+        """
+        with self._lock:
+            complete = self._primed.get(repo)
+            history = self._repos.get(repo)
+            held = len(history) if history else 0
+            if complete is None or (not complete and held < limit):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self.recent(repo, limit)
+
+    def get(self, repo: str, pr_number: Any) -> Optional[Dict[str, Any]]:
+        """Newest record for one PR, or None if it is not (or no longer) held."""
+        with self._lock:
+            return self._by_pr.get((repo, pr_number))
+
+    def count(self, repo: str) -> int:
+        with self._lock:
+            history = self._repos.get(repo)
+            return len(history) if history else 0
+
+    def repos(self) -> List[str]:
+        with self._lock:
+            return list(self._repos)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": self._size,
+            "repos": len(self._repos),
+            "per_repo_limit": self.per_repo_limit,
+            "max_records": self.max_records,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    # ---- internals (lock held) ----
+    def _push(self, doc: Dict[str, Any]) -> None:
+        doc_id = doc.get("_id")
+        if doc_id is not None:
+            if doc_id in self._ids:
+                return
+            self._ids.add(doc_id)
+        repo = doc["repo"]
+        history = self._repos.get(repo)
+        if history is None:
+            history = self._repos[repo] = deque()
+        else:
+            self._repos.move_to_end(repo)
+        if len(history) >= self.per_repo_limit:
+            self._unindex(history.popleft())
+            self._size -= 1
+            if self._primed.get(repo):
+                self._primed[repo] = False
+        history.append(doc)
+        self._size += 1
+        self._versions[repo] = next(self._clock)
+        self._by_pr[(repo, doc.get("pr_number"))] = doc
+
+    def _enforce_budget(self) -> None:
+        while self._size > self.max_records:
+            repo, history = next(iter(self._repos.items()))
+            self._unindex(history.popleft())
+            self._size -= 1
+            if history:
+                if self._primed.get(repo):
+                    self._primed[repo] = False
+            else:
+                del self._repos[repo]
+                self._primed.pop(repo, None)
+
+    def _drop(self, repo: str) -> None:
+        history = self._repos.pop(repo, None)
+        self._primed.pop(repo, None)
+        if history:
+            for doc in history:
+                self._unindex(doc)
+            self._size -= len(history)
+
+    def _unindex(self, doc: Dict[str, Any]) -> None:
+        self._ids.discard(doc.get("_id"))
+        key = (doc["repo"], doc.get("pr_number"))
+        # Only if the index still points at this record, not a newer one for the PR.
+        if self._by_pr.get(key) is doc:
+            del self._by_pr[key]
+
+
+class MemoryHealthStorage(HealthStorage):
+    """
+    HealthStorage on a MemoryHistoryStore. Reads see only the records the store
+    still holds; summary(), repos() and trend() count every record ever
+    inserted. Records keep any other fields they carry, like
+    MongoHealthStorage's; one without an _id is given a sequence number.
+    """
+
+    def __init__(self, store: Optional[MemoryHistoryStore] = None):
+        self.store = store if store is not None else MemoryHistoryStore()
+        # repo -> [total, cumulative score, summed health_delta, newest timestamp]
+        self._totals: Dict[str, List[Any]] = {}
+        self.rollups = MemoryRollups()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def insert_many(self, records: Sequence[Dict[str, Any]], rollups: bool = True) -> None:
+        """``rollups=False`` leaves the rollups to the caller, as in MongoHealthStorage."""
+        docs = []
+        for r in records:
+            doc = dict(r)
+            doc.update(health_record(r))
+            docs.append(doc)
+        with self._lock:
+            for r in docs:
+                if r.get("_id") is None:
+                    r["_id"] = next(self._ids)
+                totals = self._totals.setdefault(r["repo"], [0, 0, 0, None])
+                totals[0] += 1
+                totals[1] += r["score"]
+                totals[2] += r["health_delta"]
+                if totals[3] is None or r["timestamp"] > totals[3]:
+                    totals[3] = r["timestamp"]
+        self.store.extend(docs)
+        if rollups:
+            self.rollups.apply(docs)
+
+    def history(
+        self,
+        repo: str,
+        limit: int = 20,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        records = self._newest_first(repo)
+        if since is not None or until is not None:
+            records = [
+                r for r in records
+                if (since is None or r["timestamp"] >= since) and (until is None or r["timestamp"] < until)
+            ]
+        return [health_record(r) for r in records[: max(0, limit)]]
+
+    def page(self, repo: str, limit: int, after: Optional[Tuple[str, Any]] = None) -> List[Dict[str, Any]]:
+        records = self._newest_first(repo)
+        if after is not None:
+            records = [r for r in records if (r["timestamp"], r["_id"]) < after]
+        return [dict(r) for r in records[: max(0, limit)]]
+
+    def summary(self, repo: str) -> Dict[str, Any]:
+        with self._lock:
+            total, cumulative, delta, updated_at = self._totals.get(repo, (0, 0, 0, None))
+        return summary_from_totals(repo, total, cumulative, delta, updated_at)
+
+    def repos(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            summaries = [summary_from_totals(repo, *totals) for repo, totals in self._totals.items()]
+        summaries.sort(key=lambda s: s["repo"])
+        summaries.sort(key=lambda s: s["updated_at"], reverse=True)
+        if after is not None:
+            summaries = [
+                s for s in summaries
+                if s["updated_at"] < after[0] or (s["updated_at"] == after[0] and s["repo"] > after[1])
+            ]
+        return summaries[: max(0, limit)]
+
+    def trend(
+        self, repo: str, bucket: str, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return self.rollups.trend(repo, bucket, since, until)
+
+    def export(self, repo: Optional[str] = None, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        for name in [repo] if repo is not None else self.store.repos():
+            records = self.store.recent(name)
+            records.reverse()
+            records.sort(key=lambda r: r["timestamp"])
+            for r in records:
+                yield health_record(r)
+
+    def close(self) -> None:
+        self.store.clear()
+        self.rollups.clear()
+
+    def _newest_first(self, repo: str) -> List[Dict[str, Any]]:
+        records = self.store.recent(repo)
+        # Stable sort: equal timestamps stay newest-inserted first.
+        records.sort(key=lambda r: r["timestamp"], reverse=True)
+        return records
@@ -0,0 +1,216 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pymongo
+from pymongo import UpdateOne
+
+from .base import INITIAL_REPO_HEALTH, HealthStorage, health_record, summary_from_totals
+from .rollups import ROLLUP_COUNTERS, fold, trend_point, trend_range
+
+# Newest first; _id breaks timestamp ties in insertion order (ObjectIds increase).
+_NEWEST_FIRST = [("timestamp", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+_OLDEST_FIRST = [("timestamp", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]
+_SUMMARY_FIELDS = {"_id": 0, "total_prs": 1, "cumulative_score": 1, "current_health": 1, "last_timestamp": 1, "updated_at": 1}
+_REPO_LIST_FIELDS = {
+    "_id": 0,
+    "repo": 1,
+    "current_health": 1,
+    "updated_at": 1,
+    "total_prs": 1,
+    "cumulative_score": 1,
+    "avg_score": 1,
+}
+
+
+class MongoRollups:
+    """
+    Rollup documents ({repo, bucket, start} plus counters) in a collection,
+    updated with one unordered bulk of $inc/$min/$max upserts per batch.
+    """
+
+    def __init__(self, collection, create_indexes: bool = True):
+        self.collection = collection
+        if create_indexes:
+            collection.create_index(
+                [("repo", pymongo.ASCENDING), ("bucket", pymongo.ASCENDING), ("start", pymongo.ASCENDING)],
+                unique=True,
+            )
+
+    def apply(self, records: Sequence[Dict[str, Any]], session=None) -> None:
+        ops = []
+        for (repo, bucket, start), delta in fold(records).items():
+            update: Dict[str, Any] = {"$inc": {counter: delta[counter] for counter in ROLLUP_COUNTERS}}
+            # $min/$max against a missing field set it; a null would win $min.
+            if delta["health_min"] is not None:
+                update["$min"] = {"health_min": delta["health_min"]}
+                update["$max"] = {"health_max": delta["health_max"]}
+            ops.append(UpdateOne({"repo": repo, "bucket": bucket, "start": start}, update, upsert=True))
+        if ops:
+            self.collection.bulk_write(ops, ordered=False, session=session)
+
+    def trend(
+        self, repo: str, bucket: str, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        low, high = trend_range(bucket, since, until)
+        query: Dict[str, Any] = {"repo": repo, "bucket": bucket}
+        bounds: Dict[str, Any] = {}
+        if low is not None:
+            bounds["$gte"] = low
+        if high is not None:
+            bounds["$lt"] = high
+        if bounds:
+            query["start"] = bounds
+        cursor = self.collection.find(query, {"_id": 0}).sort("start", pymongo.ASCENDING)
+        return [trend_point(row) for row in cursor]
+
+    def clear(self, repo: str, session=None) -> None:
+        self.collection.delete_many({"repo": repo}, session=session)
+
+
+class MongoHealthStorage(HealthStorage):
+    """
+    HealthStorage on a repo_health collection. Documents keep backend-db's
+    field names (pr_score for score, which stays as a legacy copy) and any
+    other fields a record carries, such as backend-db's _id and author. Reads
+    go through the (repo, timestamp, _id) index. Trends need a ``rollups``
+    collection, kept current by insert_many().
+
+    ``summaries`` is a collection of per-repo summary documents (total_prs,
+    cumulative_score, current_health, last_timestamp, updated_at) that the
+    writer keeps current, as backend-db does with repo_summary: summary()
+    then reads one document instead of aggregating the repo's history, and
+    repos() pages through them.
+    """
+
+    def __init__(self, collection, rollups=None, summaries=None, create_indexes: bool = True):
+        self.collection = collection
+        self.rollups = MongoRollups(rollups, create_indexes) if rollups is not None else None
+        self.summaries = summaries
+        if create_indexes:
+            collection.create_index([("repo", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)])
+            # Keyset pages (page()) and exports over (timestamp, _id).
+            collection.create_index(
+                [("repo", pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+            )
+            if summaries is not None:
+                summaries.create_index([("repo", pymongo.ASCENDING)], unique=True)
+                # repos() pages newest first; repo breaks ties.
+                summaries.create_index([("updated_at", pymongo.DESCENDING), ("repo", pymongo.ASCENDING)])
+
+    def insert_many(
+        self, records: Sequence[Dict[str, Any]], session=None, ordered: bool = True, rollups: bool = True
+    ) -> None:
+        """
+        ``session`` makes the writes part of the caller's transaction.
+        ``ordered=False`` writes every record it can, e.g. a replayed batch whose
+        _ids are partly stored already (the BulkWriteError still propagates).
+        ``rollups=False`` leaves the rollups to the caller.
+        """
+        if not records:
+            return
+        docs = []
+        for r in records:
+            doc = dict(r)
+            doc.update(health_record(r))
+            doc["pr_score"] = doc["score"]
+            docs.append(doc)
+        self.collection.insert_many(docs, ordered=ordered, session=session)
+        if rollups and self.rollups is not None:
+            self.rollups.apply(records, session)
+
+    def history(
+        self,
+        repo: str,
+        limit: int = 20,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        if limit <= 0:
+            return []
+        query: Dict[str, Any] = {"repo": repo}
+        bounds: Dict[str, Any] = {}
+        if since is not None:
+            bounds["$gte"] = since
+        if until is not None:
+            bounds["$lt"] = until
+        if bounds:
+            query["timestamp"] = bounds
+        cursor = self.collection.find(query, {"_id": 0}).sort(_NEWEST_FIRST).limit(limit)
+        return [health_record(doc) for doc in cursor]
+
+    def page(self, repo: str, limit: int, after: Optional[Tuple[str, Any]] = None) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {"repo": repo}
+        if after is not None:
+            query["$or"] = [
+                {"timestamp": {"$lt": after[0]}},
+                {"timestamp": after[0], "_id": {"$lt": after[1]}},
+            ]
+        records = []
+        for doc in self.collection.find(query).sort(_NEWEST_FIRST).limit(limit):
+            doc.update(health_record(doc))
+            records.append(doc)
+        return records
+
+    def summary(self, repo: str) -> Dict[str, Any]:
+        if self.summaries is not None:
+            doc = self.summaries.find_one({"repo": repo}, _SUMMARY_FIELDS)
+            if doc is not None:
+                return summary_from_totals(
+                    repo,
+                    doc.get("total_prs", 0),
+                    doc.get("cumulative_score", 0),
+                    doc.get("current_health", INITIAL_REPO_HEALTH) - INITIAL_REPO_HEALTH,
+                    doc.get("last_timestamp", doc.get("updated_at")),
+                )
+            # No document yet (history from before summaries): aggregate it.
+        pipeline = [
+            {"$match": {"repo": repo}},
+            {
+                "$group": {
+                    "_id": None,
+                    "total": {"$sum": 1},
+                    "cumulative": {"$sum": {"$ifNull": ["$pr_score", "$score"]}},
+                    "delta": {"$sum": {"$ifNull": ["$health_delta", 0]}},
+                    "updated_at": {"$max": "$timestamp"},
+                }
+            },
+        ]
+        totals = next(iter(self.collection.aggregate(pipeline)), None)
+        if totals is None:
+            return summary_from_totals(repo, 0, 0, 0, None)
+        return summary_from_totals(repo, totals["total"], totals["cumulative"], totals["delta"], totals["updated_at"])
+
+    def repos(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        if self.summaries is None:
+            raise NotImplementedError("MongoHealthStorage was created without a summaries collection")
+        # Keyset over the (updated_at desc, repo asc) index: a range read that
+        # never touches the history.
+        query: Dict[str, Any] = {}
+        if after is not None:
+            query = {
+                "$or": [
+                    {"updated_at": {"$lt": after[0]}},
+                    {"updated_at": after[0], "repo": {"$gt": after[1]}},
+                ]
+            }
+        cursor = self.summaries.find(query, _REPO_LIST_FIELDS)
+        cursor = cursor.sort([("updated_at", pymongo.DESCENDING), ("repo", pymongo.ASCENDING)]).limit(limit)
+        return list(cursor)
+
+    def export(self, repo: Optional[str] = None, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        # One server-side cursor fetched batch_size documents per round trip.
+        if repo is None:
+            cursor = self.collection.find({}, {"_id": 0}).sort("_id", pymongo.ASCENDING)
+        else:
+            cursor = self.collection.find({"repo": repo}, {"_id": 0}).sort(_OLDEST_FIRST)
+        try:
+            for doc in cursor.batch_size(batch_size):
+                yield health_record(doc)
+        finally:
+            cursor.close()
+
+    def trend(
+        self, repo: str, bucket: str, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        if self.rollups is None:
+            raise NotImplementedError("MongoHealthStorage was created without a rollups collection")
+        return self.rollups.trend(repo, bucket, since, until)
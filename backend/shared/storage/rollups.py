@@ -0,0 +1,141 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+BUCKETS = ("hour", "day", "week")
+
+# Counters summed into a rollup row; health_min / health_max are kept alongside.
+# health_* cover only records that carried an overall_health.
+ROLLUP_COUNTERS = ("prs", "score_sum", "delta_sum", "risk_count", "risky_prs", "health_sum", "health_count")
+
+RollupKey = Tuple[str, str, str]  # (repo, bucket, start)
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO-8601 (date or datetime) to a naive UTC datetime. Raises ValueError."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def bucket_start(timestamp: str, bucket: str) -> str:
+    """Start of the hour, day or (Monday-based) week containing timestamp, as ISO."""
+    return _start_of(parse_timestamp(timestamp), bucket)
+
+
+def _start_of(moment: datetime, bucket: str) -> str:
+    if bucket == "hour":
+        start = moment.replace(minute=0, second=0, microsecond=0)
+    elif bucket == "day":
+        start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif bucket == "week":
+        start = moment.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=moment.weekday())
+    else:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    return start.isoformat()
+
+
+def risk_count(record: Dict[str, Any]) -> int:
+    reason = record.get("reason") or ""
+    return len([part for part in reason.split(",") if part.strip()])
+
+
+def fold(records: Iterable[Dict[str, Any]]) -> Dict[RollupKey, Dict[str, Any]]:
+    """
+    Per (repo, bucket, start) increments for a batch of records, every bucket
+    size at once: what an insert of the batch adds to the stored rollups.
+    """
+    increments: Dict[RollupKey, Dict[str, Any]] = {}
+    for record in records:
+        risks = risk_count(record)
+        health = record.get("overall_health")
+        moment = parse_timestamp(record["timestamp"])
+        for bucket in BUCKETS:
+            key = (record["repo"], bucket, _start_of(moment, bucket))
+            row = increments.get(key)
+            if row is None:
+                row = increments[key] = dict.fromkeys(ROLLUP_COUNTERS, 0)
+                row["health_min"] = row["health_max"] = None
+            row["prs"] += 1
+            row["score_sum"] += record.get("score", record.get("pr_score")) or 0
+            row["delta_sum"] += record.get("health_delta") or 0
+            row["risk_count"] += risks
+            row["risky_prs"] += 1 if risks else 0
+            if health is not None:
+                row["health_sum"] += health
+                row["health_count"] += 1
+                row["health_min"] = health if row["health_min"] is None else min(row["health_min"], health)
+                row["health_max"] = health if row["health_max"] is None else max(row["health_max"], health)
+    return increments
+
+
+def trend_range(bucket: str, since: Optional[str], until: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Validate a trend query and turn it into bounds on bucket start: the bucket
+    containing ``since`` onwards, up to (excluding) ``until``. Raises ValueError.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    low = bucket_start(since, bucket) if since else None
+    high = parse_timestamp(until).isoformat() if until else None
+    return low, high
+
+
+def trend_point(row: Dict[str, Any]) -> Dict[str, Any]:
+    prs = row.get("prs") or 0
+    health_count = row.get("health_count") or 0
+    return {
+        "start": row["start"],
+        "prs": prs,
+        "health_min": row.get("health_min"),
+        "health_max": row.get("health_max"),
+        "health_avg": row["health_sum"] / health_count if health_count else None,
+        "avg_score": row["score_sum"] / prs if prs else None,
+        "health_delta": row.get("delta_sum") or 0,
+        "risk_count": row.get("risk_count") or 0,
+        "risky_prs": row.get("risky_prs") or 0,
+    }
+
+
+class MemoryRollups:
+    """Rollup rows in dicts, one per (repo, bucket) series, for in-memory stores."""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, records: Iterable[Dict[str, Any]]) -> None:
+        increments = fold(records)
+        with self._lock:
+            for (repo, bucket, start), delta in increments.items():
+                series = self._series.setdefault((repo, bucket), {})
+                row = series.get(start)
+                if row is None:
+                    series[start] = dict(delta, start=start)
+                    continue
+                for counter in ROLLUP_COUNTERS:
+                    row[counter] += delta[counter]
+                for field, pick in (("health_min", min), ("health_max", max)):
+                    if delta[field] is not None:
+                        row[field] = delta[field] if row[field] is None else pick(row[field], delta[field])
+
+    def trend(
+        self, repo: str, bucket: str, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        low, high = trend_range(bucket, since, until)
+        with self._lock:
+            rows = [
+                dict(row) for start, row in self._series.get((repo, bucket), {}).items()
+                if (low is None or start >= low) and (high is None or start < high)
+            ]
+        rows.sort(key=lambda row: row["start"])
+        return [trend_point(row) for row in rows]
+
+    def clear(self, repo: Optional[str] = None) -> None:
+        with self._lock:
+            if repo is None:
+                self._series.clear()
+            else:
+                for bucket in BUCKETS:
+                    self._series.pop((repo, bucket), None)
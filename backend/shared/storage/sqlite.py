@@ -0,0 +1,391 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from ..metrics import registry as metrics
+from .base import HealthStorage, health_record, summary_from_totals
+from .rollups import ROLLUP_COUNTERS, fold, trend_point, trend_range
+
+STORAGE_SECONDS = metrics.histogram(
+    "storage_operation_duration_seconds",
+    "Calls to the health storage backends, by backend and operation.",
+    ("backend", "operation"),
+)
+
+
+def _create_repo_health(db: sqlite3.Connection) -> None:
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS repo_health (
+            repo TEXT,
+            timestamp TEXT,
+            score INTEGER,
+            reason TEXT
+        )
+        """
+    )
+
+
+def _index_repo_health(db: sqlite3.Connection) -> None:
+    # Serves "newest N rows for a repo" (/health-history) as an index range read.
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS repo_health_repo_timestamp ON repo_health (repo, timestamp DESC)"
+    )
+
+
+def _add_record_columns(db: sqlite3.Connection) -> None:
+    # The fields HealthStorage records carry beyond the original four.
+    db.execute("ALTER TABLE repo_health ADD COLUMN pr_number INTEGER")
+    db.execute("ALTER TABLE repo_health ADD COLUMN health_delta INTEGER NOT NULL DEFAULT 0")
+    db.execute("ALTER TABLE repo_health ADD COLUMN overall_health INTEGER")
+
+
+def _create_health_rollup(db: sqlite3.Connection) -> None:
+    # Hourly/daily/weekly aggregates per repo; see shared.storage.rollups.
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS health_rollup (
+            repo TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            start TEXT NOT NULL,
+            prs INTEGER NOT NULL DEFAULT 0,
+            score_sum INTEGER NOT NULL DEFAULT 0,
+            delta_sum INTEGER NOT NULL DEFAULT 0,
+            risk_count INTEGER NOT NULL DEFAULT 0,
+            risky_prs INTEGER NOT NULL DEFAULT 0,
+            health_sum INTEGER NOT NULL DEFAULT 0,
+            health_count INTEGER NOT NULL DEFAULT 0,
+            health_min INTEGER,
+            health_max INTEGER,
+            PRIMARY KEY (repo, bucket, start)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _add_source_columns(db: sqlite3.Connection) -> None:
+    # Which service wrote a record (see SQLiteHealthStorage); NULL before this.
+    db.execute("ALTER TABLE repo_health ADD COLUMN source TEXT")
+    # The rollups are kept per source too. A primary key cannot be altered, so
+    # the table is rebuilt; existing rows get the untagged source ''.
+    columns = "repo, bucket, start, " + ", ".join(ROLLUP_COUNTERS) + ", health_min, health_max"
+    db.execute(
+        """
+        CREATE TABLE health_rollup_by_source (
+            repo TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            start TEXT NOT NULL,
+            source TEXT NOT NULL DEFAULT '',
+            prs INTEGER NOT NULL DEFAULT 0,
+            score_sum INTEGER NOT NULL DEFAULT 0,
+            delta_sum INTEGER NOT NULL DEFAULT 0,
+            risk_count INTEGER NOT NULL DEFAULT 0,
+            risky_prs INTEGER NOT NULL DEFAULT 0,
+            health_sum INTEGER NOT NULL DEFAULT 0,
+            health_count INTEGER NOT NULL DEFAULT 0,
+            health_min INTEGER,
+            health_max INTEGER,
+            PRIMARY KEY (repo, bucket, start, source)
+        ) WITHOUT ROWID
+        """
+    )
+    db.execute(f"INSERT INTO health_rollup_by_source ({columns}) SELECT {columns} FROM health_rollup")
+    db.execute("DROP TABLE health_rollup")
+    db.execute("ALTER TABLE health_rollup_by_source RENAME TO health_rollup")
+
+
+def _add_record_ids(db: sqlite3.Connection) -> None:
+    # Lets insert_many() skip records it already stored (a replayed write-behind
+    # journal). UNIQUE allows any number of NULLs: older rows have none.
+    db.execute("ALTER TABLE repo_health ADD COLUMN record_id TEXT")
+    db.execute("CREATE UNIQUE INDEX repo_health_record_id ON repo_health (record_id)")
+
+
+# Schema migrations, applied in order. PRAGMA user_version records how many have
+# run, so append new steps here and never edit or reorder existing ones.
+MIGRATIONS: List[Union[str, Callable[[sqlite3.Connection], None]]] = [
+    _create_repo_health,
+    _index_repo_health,
+    _add_record_columns,
+    _create_health_rollup,
+    _add_source_columns,
+    _add_record_ids,
+]
+
+
+class SQLiteStore:
+    """
+    A health SQLite database: backend-api and backend-ai each open their own.
+
+    Each thread gets its own connection (WAL mode, so readers never wait for the
+    writer), statements are fixed strings that sqlite3 keeps prepared in each
+    connection's statement cache, and the schema is migrated once on open.
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: float = 5.0):
+        self.path = str(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.migrate()
+
+    @classmethod
+    def from_env(cls, default_path: Union[str, Path]) -> "SQLiteStore":
+        """The database at HEALTH_DB_PATH, else the service's ``default_path``."""
+        return cls(os.getenv("HEALTH_DB_PATH", "").strip() or default_path)
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Autocommit; write() opens its own transactions. Only this thread
+            # uses it, but close() may run on another.
+            db = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    def migrate(self) -> int:
+        """Apply pending MIGRATIONS; returns the resulting schema version."""
+        db = self.connection()
+        # IMMEDIATE takes the write lock up front, so concurrent processes
+        # starting together apply each step once.
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            for step in MIGRATIONS[version:]:
+                if callable(step):
+                    step(db)
+                else:
+                    db.execute(step)
+            if version < len(MIGRATIONS):
+                db.execute(f"PRAGMA user_version={len(MIGRATIONS)}")
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return max(version, len(MIGRATIONS))
+
+    def write(self, sql: str, rows: Sequence[Sequence[Any]]) -> None:
+        """executemany() in one transaction."""
+        self.write_many([(sql, rows)])
+
+    def write_many(self, statements: Sequence[Tuple[str, Sequence[Sequence[Any]]]]) -> None:
+        """executemany() for each (sql, rows), all in one transaction."""
+        with self.transaction() as db:
+            for sql, rows in statements:
+                db.executemany(sql, rows)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """This thread's connection in a write transaction, committed on exit."""
+        with STORAGE_SECONDS.labels("sqlite", "write").time():
+            db = self.connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple]:
+        with STORAGE_SECONDS.labels("sqlite", "query").time():
+            return self.connection().execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        """Close every thread's connection (call once no requests are running)."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+
+RECORD_COLUMNS = "repo, pr_number, timestamp, score, health_delta, overall_health, reason"
+INSERT_RECORD = (
+    f"INSERT INTO repo_health ({RECORD_COLUMNS}, source, record_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# Below SQLite's limit on the number of ? in one statement.
+_IDS_PER_QUERY = 500
+_ROLLUP_COLUMNS = ", ".join(ROLLUP_COUNTERS)
+UPSERT_ROLLUP = (
+    f"INSERT INTO health_rollup (repo, bucket, start, source, {_ROLLUP_COLUMNS}, health_min, health_max)"
+    f" VALUES (?, ?, ?, ?, {', '.join('?' for _ in ROLLUP_COUNTERS)}, ?, ?)"
+    " ON CONFLICT (repo, bucket, start, source) DO UPDATE SET "
+    + ", ".join(f"{c} = {c} + excluded.{c}" for c in ROLLUP_COUNTERS)
+    # Scalar MIN/MAX return NULL if either side is NULL; fall back to the other.
+    + ", health_min = COALESCE(MIN(health_min, excluded.health_min), health_min, excluded.health_min)"
+    + ", health_max = COALESCE(MAX(health_max, excluded.health_max), health_max, excluded.health_max)"
+)
+# One point per start, summed over the sources read.
+SELECT_TREND = (
+    "SELECT start, " + ", ".join(f"SUM({c})" for c in ROLLUP_COUNTERS) + ", MIN(health_min), MAX(health_max)"
+    " FROM health_rollup WHERE repo = ? AND bucket = ? AND start >= ? AND start < ?{only}"
+    " GROUP BY start ORDER BY start"
+)
+SELECT_SUMMARY = (
+    "SELECT COUNT(*), COALESCE(SUM(score), 0), COALESCE(SUM(health_delta), 0), MAX(timestamp)"
+    " FROM repo_health WHERE repo = ?{only}"
+)
+
+
+class SQLiteHealthStorage(HealthStorage):
+    """
+    HealthStorage on the repo_health table of a SQLiteStore.
+
+    With a ``source`` (the service name), records are written tagged with it
+    and reads see only that source's records, plus untagged ones from before
+    sources were recorded: two services pointed at one file keep separate
+    histories. Without one, records are untagged and reads see every record.
+
+    A record with a ``record_id`` (analysis_record() sets one) is stored once:
+    insert_many() skips the ones already in the table, so a write-behind
+    journal replayed after a crash between commit and trim adds nothing twice.
+    """
+
+    def __init__(self, store: SQLiteStore, source: Optional[str] = None):
+        self.store = store
+        self.source = source
+        if source is None:
+            records, rollups, self._params = "", "", []
+        else:
+            records, rollups, self._params = " AND (source = ? OR source IS NULL)", " AND source IN (?, '')", [source]
+        self._history_sql = f"SELECT {RECORD_COLUMNS} FROM repo_health WHERE repo = ?{records}"
+        # Keyset pages along the (repo, timestamp) index, rowid for ties.
+        self._page_sql = f"SELECT rowid, {RECORD_COLUMNS} FROM repo_health WHERE repo = ?{records}"
+        self._summary_sql = SELECT_SUMMARY.format(only=records)
+        self._trend_sql = SELECT_TREND.format(only=rollups)
+        self._export_all_sql = (
+            f"SELECT rowid, {RECORD_COLUMNS} FROM repo_health WHERE rowid > ?{records} ORDER BY rowid LIMIT ?"
+        )
+        # Along the (repo, timestamp) index.
+        self._export_repo_sql = (
+            f"SELECT rowid, {RECORD_COLUMNS} FROM repo_health WHERE repo = ?"
+            f" AND (timestamp > ? OR (timestamp = ? AND rowid > ?)){records}"
+            " ORDER BY timestamp, rowid LIMIT ?"
+        )
+
+    def insert_many(self, records: Sequence[Dict[str, Any]]) -> None:
+        # The records and their rollup increments commit together, and the
+        # check for stored record_ids runs under the same write lock.
+        with self.store.transaction() as db:
+            records = self._unseen(db, records)
+            rows = [
+                (r["repo"], r.get("pr_number"), r["timestamp"], r.get("score") or 0,
+                 r.get("health_delta") or 0, r.get("overall_health"), r.get("reason"), self.source,
+                 r.get("record_id"))
+                for r in records
+            ]
+            rollups = [
+                (repo, bucket, start, self.source or "", *(delta[c] for c in ROLLUP_COUNTERS),
+                 delta["health_min"], delta["health_max"])
+                for (repo, bucket, start), delta in fold(records).items()
+            ]
+            db.executemany(INSERT_RECORD, rows)
+            db.executemany(UPSERT_ROLLUP, rollups)
+
+    @staticmethod
+    def _unseen(db: sqlite3.Connection, records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """``records`` without those whose record_id is stored (or repeated in the batch)."""
+        ids = list({r["record_id"] for r in records if r.get("record_id") is not None})
+        seen = set()
+        for first in range(0, len(ids), _IDS_PER_QUERY):
+            chunk = ids[first:first + _IDS_PER_QUERY]
+            marks = ", ".join("?" for _ in chunk)
+            seen.update(row[0] for row in db.execute(
+                f"SELECT record_id FROM repo_health WHERE record_id IN ({marks})", chunk
+            ))
+        unseen = []
+        for r in records:
+            record_id = r.get("record_id")
+            if record_id is not None:
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+            unseen.append(r)
+        return unseen
+
+    def history(
+        self,
+        repo: str,
+        limit: int = 20,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        sql = self._history_sql
+        params: List[Any] = [repo, *self._params]
+        if since is not None:
+            sql += " AND timestamp >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND timestamp < ?"
+            params.append(until)
+        sql += " ORDER BY timestamp DESC, rowid DESC LIMIT ?"
+        params.append(limit)
+        return [self._record(row) for row in self.store.query(sql, params)]
+
+    def page(self, repo: str, limit: int, after: Optional[Tuple[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Records with their rowid as ``_id``."""
+        sql = self._page_sql
+        params: List[Any] = [repo, *self._params]
+        if after is not None:
+            sql += " AND (timestamp < ? OR (timestamp = ? AND rowid < ?))"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY timestamp DESC, rowid DESC LIMIT ?"
+        params.append(limit)
+        records = []
+        for row in self.store.query(sql, params):
+            record = self._record(row[1:])
+            record["_id"] = row[0]
+            records.append(record)
+        return records
+
+    def summary(self, repo: str) -> Dict[str, Any]:
+        total, cumulative, delta, updated_at = self.store.query(self._summary_sql, (repo, *self._params))[0]
+        return summary_from_totals(repo, total, cumulative, delta, updated_at)
+
+    def trend(
+        self, repo: str, bucket: str, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        low, high = trend_range(bucket, since, until)
+        # ISO strings: "" sorts before and "~" after any start.
+        rows = self.store.query(self._trend_sql, (repo, bucket, low or "", high or "~", *self._params))
+        columns = ("start", *ROLLUP_COUNTERS, "health_min", "health_max")
+        return [trend_point(dict(zip(columns, row))) for row in rows]
+
+    def export(self, repo: Optional[str] = None, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        # Keyset pagination: each batch is its own short read, not one long cursor.
+        if repo is None:
+            sql = self._export_all_sql
+            key: List[Any] = [0]
+        else:
+            sql = self._export_repo_sql
+            key = [repo, "", "", 0]
+        while True:
+            rows = self.store.query(sql, key + self._params + [batch_size])
+            for row in rows:
+                yield self._record(row[1:])
+            if len(rows) < batch_size:
+                return
+            last = rows[-1]
+            key = [last[0]] if repo is None else [repo, last[3], last[3], last[0]]
+
+    def close(self) -> None:
+        self.store.close()
+
+    @staticmethod
+    def _record(row: Tuple) -> Dict[str, Any]:
+        return health_record(dict(zip(RECORD_COLUMNS.split(", "), row)))
@@ -0,0 +1,302 @@
+import collections
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from ..metrics import registry as metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Rewrite the journal down to the unflushed records once it grows past this.
+JOURNAL_COMPACT_BYTES = 8 << 20
+
+FLUSH_SECONDS = metrics.histogram(
+    "write_behind_flush_duration_seconds",
+    "Batch writes from write-behind buffers, by buffer and outcome.",
+    ("buffer", "outcome"),
+)
+
+
+class WriteBehindFull(RuntimeError):
+    """Raised by submit() when the buffer stayed full for the whole timeout."""
+
+
+class WriteBehindBuffer:
+    """
+    Queue records in memory and write them in batches from a background thread:
+    ``flush(batch)`` runs once ``max_batch`` records are waiting or the oldest
+    has waited ``max_delay`` seconds, whichever comes first.
+
+    At most ``max_pending`` records are held (queued plus being flushed);
+    submit() blocks while the buffer is full, which pushes back on writers
+    instead of growing without bound. A failed flush is retried with backoff
+    and its records keep their place at the head of the queue.
+
+    With ``journal_path`` set, every record is appended to a journal file before
+    submit() returns. The file is truncated whenever the buffer drains, and a
+    new buffer replays whatever is left in it, so records survive a crash. That
+    is at-least-once delivery: ``flush`` should tolerate seeing a record again.
+    Records must be serializable by ``encode`` (JSON by default).
+
+    Each process needs a journal of its own (gunicorn workers share
+    WRITE_BEHIND_DIR), so a buffer holds an flock on ``<journal>.lock`` and
+    takes the first free slot: ``journal_path``, then ``<stem>.1<suffix>``,
+    ``<stem>.2<suffix>`` and so on. The lock goes when its process does, so the
+    journal of a worker that died is replayed by the next process to claim the
+    slot. A worker forked from a process holding a buffer (gunicorn --preload)
+    starts it empty on a slot of its own. Without fcntl (Windows) journals are
+    not locked: give each process its own directory.
+
+    close() stops the thread after flushing everything still queued.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], None],
+        max_batch: int = 256,
+        max_delay: float = 0.2,
+        max_pending: int = 10000,
+        journal_path: Optional[str] = None,
+        encode: Callable[[Any], str] = json.dumps,
+        decode: Callable[[str], Any] = json.loads,
+        name: str = "write-behind",
+    ):
+        self.flush = flush
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.max_pending = max(self.max_batch, max_pending)
+        self.name = name
+        self._encode = encode
+        self._decode = decode
+        # (record, journal line, enqueue time)
+        self._pending: Deque[Tuple[Any, str, float]] = collections.deque()
+        self._inflight: List[Tuple[Any, str, float]] = []
+        self._cond = threading.Condition()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+
+        self._first_slot = Path(journal_path) if journal_path else None
+        self._journal_path: Optional[Path] = None
+        self._journal = None
+        self._lock_file = None
+        if self._first_slot is not None:
+            self._first_slot.parent.mkdir(parents=True, exist_ok=True)
+            self._open_journal()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._forked)
+
+    @classmethod
+    def from_env(cls, flush: Callable[[List[Any]], None], name: str, **kwargs) -> Optional["WriteBehindBuffer"]:
+        """
+        A buffer configured from WRITE_BEHIND_BATCH, WRITE_BEHIND_DELAY_MS,
+        WRITE_BEHIND_MAX_PENDING and WRITE_BEHIND_DIR (journal directory; the
+        first slot is ``<name>.journal``), or None unless WRITE_BEHIND is enabled.
+        """
+        if os.getenv("WRITE_BEHIND", "").strip().lower() not in ("1", "true", "on", "yes"):
+            return None
+        journal_dir = os.getenv("WRITE_BEHIND_DIR", "").strip()
+        return cls(
+            flush,
+            max_batch=int(os.getenv("WRITE_BEHIND_BATCH", "256")),
+            max_delay=float(os.getenv("WRITE_BEHIND_DELAY_MS", "200")) / 1000,
+            max_pending=int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000")),
+            journal_path=os.path.join(journal_dir, f"{name}.journal") if journal_dir else None,
+            name=name,
+            **kwargs,
+        )
+
+    # ---- producers ----
+    def submit(self, records: Sequence[Any], timeout: Optional[float] = None) -> None:
+        """
+        Queue records (journaled first, if enabled). Blocks while the buffer is
+        full; raises WriteBehindFull if it is still full after ``timeout`` seconds.
+        """
+        if not records:
+            return
+        entries = [(record, self._encode(record) + "\n") for record in records]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._closing:
+                raise RuntimeError(f"{self.name} buffer is closed")
+            # A batch bigger than the whole buffer is let in once the buffer is empty.
+            while self._held() and self._held() + len(entries) > self.max_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise WriteBehindFull(f"{self.name} buffer is full ({self._held()} records)")
+                self._cond.wait(remaining)
+            if self._journal is not None:
+                self._journal.write("".join(line for _, line in entries))
+                self._journal.flush()
+            now = time.monotonic()
+            self._pending.extend((record, line, now) for record, line in entries)
+            self._start()
+            self._cond.notify_all()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush what is queued and stop the background thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            if self._held():
+                where = f"kept in {self._journal_path}" if self._journal is not None else "lost"
+                logger.warning("%s: %d records not flushed at shutdown (%s)", self.name, self._held(), where)
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "inflight": len(self._inflight),
+                "max_pending": self.max_pending,
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "failures": self.failures,
+                "journal": str(self._journal_path) if self._journal_path else None,
+            }
+
+    # ---- background thread ----
+    def _held(self) -> int:
+        return len(self._pending) + len(self._inflight)
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        backoff = 0.0
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                while len(self._pending) < self.max_batch and not self._closing:
+                    wait = self._pending[0][2] + self.max_delay - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                count = min(self.max_batch, len(self._pending))
+                self._inflight = [self._pending.popleft() for _ in range(count)]
+                batch = [record for record, _, _ in self._inflight]
+
+            start = time.perf_counter()
+            try:
+                self.flush(batch)
+            except Exception:
+                FLUSH_SECONDS.labels(self.name, "error").observe(time.perf_counter() - start)
+                logger.exception("%s: flush of %d records failed; retrying", self.name, len(batch))
+                with self._cond:
+                    self.failures += 1
+                    # Back to the head of the queue, in order, for the retry.
+                    self._pending.extendleft(reversed(self._inflight))
+                    self._inflight = []
+                    if self._closing:
+                        # Leave the rest to the journal rather than hang shutdown.
+                        return
+                backoff = min(max(backoff * 2, 0.1), 5.0)
+                time.sleep(backoff)
+                continue
+
+            FLUSH_SECONDS.labels(self.name, "ok").observe(time.perf_counter() - start)
+            backoff = 0.0
+            with self._cond:
+                self.flushed += len(batch)
+                self.batches += 1
+                self._inflight = []
+                self._trim_journal()
+                self._cond.notify_all()
+
+    # ---- journal ----
+    def _open_journal(self) -> None:
+        """Claim the first free slot, replay what it holds and open it for appends."""
+        slot = 0
+        while True:
+            path = self._first_slot
+            if slot:
+                path = path.with_name(f"{path.stem}.{slot}{path.suffix}")
+            # A separate lock file: _rewrite_journal() replaces the journal itself.
+            lock_file = open(path.with_name(path.name + ".lock"), "a")
+            if fcntl is None:
+                break
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                lock_file.close()
+                slot += 1
+        self._lock_file = lock_file
+        self._journal_path = path
+        self._replay()
+        self._journal = open(path, "a", encoding="utf-8")
+        if self._pending:
+            self._start()
+
+    def _forked(self) -> None:
+        # The parent's queue is the parent's to flush, and the inherited lock
+        # is the parent's lock (closing our copy of it does not release it).
+        self._cond = threading.Condition()
+        self._pending.clear()
+        self._inflight = []
+        self._thread = None
+        if self._journal is not None:
+            self._journal.close()
+            self._lock_file.close()
+            self._open_journal()
+
+    def _replay(self) -> None:
+        if not self._journal_path.exists():
+            return
+        now = time.monotonic()
+        with open(self._journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = self._decode(line)
+                except ValueError:
+                    # A line cut short by the crash; nothing after it was acknowledged.
+                    continue
+                self._pending.append((record, line if line.endswith("\n") else line + "\n", now))
+        if self._pending:
+            logger.info("%s: replaying %d records from %s", self.name, len(self._pending), self._journal_path)
+            # Drop a torn tail so new appends start on a fresh line.
+            self._rewrite_journal()
+
+    def _trim_journal(self) -> None:
+        if self._journal is None:
+            return
+        if not self._held():
+            self._journal.truncate(0)
+            self._journal.seek(0)
+        elif self._journal.tell() > JOURNAL_COMPACT_BYTES:
+            self._journal.close()
+            self._rewrite_journal()
+            self._journal = open(self._journal_path, "a", encoding="utf-8")
+
+    def _rewrite_journal(self) -> None:
+        tmp = self._journal_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as out:
+            out.writelines(line for _, line, _ in list(self._inflight) + list(self._pending))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self._journal_path)
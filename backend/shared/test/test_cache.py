@@ -0,0 +1,34 @@
+"""
+ResponseCache generations: bounded, and never moved back by dropping one.
+
+    python -m pytest backend/shared/test
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from shared.cache import ResponseCache  # noqa: E402
+
+
+def test_generations_are_bounded():
+    cache = ResponseCache(max_entries=4, ttl=60)
+    for n in range(1000):
+        cache.invalidate([f"org/repo{n}"])
+    assert len(cache._generations) == 5  # the 4 newest repos and None
+
+
+def test_dropped_generation_does_not_revive_a_stale_read():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    taken = cache.generation("org/a")  # a read of org/a starts
+    cache.invalidate(["org/a"])  # a write lands during it
+    cache.invalidate(["org/b", "org/c"])  # and org/a's generation is dropped
+    cache.put("key", "org/a", taken, b"stale")
+    assert cache.get("key") is None
+
+    fresh = cache.generation("org/a")
+    cache.put("key", "org/a", fresh, b"fresh")
+    assert cache.get("key")[1] == b"fresh"
+    cache.invalidate(["org/a"])
+    assert cache.get("key") is None
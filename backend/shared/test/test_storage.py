@@ -0,0 +1,255 @@
+"""
+Conformance tests for every HealthStorage backend: each gets the same scripted
+records and must return the same history (order, limit, since/until range),
+summaries, trend rollups and export.
+
+SQLite runs on a temporary file. Mongo uses MONGODB_URI (a throwaway database,
+dropped afterwards) when it is set, and the in-process stand-in from
+bench/mongo_standin.py otherwise.
+
+    python -m pytest backend/shared/test
+"""
+
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from shared.storage.base import INITIAL_REPO_HEALTH, RECORD_FIELDS  # noqa: E402
+from shared.storage.memory import MemoryHealthStorage, MemoryHistoryStore  # noqa: E402
+from shared.storage.mongo import MongoHealthStorage  # noqa: E402
+from shared.storage.rollups import bucket_start  # noqa: E402
+from shared.storage.sqlite import SQLiteHealthStorage, SQLiteStore  # noqa: E402
+
+START = datetime(2026, 1, 1)
+
+
+def ts(seconds: int) -> str:
+    return (START + timedelta(seconds=seconds)).isoformat()
+
+
+def record(repo: str, n: int, seconds: int) -> dict:
+    return {
+        "repo": repo,
+        "pr_number": n,
+        "timestamp": ts(seconds),
+        "score": n % 7,
+        "health_delta": -(n % 3),
+        "overall_health": None,
+        "reason": f"r{n}",
+    }
+
+
+# ---- backends ----
+def open_sqlite(tmp_path):
+    return SQLiteHealthStorage(SQLiteStore(tmp_path / "health.db"))
+
+
+def open_memory(tmp_path):
+    return MemoryHealthStorage(MemoryHistoryStore(per_repo_limit=1_000_000, max_records=10_000_000))
+
+
+def open_mongo(tmp_path):
+    uri = os.environ.get("MONGODB_URI", "").strip()
+    if not uri:
+        sys.path.insert(0, str(BACKEND_DIR / "bench"))
+        from mongo_standin import Collection
+
+        return MongoHealthStorage(Collection("repo_health"), rollups=Collection("repo_health_rollup"))
+    import pymongo
+
+    client = pymongo.MongoClient(uri, serverSelectionTimeoutMS=5000)
+    db = client[f"storage_conformance_{uuid.uuid4().hex[:8]}"]
+    storage = MongoHealthStorage(db["repo_health"], rollups=db["repo_health_rollup"])
+    close = storage.close
+
+    def drop() -> None:
+        close()
+        client.drop_database(db.name)
+        client.close()
+
+    storage.close = drop
+    return storage
+
+
+@pytest.fixture(params=[open_sqlite, open_memory, open_mongo], ids=["sqlite", "memory", "mongo"])
+def storage(request, tmp_path):
+    storage = request.param(tmp_path)
+    yield storage
+    storage.close()
+
+
+# Two repos interleaved, two bulk writes, one pair of equal timestamps.
+FIRST = [record("org/a" if n % 2 else "org/b", n, n) for n in range(1, 41)]
+TIE = record("org/a", 41, 39)
+REPO_A = [r for r in FIRST + [TIE] if r["repo"] == "org/a"]
+
+
+@pytest.fixture
+def loaded(storage):
+    storage.insert_many(FIRST)
+    storage.insert_many([TIE])
+    return storage
+
+
+# ---- history, summary, export ----
+def test_empty(storage):
+    assert storage.history("org/a") == []
+    empty = storage.summary("org/a")
+    assert empty["total_prs"] == 0
+    assert empty["current_health"] == INITIAL_REPO_HEALTH
+
+
+def test_history_newest_first(loaded):
+    history = loaded.history("org/a", limit=5)
+    assert all(set(r) == set(RECORD_FIELDS) for r in history)
+    # Equal timestamps come back newest-inserted first.
+    assert [r["pr_number"] for r in history] == [41, 39, 37, 35, 33]
+    assert history[0] == TIE
+    assert len(loaded.history("org/a", limit=100)) == len(REPO_A)
+
+
+def test_history_range(loaded):
+    ranged = loaded.history("org/a", limit=100, since=ts(10), until=ts(20))
+    assert [r["pr_number"] for r in ranged] == [19, 17, 15, 13, 11]
+
+
+def test_summary(loaded):
+    summary = loaded.summary("org/a")
+    assert summary["total_prs"] == len(REPO_A)
+    assert summary["cumulative_score"] == sum(r["score"] for r in REPO_A)
+    assert summary["avg_score"] == pytest.approx(sum(r["score"] for r in REPO_A) / len(REPO_A))
+    assert summary["current_health"] == INITIAL_REPO_HEALTH + sum(r["health_delta"] for r in REPO_A)
+    assert summary["updated_at"] == ts(39)
+
+
+def test_export(loaded):
+    exported = loaded.export("org/a", batch_size=3)
+    expected = sorted(REPO_A, key=lambda r: r["timestamp"])  # stable: ties in insertion order
+    assert [r["pr_number"] for r in exported] == [r["pr_number"] for r in expected]
+
+    everything = list(loaded.export(batch_size=7))
+    assert len(everything) == len(FIRST) + 1
+    for repo in ("org/a", "org/b"):
+        numbers = [r["pr_number"] for r in everything if r["repo"] == repo]
+        want = [r["pr_number"] for r in sorted(FIRST + [TIE], key=lambda r: r["timestamp"]) if r["repo"] == repo]
+        assert numbers == want, repo
+
+
+def test_page(loaded):
+    numbers, after = [], None
+    while True:
+        page = loaded.page("org/a", 4, after)
+        numbers += [r["pr_number"] for r in page]
+        if len(page) < 4:
+            break
+        after = (page[-1]["timestamp"], page[-1]["_id"])
+    assert numbers == [r["pr_number"] for r in loaded.history("org/a", limit=100)]
+    assert {"_id", *RECORD_FIELDS} <= set(page[0])
+
+
+def test_memory_repos(tmp_path):
+    storage = open_memory(tmp_path)
+    storage.insert_many([record("org/a", 1, 5), record("org/b", 2, 9), record("org/c", 3, 9)])
+    first = storage.repos(2)
+    assert [s["repo"] for s in first] == ["org/b", "org/c"]  # newest first, then by name
+    assert first[0] == storage.summary("org/b")
+    assert [s["repo"] for s in storage.repos(2, (first[-1]["updated_at"], first[-1]["repo"]))] == ["org/a"]
+
+
+def test_mongo_summary_reads_summary_documents():
+    sys.path.insert(0, str(BACKEND_DIR / "bench"))
+    from mongo_standin import Collection
+
+    summaries = Collection("repo_summary")
+    summaries.insert_one({"repo": "org/a", "total_prs": 4, "cumulative_score": 30, "current_health": 90,
+                          "last_timestamp": ts(4), "updated_at": ts(5)})
+    storage = MongoHealthStorage(Collection("repo_health"), summaries=summaries)
+    storage.insert_many([record("org/b", 1, 1)])
+    assert storage.summary("org/a") == {"repo": "org/a", "total_prs": 4, "cumulative_score": 30, "avg_score": 7.5,
+                                        "current_health": 90, "updated_at": ts(4)}
+    # No summary document: aggregated from the history.
+    assert storage.summary("org/b")["total_prs"] == 1
+    assert [s["repo"] for s in storage.repos(10)] == ["org/a"]
+
+
+# ---- trends ----
+def test_bucket_start():
+    assert bucket_start("2026-01-07T15:42:10", "week") == "2026-01-05T00:00:00"  # weeks start on Monday
+    assert bucket_start("2026-01-07T15:42:10+02:00", "hour") == "2026-01-07T13:00:00"  # offsets become UTC
+
+
+def test_trend(storage):
+    assert storage.trend("org/t", "day") == []
+
+    # Every 5 hours for 20 days; health drifts down, every third PR has two risks.
+    records = []
+    for n in range(96):
+        r = record("org/t", n, n * 5 * 3600)
+        r["overall_health"] = 100 - n // 2
+        r["reason"] = "Lint failures detected,Very large diff" if n % 3 == 0 else ""
+        records.append(r)
+    for first in range(0, len(records), 10):
+        storage.insert_many(records[first:first + 10])
+
+    for bucket in ("hour", "day", "week"):
+        expected = {}
+        for r in records:
+            expected.setdefault(bucket_start(r["timestamp"], bucket), []).append(r)
+        points = storage.trend("org/t", bucket)
+        assert [p["start"] for p in points] == sorted(expected), bucket
+        for point in points:
+            group = expected[point["start"]]
+            health = [r["overall_health"] for r in group]
+            assert point["prs"] == len(group)
+            assert (point["health_min"], point["health_max"]) == (min(health), max(health))
+            assert point["health_avg"] == pytest.approx(sum(health) / len(health))
+            assert point["risky_prs"] == sum(1 for r in group if r["reason"])
+            assert point["risk_count"] == 2 * point["risky_prs"]
+            assert point["health_delta"] == sum(r["health_delta"] for r in group)
+
+    ranged = storage.trend("org/t", "day", since="2026-01-03T12:00:00", until="2026-01-06")
+    assert [p["start"][:10] for p in ranged] == ["2026-01-03", "2026-01-04", "2026-01-05"]
+
+
+# ---- SQLite sources ----
+def test_sqlite_sources_read_their_own_records(tmp_path):
+    store = SQLiteStore(tmp_path / "health.db")
+    api = SQLiteHealthStorage(store, source="backend-api")
+    ai = SQLiteHealthStorage(store, source="backend-ai")
+    everyone = SQLiteHealthStorage(store)
+    # A row from before sources were recorded.
+    store.write("INSERT INTO repo_health (repo, timestamp, score, reason) VALUES (?, ?, ?, ?)",
+                [("org/a", ts(0), 10, "")])
+    api.insert_many([record("org/a", 1, 1)])
+    ai.insert_many([record("org/a", 2, 2)])
+
+    assert [r["pr_number"] for r in api.history("org/a")] == [1, None]
+    assert [r["pr_number"] for r in ai.history("org/a")] == [2, None]
+    assert [r["pr_number"] for r in everyone.history("org/a")] == [2, 1, None]
+    assert api.summary("org/a")["total_prs"] == 2
+    assert [r["pr_number"] for r in ai.export("org/a")] == [None, 2]
+    assert len(list(ai.export())) == 2
+    assert [p["prs"] for p in api.trend("org/a", "day")] == [1]
+    assert [p["prs"] for p in everyone.trend("org/a", "day")] == [2]
+    store.close()
+
+
+def test_sqlite_skips_stored_record_ids(tmp_path):
+    storage = open_sqlite(tmp_path)
+    records = [dict(record("org/a", n, n), record_id=f"id{n}") for n in range(1, 5)]
+    storage.insert_many(records[:3])
+    # A replayed batch: two records already stored, one repeated, one new.
+    storage.insert_many(records[1:] + records[3:])
+    storage.insert_many([record("org/a", 9, 9), record("org/a", 9, 9)])  # no record_id: both stored
+
+    assert [r["pr_number"] for r in storage.history("org/a")] == [9, 9, 4, 3, 2, 1]
+    assert storage.summary("org/a")["total_prs"] == 6
+    assert [p["prs"] for p in storage.trend("org/a", "day")] == [6]
+    storage.close()
@@ -0,0 +1,59 @@
+"""
+WriteBehindBuffer journals: one per process, replayed after a crash.
+
+    python -m pytest backend/shared/test
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from shared.storage import write_behind  # noqa: E402
+from shared.storage.write_behind import WriteBehindBuffer  # noqa: E402
+
+
+class Sink:
+    def __init__(self):
+        self.records = []
+        self.blocked = threading.Event()
+
+    def __call__(self, batch):
+        if self.blocked.is_set():
+            raise RuntimeError("database down")
+        self.records.extend(batch)
+
+
+def test_each_buffer_claims_its_own_journal(tmp_path):
+    if write_behind.fcntl is None:
+        pytest.skip("journals are only locked where fcntl exists")
+    first = WriteBehindBuffer(Sink(), journal_path=str(tmp_path / "health.journal"))
+    second = WriteBehindBuffer(Sink(), journal_path=str(tmp_path / "health.journal"))
+    try:
+        assert first.stats()["journal"] == str(tmp_path / "health.journal")
+        assert second.stats()["journal"] == str(tmp_path / "health.1.journal")
+    finally:
+        second.close()
+    # A released slot is claimed again.
+    third = WriteBehindBuffer(Sink(), journal_path=str(tmp_path / "health.journal"))
+    assert third.stats()["journal"] == str(tmp_path / "health.1.journal")
+    third.close()
+    first.close()
+
+
+def test_unflushed_records_are_replayed(tmp_path):
+    sink = Sink()
+    sink.blocked.set()
+    buffer = WriteBehindBuffer(sink, max_delay=0, journal_path=str(tmp_path / "health.journal"))
+    buffer.submit([{"n": 1}, {"n": 2}])
+    buffer.close(timeout=1)  # the flush failed: the records stay in the journal
+    assert sink.records == []
+
+    replayed = Sink()
+    buffer = WriteBehindBuffer(replayed, max_delay=0, journal_path=str(tmp_path / "health.journal"))
+    buffer.close(timeout=5)
+    assert replayed.records == [{"n": 1}, {"n": 2}]
+    assert (tmp_path / "health.journal").read_text() == ""
@@ -14,6 +14,18 @@ app = FastAPI(title="AI Repo Supervisor")
 # Backend API mounted under /api
 app.mount("/api", backend_app)
 
+
+# Mounted apps do not get startup/shutdown events of their own; forward them.
+@app.on_event("startup")
+async def start_backend():
+    await backend_app.router.startup()
+
+
+@app.on_event("shutdown")
+async def stop_backend():
+    await backend_app.router.shutdown()
+
+
 # Frontend static build (Next.js export) if available
 if FRONTEND_OUT_DIR.exists():
     app.mount("/", StaticFiles(directory=FRONTEND_OUT_DIR, html=True), name="frontend")